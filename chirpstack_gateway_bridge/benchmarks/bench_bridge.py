@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Durchsatz und Latenz der kompletten Bridge (MQTT -> UART), offline.
+
+Die Bridge läuft als eigener Prozess gegen einen lokalen MQTT-Ersatz
+(minimaler MQTT-3.1.1-Server, QoS 0) und schreibt auf die Slave-Seite eines
+Pseudo-Terminals. Ein Leser am Master-Ende erkennt jedes Uplink an einer
+Markierung mit Sequenznummer in der Payload, sodass die Latenz vom Publish
+bis zum Eintreffen am UART pro Nachricht gemessen wird. CPU-Zeit und RSS
+werden aus /proc/<pid> gelesen (sonst getrusage nach Prozessende).
+
+Aufruf (aus chirpstack_gateway_bridge/):
+    python benchmarks/bench_bridge.py [--target package|root] [--rate 500 2000 0]
+        [--payload-size 16 64] [--count 5000] [--devices 50]
+        [--set pipeline.enabled=true ...] [--json] [--output ergebnis.json]
+
+--rate 0 veröffentlicht so schnell wie möglich. Mehrere Raten und
+Payload-Größen ergeben je einen Lauf (jeweils mit neu gestarteter Bridge).
+"""
+
+import os
+import pty
+import sys
+import json
+import time
+import tty
+import errno
+import select
+import signal
+import socket
+import struct
+import argparse
+import platform
+import resource
+import tempfile
+import itertools
+import threading
+import subprocess
+import importlib.util
+from datetime import datetime
+
+BRIDGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+ROOT_SCRIPT = os.path.join(BRIDGE_DIR, '..', 'chirpstack_mqtt_to_uart.py')
+sys.path.insert(0, BRIDGE_DIR)
+
+from chirpstack_mqtt_to_uart.config import get_default_config
+from chirpstack_mqtt_to_uart.session_events import build_uplink_event
+
+# Markierung + Sequenznummer am Anfang jeder Payload
+MARKER = b'\xb3\x9c\x5e\x71'
+_SEQ = struct.Struct(">I")
+MIN_PAYLOAD = len(MARKER) + _SEQ.size
+
+
+def _encode_length(length):
+    """Kodiert die MQTT Remaining Length."""
+    out = bytearray()
+    while True:
+        length, digit = divmod(length, 128)
+        out.append(digit | 0x80 if length else digit)
+        if not length:
+            return bytes(out)
+
+
+class MQTTStandIn:
+    """
+    Minimaler MQTT-3.1.1-Server für genau einen Subscriber: beantwortet
+    CONNECT, SUBSCRIBE und PINGREQ und stellt publish() mit QoS 0 bereit.
+    """
+
+    def __init__(self):
+        self._server = socket.socket()
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+        self.subscribed = threading.Event()
+        self._client = None
+        self._send_lock = threading.Lock()
+        self._closed = False
+        threading.Thread(target=self._serve, name="mqtt-stand-in", daemon=True).start()
+
+    def _serve(self):
+        while not self._closed:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._client = client
+            try:
+                self._handle(client)
+            except OSError:
+                pass
+            self.subscribed.clear()
+
+    def _recv_exact(self, client, size):
+        data = b''
+        while len(data) < size:
+            chunk = client.recv(size - len(data))
+            if not chunk:
+                raise OSError("Verbindung geschlossen")
+            data += chunk
+        return data
+
+    def _handle(self, client):
+        while True:
+            header = self._recv_exact(client, 1)[0]
+            length, shift = 0, 0
+            while True:
+                digit = self._recv_exact(client, 1)[0]
+                length |= (digit & 0x7F) << shift
+                shift += 7
+                if not digit & 0x80:
+                    break
+            body = self._recv_exact(client, length) if length else b''
+            packet_type = header >> 4
+            if packet_type == 1:      # CONNECT
+                self._send(b'\x20\x02\x00\x00')
+            elif packet_type == 8:    # SUBSCRIBE: alle Filter mit QoS 0 bestätigen
+                topics, offset = 0, 2
+                while offset < len(body):
+                    offset += 2 + struct.unpack_from(">H", body, offset)[0] + 1
+                    topics += 1
+                self._send(b'\x90' + _encode_length(2 + topics) + body[:2] + b'\x00' * topics)
+                self.subscribed.set()
+            elif packet_type == 12:   # PINGREQ
+                self._send(b'\xd0\x00')
+            elif packet_type == 14:   # DISCONNECT
+                return
+
+    def _send(self, data):
+        with self._send_lock:
+            self._client.sendall(data)
+
+    @staticmethod
+    def encode_publish(topic, payload):
+        """Baut ein PUBLISH-Paket (QoS 0)."""
+        topic = topic.encode('utf-8')
+        body = struct.pack(">H", len(topic)) + topic + payload
+        return b'\x30' + _encode_length(len(body)) + body
+
+    def send(self, packet):
+        """Sendet ein vorbereitetes Paket an den Subscriber."""
+        self._send(packet)
+
+    def close(self):
+        self._closed = True
+        self._server.close()
+        if self._client:
+            self._client.close()
+
+
+class UARTReader:
+    """Liest am Master-Ende des PTY und erfasst die Ankunftszeit jeder Sequenznummer."""
+
+    def __init__(self, fd, total):
+        self.fd = fd
+        self.received = [None] * total
+        self.count = 0
+        self.duplicates = 0
+        self.bytes = 0
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="uart-reader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        buffer = b''
+        total = len(self.received)
+        while not self._stop:
+            ready, _, _ = select.select([self.fd], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as e:
+                if e.errno == errno.EIO:
+                    # Slave geschlossen (Bridge beendet)
+                    return
+                raise
+            now = time.perf_counter()
+            self.bytes += len(data)
+            buffer += data
+            position = 0
+            while True:
+                index = buffer.find(MARKER, position)
+                if index < 0 or index + MIN_PAYLOAD > len(buffer):
+                    break
+                seq = _SEQ.unpack_from(buffer, index + len(MARKER))[0]
+                position = index + MIN_PAYLOAD
+                if seq >= total:
+                    continue
+                if self.received[seq] is None:
+                    self.received[seq] = now
+                    self.count += 1
+                else:
+                    self.duplicates += 1
+            # Einen eventuell angeschnittenen Marker behalten
+            buffer = buffer[max(position, len(buffer) - MIN_PAYLOAD + 1):]
+
+    def wait_for(self, count, timeout):
+        """Wartet, bis count Nachrichten eingetroffen sind."""
+        deadline = time.monotonic() + timeout
+        while self.count < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.count >= count
+
+    def stop(self):
+        self._stop = True
+        self._thread.join(1.0)
+
+
+class ProcessSampler:
+    """CPU-Zeit und Spitzen-RSS eines Prozesses über /proc (nur Linux)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.available = os.path.exists(f"/proc/{pid}/stat")
+        self._ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+    def cpu_seconds(self):
+        if not self.available:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return None
+        # utime und stime (Felder 14 und 15, ab Feld 3 nach dem Namen)
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def rss_peak_kb(self):
+        if not self.available:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+        except OSError:
+            return None
+        return None
+
+
+def set_path(config, path, value):
+    """Setzt einen Wert über einen Punkt-Pfad (z. B. pipeline.enabled)."""
+    keys = path.split('.')
+    for key in keys[:-1]:
+        config = config.setdefault(key, {})
+    config[keys[-1]] = value
+
+
+def parse_override(text):
+    """Wandelt 'pfad=wert' um; der Wert wird als JSON gelesen, sonst als String."""
+    path, _, value = text.partition('=')
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return path, value
+
+
+def load_root_defaults():
+    """Lädt die Standardkonfiguration von chirpstack_mqtt_to_uart.py."""
+    spec = importlib.util.spec_from_file_location("bridge_script", ROOT_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ChirpStackMQTTtoUART.get_default_config(None)
+
+
+def build_events(count, payload_size, devices, first_seq=0):
+    """Erzeugt vorkodierte PUBLISH-Pakete mit ChirpStack-v4-Uplinks."""
+    padding = bytes(range(256)) * (payload_size // 256 + 1)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    fcnt = [0] * devices
+    packets = []
+    for seq in range(first_seq, first_seq + count):
+        device = seq % devices
+        fcnt[device] += 1
+        data = MARKER + _SEQ.pack(seq) + padding[:payload_size - MIN_PAYLOAD]
+        event = build_uplink_event({
+            'event_type': 'up',
+            'timestamp': timestamp,
+            'application_id': 'bench',
+            'device_eui': f"{0x70B3D57ED0000000 + device:016x}",
+            'fcnt': str(first_seq + fcnt[device]),
+            'fport': '2',
+            'raw_data_hex': data.hex(),
+            'rssi_dbm': '-97',
+            'snr_db': '7.5',
+            'gateway_id': '0016c001ff1a2b3c',
+            'frequency': '868100000',
+            'bandwidth': '125000',
+            'spreading_factor': 'SF7'
+        })
+        packets.append(MQTTStandIn.encode_publish(event.topic, event.payload))
+    return packets
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_once(args, base_config, rate, payload_size):
+    """Startet die Bridge, spielt Warmup und Messung ein und wertet aus."""
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    broker = MQTTStandIn()
+    workdir = tempfile.mkdtemp(prefix="bench_bridge_")
+
+    config = json.loads(json.dumps(base_config))
+    config["mqtt"].update(broker="127.0.0.1", port=broker.port, username=None, password=None)
+    config["uart"]["port"] = os.ttyname(slave)
+    config["logging"].update(level="WARNING", file=None)
+    for path, value in args.overrides:
+        set_path(config, path, value)
+    config_file = os.path.join(workdir, "config.json")
+    with open(config_file, 'w') as f:
+        json.dump(config, f)
+
+    script = ROOT_SCRIPT if args.target == 'root' else os.path.join(BRIDGE_DIR, 'main.py')
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    process = subprocess.Popen([sys.executable, os.path.abspath(script), config_file], cwd=workdir,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    sampler = ProcessSampler(process.pid)
+    reader = UARTReader(master, args.warmup + args.count)
+    warmup = build_events(args.warmup, payload_size, args.devices)
+    packets = build_events(args.count, payload_size, args.devices, first_seq=args.warmup)
+    sent_at = [0.0] * args.count
+
+    try:
+        if not broker.subscribed.wait(args.start_timeout):
+            raise RuntimeError("Bridge hat sich nicht mit dem MQTT-Ersatz verbunden")
+        for packet in warmup:
+            broker.send(packet)
+        if not reader.wait_for(args.warmup, args.drain_timeout):
+            raise RuntimeError(f"Warmup unvollständig: {reader.count}/{args.warmup} Nachrichten am UART")
+
+        cpu_start = sampler.cpu_seconds()
+        start = time.perf_counter()
+        interval = 1.0 / rate if rate else 0.0
+        for index, packet in enumerate(packets):
+            if interval:
+                delay = start + index * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent_at[index] = time.perf_counter()
+            broker.send(packet)
+        publish_end = time.perf_counter()
+        reader.wait_for(args.warmup + args.count, args.drain_timeout)
+        cpu_end = sampler.cpu_seconds()
+        rss_peak = sampler.rss_peak_kb()
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        reader.stop()
+        broker.close()
+        os.close(master)
+        os.close(slave)
+
+    received = reader.received[args.warmup:]
+    latencies = sorted(arrival - sent for arrival, sent in zip(received, sent_at) if arrival is not None)
+    arrivals = [arrival for arrival in received if arrival is not None]
+    elapsed = (max(arrivals) if arrivals else publish_end) - start
+
+    if cpu_start is None or cpu_end is None:
+        # Ohne /proc: gesamte Laufzeit inklusive Start, nach Prozessende
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = (usage.ru_utime + usage.ru_stime) - (usage_before.ru_utime + usage_before.ru_stime)
+        rss_peak = usage.ru_maxrss
+    else:
+        cpu = cpu_end - cpu_start
+
+    return {
+        'rate': rate,
+        'payload_size': payload_size,
+        'sent': args.count,
+        'received': len(latencies),
+        'lost': args.count - len(latencies),
+        'duplicates': reader.duplicates,
+        'offered_rate': args.count / (publish_end - start) if publish_end > start else None,
+        'throughput': len(latencies) / elapsed if elapsed > 0 else None,
+        'uart_bytes': reader.bytes,
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies) * 1000 if latencies else None,
+            'p50': _percentile(latencies, 0.50) * 1000 if latencies else None,
+            'p95': _percentile(latencies, 0.95) * 1000 if latencies else None,
+            'p99': _percentile(latencies, 0.99) * 1000 if latencies else None,
+            'max': latencies[-1] * 1000 if latencies else None
+        },
+        'cpu_seconds': cpu,
+        'cpu_percent': cpu / elapsed * 100 if elapsed > 0 else None,
+        'rss_peak_kb': rss_peak
+    }
+
+
+def git_revision():
+    """Gibt den aktuellen Commit zurück (None außerhalb eines Git-Checkouts)."""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=BRIDGE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=('package', 'root'), default='package',
+                        help='main.py (package) oder chirpstack_mqtt_to_uart.py (root)')
+    parser.add_argument('--rate', type=float, nargs='+', default=[1000.0], help='Nachrichten/s, 0 = unbegrenzt')
+    parser.add_argument('--payload-size', type=int, nargs='+', default=[32], help='Payload-Bytes pro Uplink')
+    parser.add_argument('--count', type=int, default=5000, help='Gemessene Nachrichten pro Lauf')
+    parser.add_argument('--warmup', type=int, default=200, help='Nachrichten vor der Messung')
+    parser.add_argument('--devices', type=int, default=50, help='Anzahl simulierter Geräte')
+    parser.add_argument('--set', dest='overrides', type=parse_override, action='append', default=[],
+                        metavar='PFAD=WERT', help='Konfiguration überschreiben, z. B. uart.frame_format=binary')
+    parser.add_argument('--start-timeout', type=float, default=15.0)
+    parser.add_argument('--drain-timeout', type=float, default=10.0)
+    parser.add_argument('--json', action='store_true', help='Ergebnis als JSON ausgeben')
+    parser.add_argument('--output', help='Ergebnis zusätzlich als JSON-Datei schreiben')
+    args = parser.parse_args()
+
+    sizes = [size for size in args.payload_size if MIN_PAYLOAD <= size <= 255]
+    if not sizes:
+        sys.exit(f"Payload-Größe muss zwischen {MIN_PAYLOAD} und 255 Bytes liegen")
+    base_config = load_root_defaults() if args.target == 'root' else get_default_config()
+
+    runs = []
+    for rate, size in itertools.product(args.rate, sizes):
+        result = run_once(args, base_config, rate, size)
+        runs.append(result)
+        if not args.json:
+            latency = result['latency_ms']
+            rate_text = f"{rate:g}/s" if rate else "max"
+            print(f"Rate {rate_text:>8}, {size:3d} B: {result['throughput'] or 0:8.0f} msg/s, "
+                  f"Latenz p50/p95/p99/max {latency['p50'] or 0:.2f}/{latency['p95'] or 0:.2f}/"
+                  f"{latency['p99'] or 0:.2f}/{latency['max'] or 0:.2f} ms, "
+                  f"CPU {result['cpu_percent'] or 0:.0f} %, RSS {(result['rss_peak_kb'] or 0) / 1024:.1f} MB, "
+                  f"verloren {result['lost']}")
+
+    report = {
+        'benchmark': 'bridge',
+        'target': args.target,
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'count': args.count,
+        'warmup': args.warmup,
+        'devices': args.devices,
+        'overrides': dict(args.overrides),
+        'runs': runs
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
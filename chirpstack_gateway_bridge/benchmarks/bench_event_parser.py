@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: EventParser gegen den bisherigen json.loads-Pfad.
+
+Verwendet aus den Session-CSVs rekonstruierte ChirpStack-Uplinks.
+
+Aufruf (aus chirpstack_gateway_bridge/):
+    python benchmarks/bench_event_parser.py [CSV-Dateien/Verzeichnisse] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chirpstack_mqtt_to_uart.event_parser import EventParser, orjson
+from chirpstack_mqtt_to_uart.session_events import load_session_events
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Lora_Sesion_Data')
+
+
+def run_cases(cases, payloads, repeat):
+    """
+    Misst die mittlere Zeit pro Event in Mikrosekunden. Die Fälle laufen pro
+    Runde abwechselnd, gewertet wird die beste Runde je Fall.
+    """
+    best = {name: float('inf') for name, _ in cases}
+    for _ in range(repeat):
+        for name, parse in cases:
+            start = time.perf_counter()
+            for payload in payloads:
+                parse(payload)
+            best[name] = min(best[name], time.perf_counter() - start)
+    return [{'name': name, 'us_per_event': best[name] / len(payloads) * 1e6} for name, _ in cases]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', default=[DEFAULT_DATA_DIR])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='Ergebnis als JSON ausgeben')
+    args = parser.parse_args()
+
+    events = load_session_events(args.paths)
+    if not events:
+        sys.exit("Keine Uplinks in den angegebenen Session-Dateien gefunden")
+    payloads = [event.payload for event in events]
+
+    logger = logging.getLogger("bench")
+    cases = [
+        ('json.loads (bisher)', json.loads),
+        ('json.loads + dumps(indent=2) (bisher, DEBUG)', lambda p: json.dumps(json.loads(p), indent=2)),
+        ('EventParser json', EventParser({'parser': {'backend': 'json', 'lazy': False}}, logger).parse),
+        ('EventParser json lazy', EventParser({'parser': {'backend': 'json', 'lazy': True}}, logger).parse),
+    ]
+    if orjson is not None:
+        cases += [
+            ('EventParser orjson', EventParser({'parser': {'backend': 'orjson', 'lazy': False}}, logger).parse),
+            ('EventParser orjson lazy', EventParser({'parser': {'backend': 'orjson', 'lazy': True}}, logger).parse),
+        ]
+
+    results = run_cases(cases, payloads, args.repeat)
+    baseline = results[0]['us_per_event']
+    for result in results:
+        result['speedup'] = baseline / result['us_per_event']
+
+    report = {
+        'events': len(payloads),
+        'avg_event_bytes': sum(map(len, payloads)) / len(payloads),
+        'results': results
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['events']} Events, Ø {report['avg_event_bytes']:.0f} Bytes")
+    for result in results:
+        print(f"  {result['name']:<48} {result['us_per_event']:7.2f} µs  x{result['speedup']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
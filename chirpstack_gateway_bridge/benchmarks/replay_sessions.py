@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Replay: aufgezeichnete Session-CSVs durch die Verarbeitung der Bridge spielen.
+
+Die Zeilen von LoRaWANSystemMonitor.write_to_csv werden zu ChirpStack-Uplinks
+zurückgebaut (session_events) und in ihrer ursprünglichen zeitlichen Abfolge
+durch TopicParser, EventParser, MessageProcessor und UARTCommunicator
+geschickt, wie im synchronen Betrieb von main.py. Ohne --uart schreibt der
+UARTCommunicator auf ein Pseudo-Terminal; --baudrate hält jeden Send so
+lange, wie die Bytes auf einer echten Leitung bräuchten (blockierendes
+Drain). Ausgewertet werden Verzögerung gegenüber dem Sollzeitpunkt (lag),
+Dauer pro Stufe und Gesamtlatenz bis zum Ende des UART-Sends.
+
+Aufruf (aus chirpstack_gateway_bridge/):
+    python benchmarks/replay_sessions.py [CSV-Dateien/Verzeichnisse] [--speed 10]
+        [--max-gap 5] [--baudrate 115200] [--set uart.frame_format=binary] [--json]
+
+--speed 1 entspricht Echtzeit, N ist N-fach beschleunigt, 0 so schnell wie
+möglich. --max-gap begrenzt lange Pausen der Aufzeichnung (in Sekunden der
+Aufzeichnung), die Abstände innerhalb von Bursts bleiben erhalten.
+"""
+
+import os
+import pty
+import sys
+import json
+import time
+import tty
+import logging
+import argparse
+import threading
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chirpstack_mqtt_to_uart.config import get_default_config, load_config
+from chirpstack_mqtt_to_uart.event_parser import EventParser
+from chirpstack_mqtt_to_uart.processor import MessageProcessor
+from chirpstack_mqtt_to_uart.session_events import load_session_events
+from chirpstack_mqtt_to_uart.stats import StatsManager
+from chirpstack_mqtt_to_uart.topic_cache import TopicParser
+from chirpstack_mqtt_to_uart.uart_comm import UARTCommunicator
+from bench_bridge import parse_override, set_path
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Lora_Sesion_Data')
+REPORT_STAGES = ('lag', 'parse', 'decode', 'frame', 'uart_write', 'uart_drain', 'total')
+
+
+def schedule(events, speed, max_gap):
+    """
+    Berechnet die Sollzeitpunkte relativ zum Start in Sekunden. Pausen über
+    max_gap werden auf max_gap gekürzt, danach wird durch speed geteilt.
+    """
+    offsets = []
+    offset = 0.0
+    previous = None
+    for event in events:
+        if previous is not None:
+            gap = max(0.0, event.timestamp - previous)
+            offset += min(gap, max_gap) if max_gap else gap
+        previous = event.timestamp
+        offsets.append(offset / speed if speed else 0.0)
+    return offsets
+
+
+def peak_rate(offsets, window=1.0):
+    """Maximale Anzahl Sollzeitpunkte innerhalb eines Fensters (Nachrichten/s)."""
+    recent = deque()
+    peak = 0
+    for offset in offsets:
+        recent.append(offset)
+        while offset - recent[0] > window:
+            recent.popleft()
+        peak = max(peak, len(recent))
+    return peak / window
+
+
+def open_pty_sink():
+    """Öffnet ein PTY und verwirft alles, was am Master-Ende ankommt."""
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+
+    def drain():
+        try:
+            while os.read(master, 65536):
+                pass
+        except OSError:
+            pass
+
+    threading.Thread(target=drain, name="pty-sink", daemon=True).start()
+    return os.ttyname(slave), (master, slave)
+
+
+def replay(events, offsets, config, stats, baudrate, logger):
+    """
+    Spielt die Events zu ihren Sollzeitpunkten ein und zählt in stats. Ohne
+    Zeitplan (alle Offsets 0) zählen lag und total ab Beginn der Verarbeitung.
+    """
+    topic_parser = TopicParser()
+    event_parser = EventParser(config, logger)
+    processor = MessageProcessor(config, logger)
+    uart = UARTCommunicator(config, logger)
+    uart.record_stage = stats.record_stage
+
+    uart_config = config.get("uart", {})
+    bits_per_byte = 1 + uart_config.get("bytesize", 8) + uart_config.get("stopbits", 1) + \
+        (0 if uart_config.get("parity", "none") == "none" else 1)
+    seconds_per_byte = bits_per_byte / baudrate if baudrate else 0.0
+
+    paced = any(offsets)
+    start = time.perf_counter()
+    try:
+        for event, offset in zip(events, offsets):
+            due = start + offset
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            began = time.perf_counter()
+            if paced:
+                stats.record_stage('lag', began - due)
+            else:
+                due = began
+            stats.increment_received()
+
+            topic_info = topic_parser.parse(event.topic)
+            device_name = topic_info.device_id
+            stats.record_device_received(device_name)
+            json_data = event_parser.parse(event.payload)
+            parsed = time.perf_counter()
+            stats.record_stage('parse', parsed - began)
+
+            decoded_payload = processor.decode_payload(json_data, device_name)
+            if not decoded_payload or not processor.validate_payload(decoded_payload):
+                stats.increment_decode_errors(device_name)
+                continue
+            decoded = time.perf_counter()
+            stats.record_stage('decode', decoded - parsed)
+
+            message = processor.create_uart_message(device_name, decoded_payload,
+                                                    json_data.get('fPort'), topic_info.uart_prefix)
+            if not message:
+                stats.increment_errors(device_name)
+                continue
+            framed = time.perf_counter()
+            stats.record_stage('frame', framed - decoded)
+
+            if uart.send(message):
+                stats.increment_sent()
+                stats.record_device_sent(device_name, len(message))
+            else:
+                stats.increment_errors(device_name)
+            # Leitung belegt, bis alle Bytes mit der Baudrate übertragen sind
+            remaining = framed + len(message) * seconds_per_byte - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            stats.record_stage('total', time.perf_counter() - due)
+    finally:
+        uart.close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', default=[DEFAULT_DATA_DIR])
+    parser.add_argument('--speed', type=float, default=0.0, help='1 = Echtzeit, N = N-fach, 0 = unbegrenzt')
+    parser.add_argument('--max-gap', type=float, default=60.0,
+                        help='Längste Pause der Aufzeichnung in Sekunden (0 = unverändert)')
+    parser.add_argument('--config', help='Konfigurationsdatei der Bridge (Standard: Standardwerte)')
+    parser.add_argument('--set', dest='overrides', type=parse_override, action='append', default=[],
+                        metavar='PFAD=WERT', help='Konfiguration überschreiben, z. B. uart.frame_format=binary')
+    parser.add_argument('--uart', help='Serielle Schnittstelle statt Pseudo-Terminal')
+    parser.add_argument('--baudrate', type=int,
+                        help='Leitungsrate für das PTY nachbilden (Standard: uart.baudrate, 0 = aus)')
+    parser.add_argument('--json', action='store_true', help='Ergebnis als JSON ausgeben')
+    args = parser.parse_args()
+
+    events = load_session_events(args.paths)
+    if not events:
+        sys.exit("Keine Uplinks in den angegebenen Session-Dateien gefunden")
+
+    config = load_config(args.config) if args.config else get_default_config()
+    for path, value in args.overrides:
+        set_path(config, path, value)
+    pty_fds = None
+    if args.uart:
+        config["uart"]["port"] = args.uart
+        baudrate = 0 if args.baudrate is None else args.baudrate
+    else:
+        config["uart"]["port"], pty_fds = open_pty_sink()
+        baudrate = config["uart"].get("baudrate", 115200) if args.baudrate is None else args.baudrate
+
+    logger = logging.getLogger("replay")
+    logging.basicConfig(level=logging.WARNING)
+    stats = StatsManager(logger, config)
+    offsets = schedule(events, args.speed, args.max_gap)
+
+    try:
+        elapsed = replay(events, offsets, config, stats, baudrate, logger)
+    finally:
+        if pty_fds:
+            for fd in pty_fds:
+                os.close(fd)
+
+    counters = stats.get_stats()
+    report = {
+        'events': len(events),
+        'devices': len(stats.get_device_stats()),
+        'recorded_span': events[-1].timestamp - events[0].timestamp,
+        'scheduled_span': offsets[-1],
+        'speed': args.speed,
+        'max_gap': args.max_gap,
+        'baudrate': baudrate,
+        'frame_format': config["uart"].get("frame_format", "text"),
+        'elapsed': elapsed,
+        'throughput': len(events) / elapsed if elapsed > 0 else None,
+        'peak_scheduled_rate': peak_rate(offsets) if args.speed else None,
+        'sent': counters['messages_sent'],
+        'decode_errors': counters['decode_errors'],
+        'errors': counters['errors'],
+        'stages_ms': {
+            stage: {key: value * 1000 if key != 'count' else value for key, value in latency.items()}
+            for stage, latency in counters['stages'].items() if stage in REPORT_STAGES and latency['count']
+        }
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['events']} Uplinks von {report['devices']} Geräten, aufgezeichnet über "
+          f"{report['recorded_span'] / 3600:.1f} h, eingespielt in {elapsed:.2f} s "
+          f"({report['throughput']:.0f} msg/s, {report['frame_format']}, "
+          f"{f'{baudrate} baud' if baudrate else 'ohne Leitungsrate'})")
+    if report['peak_scheduled_rate']:
+        print(f"  Spitzenrate laut Zeitplan: {report['peak_scheduled_rate']:.0f} msg/s")
+    print(f"  Gesendet: {report['sent']}, Dekodierfehler: {report['decode_errors']}, Fehler: {report['errors']}")
+    for stage in REPORT_STAGES:
+        latency = report['stages_ms'].get(stage)
+        if latency:
+            print(f"  {stage:<10} p50/p95/p99/max {latency['p50']:8.3f}/{latency['p95']:8.3f}/"
+                  f"{latency['p99']:8.3f}/{latency['max']:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,19 +8,61 @@ und UART-Geräten.
 __version__ = "1.0.0"
 __author__ = "Your Name"
 
-from .config import load_config, get_default_config
-from .logger import setup_logging
-from .uart_comm import UARTCommunicator
-from .mqtt_handler import MQTTHandler
-from .processor import MessageProcessor
-from .stats import StatsManager
-
-__all__ = [
-    'load_config',
-    'get_default_config',
-    'setup_logging',
-    'UARTCommunicator',
-    'MQTTHandler',
-    'MessageProcessor',
-    'StatsManager'
-]
+import importlib
+
+# Öffentlicher Name -> Modul. Die Module werden erst beim ersten Zugriff
+# geladen, damit z. B. session_store und schemas in Notebooks und im
+# Monitor ohne pyserial und paho-mqtt importierbar sind.
+_EXPORTS = {
+    'load_config': 'config',
+    'get_default_config': 'config',
+    'setup_logging': 'logger',
+    'shutdown_logging': 'logger',
+    'get_logging_stats': 'logger',
+    'UARTCommunicator': 'uart_comm',
+    'MQTTHandler': 'mqtt_handler',
+    'MessageProcessor': 'processor',
+    'StatsManager': 'stats',
+    'LatencyHistogram': 'histogram',
+    'MessagePipeline': 'pipeline',
+    'CoalescingWriter': 'uart_writer',
+    'UARTFrame': 'uart_writer',
+    'BinaryFramer': 'framing',
+    'FrameParser': 'framing',
+    'TopicParser': 'topic_cache',
+    'TopicInfo': 'topic_cache',
+    'topic_parser': 'topic_cache',
+    'EventParser': 'event_parser',
+    'PayloadDumper': 'payload_dump',
+    'UARTRouter': 'router',
+    'UARTPort': 'router',
+    'PriorityClassifier': 'scheduler',
+    'PriorityScheduler': 'scheduler',
+    'Spool': 'spool',
+    'DedupCache': 'dedup',
+    'MetricsServer': 'metrics',
+    'MetricFamily': 'metrics',
+    'bridge_collector': 'metrics',
+    'SchemaRegistry': 'schemas',
+    'PayloadSchema': 'schemas',
+    'decode_session_payloads': 'schemas',
+    'SessionStore': 'session_store',
+    'AsyncMQTTHandler': 'async_engine',
+    'AsyncSerialTransport': 'async_engine',
+    'AsyncBridgeEngine': 'async_engine'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,429 @@
+"""asyncio bridge engine module for ChirpStack MQTT to UART Bridge.
+
+Der MQTT-Socket und die UART-Dateideskriptoren werden von einer einzigen
+asyncio-Eventloop bedient: paho-mqtt meldet seine Sockets über die
+on_socket_*-Callbacks an, die Loop ruft loop_read()/loop_write() auf, sobald
+der Socket bereit ist. UART-Frames werden nicht-blockierend auf den
+Dateideskriptor geschrieben; was der Treiber nicht sofort annimmt, wird
+gepuffert und geschrieben, sobald der Deskriptor wieder schreibbar ist.
+"""
+
+import os
+import time
+import signal
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+import paho.mqtt.client as mqtt
+
+from .mqtt_handler import MQTTHandler
+from .uart_comm import UARTCommunicator
+
+# Obergrenze für den Abstand zwischen zwei UART-Wiederverbindungsversuchen
+UART_RECONNECT_DELAY_MAX = 30.0
+
+
+class AsyncMQTTHandler(MQTTHandler):
+    """
+    MQTTHandler, dessen Socket von einer asyncio-Eventloop statt von
+    client.loop() bedient wird. Nachrichten werden direkt im Loop-Thread an
+    den Callback übergeben.
+    """
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger, message_callback: Callable):
+        """
+        Initialisiert den Handler.
+
+        Parameter:
+        config (dict): Die MQTT-Konfiguration
+        logger (logging.Logger): Der Logger für Ausgaben
+        message_callback (Callable): Callback-Funktion für empfangene Nachrichten
+        """
+        super().__init__(config, logger, message_callback)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Meldet die Socket-Callbacks von paho an der Eventloop an.
+        Muss im Loop-Thread und vor connect() aufgerufen werden.
+
+        Parameter:
+        loop (asyncio.AbstractEventLoop): Die laufende Eventloop
+        """
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def _in_loop(self, callback: Callable, *args) -> None:
+        """
+        Führt callback im Loop-Thread aus. paho ruft die Socket-Callbacks auch
+        aus reconnect() im Executor-Thread auf; dann wird der Aufruf per
+        call_soon_threadsafe eingeplant und abgewartet, damit paho den Socket
+        erst nach dem Abmelden schließt.
+        """
+        if threading.get_ident() == self._loop_thread:
+            callback(*args)
+            return
+        done = Future()
+
+        def run():
+            try:
+                callback(*args)
+                done.set_result(None)
+            except Exception as e:
+                done.set_exception(e)
+
+        self._loop.call_soon_threadsafe(run)
+        done.result()
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._in_loop(self._loop.add_reader, sock, client.loop_read)
+
+    def _on_socket_close(self, client, userdata, sock):
+        self._in_loop(self._remove_socket, sock)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._in_loop(self._loop.add_writer, sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._in_loop(self._loop.remove_writer, sock)
+
+    def _remove_socket(self, sock) -> None:
+        self._loop.remove_reader(sock)
+        self._loop.remove_writer(sock)
+
+    def loop(self, timeout: float = 1.0) -> None:
+        """Im asyncio-Betrieb ohne Wirkung, die Eventloop bedient den Socket."""
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        """
+        Führt die periodischen MQTT-Aufgaben (Keep-Alive, Wiederverbindung)
+        aus, bis stop_event gesetzt wird.
+
+        Parameter:
+        stop_event (asyncio.Event): Signal zum Beenden
+        """
+        mqtt_config = self.config.get("mqtt", {})
+        delay_min = mqtt_config.get("reconnect_delay_min", 1)
+        delay_max = mqtt_config.get("reconnect_delay_max", 120)
+        delay = delay_min
+        next_attempt = 0.0
+
+        while not stop_event.is_set():
+            if self.client.loop_misc() == mqtt.MQTT_ERR_NO_CONN and time.monotonic() >= next_attempt:
+                try:
+                    # Verbindungsaufbau (DNS, TCP) im Executor, die Loop bedient weiter die UARTs
+                    await asyncio.get_running_loop().run_in_executor(None, self.client.reconnect)
+                    self.logger.info("MQTT-Wiederverbindung hergestellt")
+                    delay = delay_min
+                except Exception as e:
+                    self.logger.warning(f"MQTT-Wiederverbindung fehlgeschlagen, neuer Versuch in {delay}s: {e}")
+                    next_attempt = time.monotonic() + delay
+                    delay = min(delay * 2, delay_max)
+            try:
+                await asyncio.wait_for(stop_event.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    def disconnect(self) -> None:
+        """Trennt die MQTT-Verbindung."""
+        try:
+            if self.client:
+                self.client.disconnect()
+                self.logger.info("MQTT-Verbindung getrennt")
+        except Exception as e:
+            self.logger.debug(f"Fehler beim Trennen der MQTT-Verbindung: {e}")
+
+
+class AsyncSerialTransport:
+    """
+    Nicht-blockierender UART-Transport auf dem Dateideskriptor des
+    UARTCommunicator. Bietet dieselbe submit()-Schnittstelle wie der
+    CoalescingWriter; alle in einem Loop-Durchlauf eingereihten Frames gehen
+    mit einem write() an den Treiber.
+
+    Ohne Dateideskriptor (z. B. Windows) werden die Frames der Reihe nach in
+    einem einzelnen Hilfsthread über UARTCommunicator.send() geschrieben.
+    """
+
+    def __init__(self, uart_comm: UARTCommunicator, logger: logging.Logger):
+        """
+        Initialisiert den Transport.
+
+        Parameter:
+        uart_comm (UARTCommunicator): Die geöffnete UART-Schnittstelle
+        logger (logging.Logger): Der Logger für Ausgaben
+        """
+        self.uart_comm = uart_comm
+        self.logger = logger
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fd: Optional[int] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._buffer = bytearray()
+        self._waiters = deque()  # (Byte-Ende des Frames, Callback)
+        self._queued = 0
+        self._written = 0
+        self._writing = False
+        self._down = False
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Bindet den Transport an die Eventloop.
+
+        Parameter:
+        loop (asyncio.AbstractEventLoop): Die Eventloop, Standard: die laufende
+        """
+        self._loop = loop or asyncio.get_running_loop()
+        self._open_fd()
+
+    def _open_fd(self) -> None:
+        """Schaltet den UART-Deskriptor auf nicht-blockierend."""
+        try:
+            fd = self.uart_comm.ser.fileno()
+            os.set_blocking(fd, False)
+            self._fd = fd
+            self.logger.info(f"Asynchroner UART-Transport auf Deskriptor {fd}")
+        except Exception as e:
+            self._fd = None
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="uart-async")
+            self.logger.info(f"UART ohne nutzbaren Deskriptor ({e}), schreibe über Hilfsthread")
+
+    def submit(self, data: bytes, callback: Optional[Callable[[bool], None]] = None,
+               device: Optional[str] = None, fport: Optional[int] = None, priority: int = 0) -> None:
+        """
+        Reiht einen Frame ein. Muss im Thread der Eventloop aufgerufen werden.
+
+        Parameter:
+        data (bytes): Der fertige UART-Frame
+        callback (Callable): Optionaler Callback callback(success)
+        device (str): Optionaler Device-Name
+        fport (int): Optionaler LoRaWAN fPort
+        priority (int): Prioritätsklasse (ohne Wirkung, der Transport schreibt in Ankunftsreihenfolge)
+        """
+        if self._down:
+            # UART getrennt, Wiederverbindung läuft im Hintergrund
+            self._notify(callback, False)
+            return
+
+        if self._fd is None:
+            future = self._loop.run_in_executor(self._executor, self.uart_comm.send, data)
+            if callback:
+                future.add_done_callback(
+                    lambda f: self._notify(callback, not f.cancelled() and f.exception() is None and f.result())
+                )
+            return
+
+        self._buffer += data
+        self._queued += len(data)
+        self._waiters.append((self._queued, callback))
+        if not self._writing:
+            self._on_writable()
+
+    def pending(self) -> int:
+        """Gibt die Anzahl noch nicht vollständig geschriebener Frames zurück."""
+        return len(self._waiters)
+
+    def _on_writable(self) -> None:
+        """Schreibt so viel des Puffers, wie der Treiber annimmt."""
+        try:
+            written = os.write(self._fd, self._buffer)
+        except BlockingIOError:
+            written = 0
+        except OSError as e:
+            self._fail(e)
+            return
+
+        if written:
+            del self._buffer[:written]
+            self._written += written
+            while self._waiters and self._waiters[0][0] <= self._written:
+                self._notify(self._waiters.popleft()[1], True)
+
+        if self._buffer and not self._writing:
+            self._loop.add_writer(self._fd, self._on_writable)
+            self._writing = True
+        elif not self._buffer and self._writing:
+            self._loop.remove_writer(self._fd)
+            self._writing = False
+
+    def _fail(self, error: Exception) -> None:
+        """
+        Verwirft den Puffer nach einem Schreibfehler, gibt den Deskriptor frei
+        und startet die Wiederverbindung im Hintergrund.
+        """
+        self.logger.error(f"UART Fehler im asynchronen Transport: {error}")
+        if self._writing:
+            self._loop.remove_writer(self._fd)
+            self._writing = False
+        # Die Nummer kann nach dem Schließen neu vergeben werden (z. B. an den MQTT-Socket)
+        self._fd = None
+        self._down = True
+        self._buffer.clear()
+        self._written = self._queued
+        while self._waiters:
+            self._notify(self._waiters.popleft()[1], False)
+
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    def _reopen(self) -> None:
+        """Schließt und öffnet den UART neu (blockierend, läuft im Executor)."""
+        self.uart_comm.close()
+        self.uart_comm._setup_uart()
+
+    async def _reconnect(self) -> None:
+        """Öffnet den UART mit exponentiellem Backoff neu, ohne die Eventloop zu blockieren."""
+        delay = self.uart_comm.config.get("system", {}).get("retry_delay", 0.5)
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._loop.run_in_executor(None, self._reopen)
+            except Exception as e:
+                delay = min(delay * 2, UART_RECONNECT_DELAY_MAX)
+                self.logger.error(f"UART-Wiederverbindung fehlgeschlagen, neuer Versuch in {delay}s: {e}")
+                continue
+            self._open_fd()
+            self._down = False
+            self.logger.info("UART-Wiederverbindung hergestellt")
+            return
+
+    def _notify(self, callback: Optional[Callable[[bool], None]], success: bool) -> None:
+        """Ruft einen Frame-Callback auf."""
+        if callback:
+            try:
+                callback(success)
+            except Exception as e:
+                self.logger.error(f"Fehler im UART-Callback: {e}")
+
+    async def drain(self, timeout: float = 5.0) -> None:
+        """
+        Wartet, bis alle eingereihten Frames geschrieben sind.
+
+        Parameter:
+        timeout (float): Maximale Wartezeit in Sekunden
+        """
+        deadline = time.monotonic() + timeout
+        while self._buffer and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        if self._buffer:
+            self.logger.warning(f"UART-Transport nicht rechtzeitig geleert, {self.pending()} Frames offen")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Löst den Transport von der Eventloop. Anstehende Frames werden vorher
+        mit drain() geschrieben.
+
+        Parameter:
+        timeout (float): Maximale Wartezeit für den Hilfsthread (ohne Wirkung)
+        """
+        if self._writing:
+            self._loop.remove_writer(self._fd)
+            self._writing = False
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class AsyncBridgeEngine:
+    """
+    Betreibt MQTT und alle UART-Transporte in einer asyncio-Eventloop.
+    Ersetzt die blockierende Hauptschleife von main.py.
+    """
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger,
+                 mqtt_handler: AsyncMQTTHandler, transports: List[AsyncSerialTransport],
+                 periodic: Optional[Callable[[], None]] = None):
+        """
+        Initialisiert die Engine.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        mqtt_handler (AsyncMQTTHandler): Der MQTT-Handler
+        transports (List[AsyncSerialTransport]): Die UART-Transporte
+        periodic (Callable): Optional alle stats_interval Sekunden aufgerufen
+        """
+        system_config = config.get("system", {})
+
+        self.logger = logger
+        self.mqtt_handler = mqtt_handler
+        self.transports = transports
+        self.periodic = periodic
+        self.stats_interval = system_config.get("stats_interval", 300)
+        self.shutdown_timeout = system_config.get("graceful_shutdown_timeout", 5)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+
+    def run(self) -> bool:
+        """
+        Startet die Eventloop und blockiert bis zum Beenden.
+
+        Rückgabewert:
+        bool: False, wenn keine MQTT-Verbindung aufgebaut werden konnte
+        """
+        return asyncio.run(self._main())
+
+    def stop(self) -> None:
+        """Beendet die Engine, auch aus einem anderen Thread."""
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def _main(self) -> bool:
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self._on_signal)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows oder nicht im Hauptthread
+
+        for transport in self.transports:
+            transport.start(self._loop)
+        self.mqtt_handler.attach(self._loop)
+
+        if not self.mqtt_handler.connect():
+            self.logger.error("Unable to connect to MQTT Broker")
+            self._stop_transports()
+            return False
+
+        mqtt_task = asyncio.create_task(self.mqtt_handler.run(self._stop_event))
+        self.logger.info("ChirpStack MQTT to UART Bridge started successfully (asyncio engine)")
+
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), self.stats_interval)
+                except asyncio.TimeoutError:
+                    if self.periodic:
+                        self.periodic()
+        finally:
+            self.logger.info("Shutting down...")
+            self._stop_event.set()
+            await mqtt_task
+            self.mqtt_handler.disconnect()
+            for transport in self.transports:
+                await transport.drain(self.shutdown_timeout)
+            self._stop_transports()
+        return True
+
+    def _on_signal(self) -> None:
+        self.logger.info("Shutdown signal received")
+        self._stop_event.set()
+
+    def _stop_transports(self) -> None:
+        for transport in self.transports:
+            transport.stop()
@@ -53,19 +53,93 @@ def get_default_config() -> Dict[str, Any]:
             "xonxoff": False,
             "rtscts": False,
             "dsrdtr": False,
-            "max_payload_size": 255
+            "max_payload_size": 255,
+            "frame_format": "text",
+            "table_resend_interval": 60,
+            "write_coalescing": False,
+            "coalesce_max_bytes": 512,
+            "coalesce_max_delay": 0.002
+        },
+        "uart_ports": [],
+        "routing": {
+            "rules": [],
+            "default": "hash"
         },
         "logging": {
             "level": "INFO",
             "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
             "file": "chirpstack_bridge.log",
             "max_file_size": "10MB",
-            "backup_count": 5
+            "backup_count": 5,
+            "async": False,
+            "queue_size": 10000,
+            "batch_size": 256,
+            "payload_dump": {
+                "level": "DEBUG",
+                "full_per_device": 10,
+                "sample_every": 100,
+                "devices": []
+            }
         },
         "system": {
             "stats_interval": 300,
+            "stats_top_devices": 5,
+            "silent_after": 900,
             "retry_attempts": 3,
             "retry_delay": 0.5,
-            "graceful_shutdown_timeout": 5
+            "graceful_shutdown_timeout": 5,
+            "engine": "sync"
+        },
+        "parser": {
+            "backend": "auto",
+            "lazy": True,
+            "encoding_learn_count": 3
+        },
+        "schemas": {
+            "definitions": {},
+            "devices": {},
+            "fports": {}
+        },
+        "dedup": {
+            "enabled": False,
+            "ttl": 60.0,
+            "max_entries": 65536
+        },
+        "scheduler": {
+            "enabled": False,
+            "classes": [],
+            "default_class": "default",
+            "quantum": 256,
+            "device_weights": {}
+        },
+        "pacing": {
+            "enabled": False,
+            "rate_factor": 1.0,
+            "burst_bytes": 512,
+            "max_backlog": 2.0,
+            "shed_policy": "drop_oldest",
+            "ttl": 10.0
+        },
+        "spool": {
+            "enabled": False,
+            "path": "spool",
+            "segment_size": 1048576,
+            "segments": 8,
+            "fsync_interval": 1.0,
+            "overflow_policy": "drop_oldest",
+            "replay_rate": 0,
+            "retry_interval": 5.0
+        },
+        "metrics": {
+            "enabled": False,
+            "host": "0.0.0.0",
+            "port": 9108,
+            "path": "/metrics"
+        },
+        "pipeline": {
+            "enabled": False,
+            "queue_size": 1000,
+            "overflow_policy": "drop_oldest",
+            "put_timeout": 0.1
         }
     }
@@ -0,0 +1,141 @@
+"""Uplink de-duplication module for ChirpStack MQTT to UART Bridge.
+
+Überlappende Gateways und MQTT-Redelivery (QoS > 0) können dasselbe Uplink
+mehrfach zustellen. Ein Uplink ist eindeutig durch DevEUI und Frame Counter
+bestimmt; die DevEUI steht bei ChirpStack im Topic (device/{devEui}/...).
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+
+class DedupCache:
+    """
+    Begrenzter LRU-Cache mit TTL über (DevEUI, fCnt). Die Einträge liegen in
+    Einfügereihenfolge, sodass abgelaufene Einträge immer vorne stehen und in
+    O(1) pro Eintrag entfernt werden; ist der Cache voll, fällt der älteste
+    Eintrag heraus. Pro Gerät werden geprüfte Uplinks und Duplikate gezählt.
+    """
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger):
+        """
+        Initialisiert den Cache.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        """
+        dedup_config = config.get("dedup", {})
+
+        self.logger = logger
+        self.ttl = float(dedup_config.get("ttl", 60.0))
+        self.max_entries = max(1, int(dedup_config.get("max_entries", 65536)))
+        self.checked = 0
+        self.duplicates = 0
+        self._seen: "OrderedDict[tuple, float]" = OrderedDict()
+        # Device -> [geprüft, Duplikate]
+        self._devices: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, dev_eui: str, fcnt: Optional[int]) -> bool:
+        """
+        Prüft, ob ein Uplink innerhalb des Zeitfensters bereits gesehen wurde,
+        und merkt ihn sich andernfalls vor.
+
+        Parameter:
+        dev_eui (str): Die DevEUI des Geräts
+        fcnt (int): Der Frame Counter (None: keine Prüfung möglich)
+
+        Rückgabewert:
+        bool: True, wenn der Uplink ein Duplikat ist
+        """
+        if fcnt is None:
+            return False
+
+        key = (dev_eui, fcnt)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now - self.ttl)
+            counts = self._devices.get(dev_eui)
+            if counts is None:
+                counts = self._devices[dev_eui] = [0, 0]
+            counts[0] += 1
+            self.checked += 1
+
+            if key in self._seen:
+                counts[1] += 1
+                self.duplicates += 1
+                return True
+
+            self._seen[key] = now
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return False
+
+    def _expire(self, cutoff: float) -> None:
+        """Entfernt alle Einträge, die vor cutoff eingefügt wurden."""
+        seen = self._seen
+        while seen:
+            key = next(iter(seen))
+            if seen[key] > cutoff:
+                break
+            del seen[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Gibt die Cache-Statistiken zurück.
+
+        Rückgabewert:
+        dict: Einträge, geprüfte Uplinks, Duplikate und Duplikatrate
+        """
+        with self._lock:
+            return {
+                'entries': len(self._seen),
+                'checked': self.checked,
+                'duplicates': self.duplicates,
+                'duplicate_rate': self.duplicates / self.checked if self.checked else 0.0
+            }
+
+    def get_device_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Gibt die Duplikatrate pro Gerät zurück.
+
+        Rückgabewert:
+        dict: Device -> geprüfte Uplinks, Duplikate und Duplikatrate
+        """
+        with self._lock:
+            return {
+                device: {
+                    'checked': checked,
+                    'duplicates': duplicates,
+                    'duplicate_rate': duplicates / checked
+                }
+                for device, (checked, duplicates) in self._devices.items()
+            }
+
+    def log_summary(self, top: int = 5) -> None:
+        """
+        Gibt die Gesamtrate und die Geräte mit den meisten Duplikaten aus.
+
+        Parameter:
+        top (int): Anzahl der aufgeführten Geräte
+        """
+        stats = self.get_stats()
+        if not stats['checked']:
+            return
+        message = (
+            f"Dedup - Geprüft: {stats['checked']}, Duplikate: {stats['duplicates']} "
+            f"({stats['duplicate_rate']:.1%}), Einträge: {stats['entries']}"
+        )
+        devices = sorted(
+            ((device, values) for device, values in self.get_device_stats().items() if values['duplicates']),
+            key=lambda item: item[1]['duplicates'], reverse=True
+        )[:top]
+        if devices:
+            message += ", Top: " + ', '.join(
+                f"{device}: {values['duplicates']} ({values['duplicate_rate']:.1%})" for device, values in devices
+            )
+        self.logger.info(message)
@@ -0,0 +1,120 @@
+"""Event parser module for ChirpStack MQTT to UART Bridge."""
+
+import re
+import json
+import logging
+from typing import Dict, Any, Callable, Iterable, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+UPLINK_FIELDS = ('data', 'fCnt', 'fPort')
+BACKENDS = ('auto', 'orjson', 'json')
+
+# Top-Level-Keys mit umfangreichen Metadaten, die die Bridge nicht benötigt.
+# Ein unmaskiertes ,"rxInfo": kann nicht innerhalb eines JSON-Strings stehen.
+_BULKY_KEY = re.compile(rb',\s*"(?:rxInfo|txInfo)"\s*:')
+
+
+class EventParser:
+    """
+    Liest die benötigten Felder aus ChirpStack-Events.
+
+    Verwendet orjson, falls installiert, sonst das json-Modul. Im Lazy-Modus
+    wird das Event vor dem ersten rxInfo/txInfo abgeschnitten und nur dieser
+    Präfix geparst; fehlen dort Felder, wird das komplette Event geparst.
+    Trifft der Fast-Path dauerhaft nicht (andere Feldreihenfolge), wird er
+    automatisch abgeschaltet.
+    """
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger,
+                 fields: Iterable[str] = UPLINK_FIELDS):
+        """
+        Initialisiert den Parser.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        fields (Iterable[str]): Die benötigten Top-Level-Felder
+        """
+        parser_config = config.get("parser", {})
+
+        self.logger = logger
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self.lazy = parser_config.get("lazy", True)
+        self.backend, self._loads = self._select_backend(parser_config.get("backend", "auto"))
+        self.fast_path_hits = 0
+        self.fallbacks = 0
+
+    def _select_backend(self, backend: str) -> Tuple[str, Callable]:
+        """Wählt die JSON-Implementierung."""
+        if backend not in BACKENDS:
+            self.logger.warning(f"Unbekanntes Parser-Backend '{backend}', verwende 'auto'")
+            backend = "auto"
+        if backend in ("auto", "orjson") and orjson is not None:
+            return "orjson", orjson.loads
+        if backend == "orjson":
+            self.logger.warning("orjson nicht installiert, verwende json")
+        return "json", json.loads
+
+    def parse(self, payload: bytes) -> Dict[str, Any]:
+        """
+        Parst ein Event und gibt nur die angeforderten Felder zurück.
+
+        Parameter:
+        payload (bytes): Die rohe MQTT-Payload (JSON)
+
+        Rückgabewert:
+        dict: Die vorhandenen angeforderten Felder
+
+        Fehler:
+        ValueError: Bei ungültigem JSON oder wenn das Event kein Objekt ist
+        """
+        if self.lazy:
+            fields = self._parse_prefix(payload)
+            if fields is not None:
+                return fields
+
+        event = self._loads(payload)
+        if not isinstance(event, dict):
+            raise ValueError("Event ist kein JSON-Objekt")
+        return {key: event[key] for key in self.fields if key in event}
+
+    def _parse_prefix(self, payload: bytes):
+        """Parst nur den Teil vor den Metadaten; None, wenn das nicht reicht."""
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+
+        match = _BULKY_KEY.search(payload)
+        if match:
+            try:
+                event = self._loads(payload[:match.start()] + b'}')
+            except ValueError:
+                # Key lag nicht auf oberster Ebene
+                event = None
+            if isinstance(event, dict) and all(key in event for key in self.fields):
+                self.fast_path_hits += 1
+                return {key: event[key] for key in self.fields}
+
+        self.fallbacks += 1
+        if self.fallbacks >= 100 and self.fallbacks > 10 * self.fast_path_hits:
+            self.lazy = False
+            self.logger.info("Event-Fast-Path trifft nicht, parse Events ab jetzt vollständig")
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Gibt die Parser-Statistiken zurück.
+
+        Rückgabewert:
+        dict: Backend, Fast-Path-Treffer und Fallbacks
+        """
+        return {
+            'backend': self.backend,
+            'lazy': self.lazy,
+            'fast_path_hits': self.fast_path_hits,
+            'fallbacks': self.fallbacks
+        }
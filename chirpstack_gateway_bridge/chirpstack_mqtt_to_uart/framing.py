@@ -0,0 +1,219 @@
+"""Binary UART framing module for ChirpStack MQTT to UART Bridge.
+
+Frame-Aufbau (alle Mehrbyte-Felder Big Endian):
+
+    Daten-Frame:    0xA5 | Device-Index | Länge | fPort | Payload | CRC-16
+    Tabellen-Frame: 0xA6 | Device-Index | Länge | Device-Name (UTF-8) | CRC-16
+
+Die CRC-16/CCITT-FALSE (Init 0xFFFF) wird über alle Bytes nach dem Startbyte
+berechnet. Der Empfänger baut aus den Tabellen-Frames die Zuordnung
+Index -> Device-Name auf; Index 0xFF steht für ein nicht zugeordnetes Gerät.
+"""
+
+import time
+import struct
+import logging
+import binascii
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+
+DATA_FRAME_START = 0xA5
+TABLE_FRAME_START = 0xA6
+UNKNOWN_DEVICE_INDEX = 0xFF
+MAX_DEVICES = 255
+# Das Längenfeld des Daten-Frames ist ein Byte
+MAX_PAYLOAD_SIZE = 255
+
+_CRC = struct.Struct(">H")
+
+
+def crc16(data: bytes) -> int:
+    """
+    Berechnet die CRC-16/CCITT-FALSE.
+
+    Parameter:
+    data (bytes): Die zu prüfenden Daten
+
+    Rückgabewert:
+    int: Die Prüfsumme
+    """
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def split_table_frames(data: bytes) -> Tuple[bytes, bytes]:
+    """
+    Trennt die Tabellen-Frames am Anfang eines von build_frame erzeugten
+    Puffers vom Rest.
+
+    Parameter:
+    data (bytes): Der Puffer
+
+    Rückgabewert:
+    Tuple[bytes, bytes]: (Tabellen-Frames, Rest)
+    """
+    offset = 0
+    while len(data) >= offset + 3 and data[offset] == TABLE_FRAME_START:
+        offset += 3 + data[offset + 2] + 2
+    return data[:offset], data[offset:]
+
+
+class Frame(NamedTuple):
+    """Ein dekodierter Frame aus dem UART-Datenstrom."""
+    kind: int
+    device_index: int
+    fport: Optional[int]
+    data: bytes
+
+
+class BinaryFramer:
+    """Erstellt binäre UART-Frames und verwaltet die Device-Tabelle."""
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger):
+        """
+        Initialisiert den Framer.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        """
+        uart_config = config.get("uart", {})
+
+        self.logger = logger
+        self.table_resend_interval = uart_config.get("table_resend_interval", 60)
+        self.device_table: Dict[str, int] = {}
+        self._table_frames: Dict[int, bytes] = {}
+        self._last_table_sync = time.monotonic()
+        self._table_full_logged = False
+
+    def build_frame(self, device_name: str, payload: bytes, fport: Optional[int] = None) -> Optional[bytes]:
+        """
+        Erstellt einen Daten-Frame. Für neue Geräte wird der Tabellen-Frame
+        vorangestellt, nach table_resend_interval die komplette Tabelle.
+
+        Parameter:
+        device_name (str): Der Name des Geräts
+        payload (bytes): Die binären Daten der Nachricht (max. 255 Bytes)
+        fport (int): Der LoRaWAN fPort (0 wenn unbekannt)
+
+        Rückgabewert:
+        Optional[bytes]: Der Frame inklusive eventuell nötiger Tabellen-Frames,
+                         None wenn die Payload nicht in einen Frame passt
+        """
+        if len(payload) > MAX_PAYLOAD_SIZE:
+            self.logger.error(
+                f"Payload von {device_name} zu groß für Binär-Frame: {len(payload)} Bytes "
+                f"(max: {MAX_PAYLOAD_SIZE})"
+            )
+            return None
+
+        prefix = b''
+        index = self.device_table.get(device_name)
+        if index is None:
+            index, prefix = self._register_device(device_name)
+
+        if self.table_resend_interval and \
+                time.monotonic() - self._last_table_sync >= self.table_resend_interval:
+            prefix = self.table_sync_frames()
+
+        body = bytes((index, len(payload), (fport or 0) & 0xFF)) + payload
+        return prefix + bytes((DATA_FRAME_START,)) + body + _CRC.pack(crc16(body))
+
+    def table_sync_frames(self) -> bytes:
+        """
+        Gibt die komplette Device-Tabelle als Folge von Tabellen-Frames zurück.
+
+        Rückgabewert:
+        bytes: Alle Tabellen-Frames
+        """
+        self._last_table_sync = time.monotonic()
+        return b''.join(self._table_frames.values())
+
+    def _register_device(self, device_name: str):
+        """Weist einem neuen Gerät einen Index zu und erstellt dessen Tabellen-Frame."""
+        if len(self.device_table) >= MAX_DEVICES:
+            if not self._table_full_logged:
+                self.logger.warning(
+                    f"Device-Tabelle voll ({MAX_DEVICES} Einträge), "
+                    f"weitere Geräte erhalten Index 0x{UNKNOWN_DEVICE_INDEX:02X}"
+                )
+                self._table_full_logged = True
+            return UNKNOWN_DEVICE_INDEX, b''
+
+        index = len(self.device_table)
+        name = device_name.encode('utf-8')[:255]
+        body = bytes((index, len(name))) + name
+        frame = bytes((TABLE_FRAME_START,)) + body + _CRC.pack(crc16(body))
+
+        self.device_table[device_name] = index
+        self._table_frames[index] = frame
+        self.logger.info(f"Device '{device_name}' in UART-Tabelle als Index {index} eingetragen")
+        return index, frame
+
+
+class FrameParser:
+    """
+    Zerlegt einen UART-Datenstrom in Frames. Bei CRC-Fehlern wird ab dem
+    nächsten Startbyte neu synchronisiert.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.device_names: Dict[int, str] = {}
+        self.crc_errors = 0
+
+    def feed(self, data: bytes) -> List[Frame]:
+        """
+        Verarbeitet empfangene Bytes.
+
+        Parameter:
+        data (bytes): Neu empfangene Daten
+
+        Rückgabewert:
+        List[Frame]: Alle vollständig empfangenen, gültigen Frames
+        """
+        buffer = self._buffer
+        buffer += data
+        frames = []
+
+        while True:
+            start = self._find_start(buffer)
+            if start < 0:
+                buffer.clear()
+                break
+            if start:
+                del buffer[:start]
+
+            kind = buffer[0]
+            header_len = 4 if kind == DATA_FRAME_START else 3
+            if len(buffer) < header_len:
+                break
+            length = buffer[2]
+            total = header_len + length + 2
+            if len(buffer) < total:
+                break
+
+            body = bytes(buffer[1:total - 2])
+            if _CRC.unpack_from(buffer, total - 2)[0] != crc16(body):
+                self.crc_errors += 1
+                del buffer[:1]
+                continue
+
+            del buffer[:total]
+            if kind == DATA_FRAME_START:
+                frames.append(Frame(kind, body[0], body[2], body[3:]))
+            else:
+                self.device_names[body[0]] = body[2:].decode('utf-8', errors='replace')
+                frames.append(Frame(kind, body[0], None, body[2:]))
+
+        return frames
+
+    @staticmethod
+    def _find_start(buffer: bytearray) -> int:
+        """Sucht das nächste Startbyte eines Daten- oder Tabellen-Frames."""
+        data_pos = buffer.find(DATA_FRAME_START)
+        table_pos = buffer.find(TABLE_FRAME_START)
+        if data_pos < 0:
+            return table_pos
+        if table_pos < 0:
+            return data_pos
+        return min(data_pos, table_pos)
@@ -0,0 +1,143 @@
+"""Latency histogram module for ChirpStack MQTT to UART Bridge.
+
+Die Buckets sind wie bei HdrHistogram log-linear aufgeteilt: Werte in
+Mikrosekunden unter 2 * SUB_BUCKETS liegen exakt in einem eigenen Bucket,
+darüber wird jede Zweierpotenz in SUB_BUCKETS gleich breite Buckets
+geteilt. Der relative Fehler eines Perzentils liegt damit unter
+1 / SUB_BUCKETS (6,25 %), unabhängig von der Größenordnung.
+"""
+
+import threading
+from typing import Dict, Any, Iterable, List
+
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def _bucket_index(value: int) -> int:
+    """Bucket eines Werts in Mikrosekunden."""
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_upper(index: int) -> int:
+    """Größter Wert in Mikrosekunden, der in einen Bucket fällt."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index - shift * SUB_BUCKETS
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Latenz-Histogramm mit festen Buckets. record() kostet eine Indexberechnung
+    und ein Inkrement; get_stats() läuft einmal über die Buckets und ist damit
+    unabhängig von der Anzahl der erfassten Werte.
+    """
+
+    def __init__(self, max_seconds: float = 3600.0):
+        """
+        Initialisiert ein leeres Histogramm.
+
+        Parameter:
+        max_seconds (float): Größter unterscheidbarer Wert, größere Werte landen im letzten Bucket
+        """
+        self.max_value = max(2 * SUB_BUCKETS, int(max_seconds * 1_000_000))
+        self._counts: List[int] = [0] * (_bucket_index(self.max_value) + 1)
+        self._count = 0
+        self._total = 0
+        self._max = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """
+        Erfasst eine Latenz.
+
+        Parameter:
+        seconds (float): Latenz in Sekunden
+        """
+        value = int(seconds * 1_000_000)
+        if value < 0:
+            value = 0
+        elif value > self.max_value:
+            value = self.max_value
+        index = _bucket_index(value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._total += value
+            if value > self._max:
+                self._max = value
+
+    def get_stats(self, percentiles: Iterable[float] = (0.50, 0.95, 0.99)) -> Dict[str, Any]:
+        """
+        Gibt Anzahl, Mittelwert, Perzentile und Maximum zurück. Ein Perzentil
+        ist die Obergrenze seines Buckets, höchstens aber das Maximum.
+
+        Parameter:
+        percentiles (Iterable[float]): Gewünschte Perzentile als Anteil (0.99 = p99)
+
+        Rückgabewert:
+        dict: count, mean, p50/p95/p99 (je nach Auswahl) und max, Zeiten in Sekunden
+        """
+        with self._lock:
+            counts = self._counts[:]
+            count, total, maximum = self._count, self._total, self._max
+
+        stats = {'count': count, 'mean': total / count / 1_000_000 if count else 0.0}
+        targets = sorted((fraction, f"p{fraction * 100:g}") for fraction in percentiles)
+        cumulative = 0
+        index = 0
+        for fraction, name in targets:
+            if not count:
+                stats[name] = 0.0
+                continue
+            rank = max(1, int(fraction * count + 0.5))
+            while cumulative + counts[index] < rank:
+                cumulative += counts[index]
+                index += 1
+            stats[name] = min(_bucket_upper(index), maximum) / 1_000_000
+        stats['max'] = maximum / 1_000_000
+        return stats
+
+    def get_buckets(self, bounds: Iterable[float]) -> Dict[str, Any]:
+        """
+        Gibt kumulative Zähler für vorgegebene Grenzen zurück (z. B. für den
+        Export als Prometheus-Histogramm). Ein Bucket zählt zu einer Grenze,
+        wenn seine Obergrenze nicht darüber liegt.
+
+        Parameter:
+        bounds (Iterable[float]): Aufsteigende Grenzen in Sekunden
+
+        Rückgabewert:
+        dict: buckets [(Grenze, Anzahl <= Grenze)], count und sum (Sekunden)
+        """
+        with self._lock:
+            counts = self._counts[:]
+            count, total = self._count, self._total
+
+        buckets = []
+        cumulative = 0
+        index = 0
+        for bound in bounds:
+            value = min(int(bound * 1_000_000), self.max_value)
+            last = _bucket_index(value)
+            if _bucket_upper(last) > value:
+                last -= 1
+            while index <= last:
+                cumulative += counts[index]
+                index += 1
+            buckets.append((bound, cumulative))
+        return {'buckets': buckets, 'count': count, 'sum': total / 1_000_000}
+
+    def reset(self) -> None:
+        """Löscht alle erfassten Werte."""
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self._count = 0
+            self._total = 0
+            self._max = 0
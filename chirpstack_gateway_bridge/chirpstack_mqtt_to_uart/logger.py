@@ -1,47 +1,221 @@
 """Logger module for ChirpStack MQTT to UART Bridge."""
 
+import os
 import sys
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
-from typing import Dict, Any
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from typing import Dict, Any, Optional
+
+
+class _DeferredFlushMixin:
+    """Unterdrückt das flush() pro Record; der Listener flusht einmal pro Batch."""
+
+    def flush(self) -> None:
+        pass
+
+    def flush_batch(self) -> None:
+        """Schreibt die gepufferten Daten tatsächlich aus."""
+        super().flush()
+
+
+class BatchStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    """StreamHandler, der nur am Ende eines Batches flusht."""
+
+
+class BatchRotatingFileHandler(_DeferredFlushMixin, RotatingFileHandler):
+    """
+    RotatingFileHandler, der nur am Ende eines Batches flusht. Die Dateigröße
+    wird mitgezählt, da das seek()/tell() der Basisklasse den Puffer bei
+    jedem Record leeren würde.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        try:
+            self._size = os.path.getsize(self.baseFilename)
+        except OSError:
+            self._size = 0
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.maxBytes <= 0:
+            return False
+        length = len(self.format(record)) + len(self.terminator)
+        if self._size and self._size + length >= self.maxBytes:
+            # Der auslösende Record ist der erste in der neuen Datei
+            self._size = length
+            return True
+        self._size += length
+        return False
+
+
+class DropOldestQueueHandler(QueueHandler):
+    """
+    QueueHandler mit begrenzter Queue: ist sie voll, wird der älteste Record
+    verworfen, sodass der aufrufende Thread nie auf den Log-Speicher wartet.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Läuft unter dem Handler-Lock, dropped braucht keinen eigenen Lock
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    QueueListener, der alle anstehenden Records (bis batch_size) ausgibt und
+    die Handler danach einmal flusht.
+    """
+
+    def __init__(self, log_queue: queue.Queue, *handlers, batch_size: int = 256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = max(1, batch_size)
+
+    def enqueue_sentinel(self) -> None:
+        # Blockierend, da die Queue beim Beenden voll sein kann
+        self.queue.put(self._sentinel)
+
+    def _monitor(self) -> None:
+        while True:
+            record = self.dequeue(True)
+            count = 0
+            while record is not self._sentinel:
+                self.handle(record)
+                count += 1
+                if count >= self.batch_size:
+                    break
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+            self.flush_handlers()
+            if record is self._sentinel:
+                break
+
+    def flush_handlers(self) -> None:
+        """Flusht alle Handler einmal."""
+        for handler in self.handlers:
+            try:
+                if hasattr(handler, 'flush_batch'):
+                    handler.flush_batch()
+                else:
+                    handler.flush()
+            except Exception:
+                handler.handleError(None)
+
+
+# Aktiver Listener im asynchronen Modus
+_log_listener: Optional[BatchingQueueListener] = None
+_queue_handler: Optional[DropOldestQueueHandler] = None
 
 
 def setup_logging(config: Dict[str, Any]) -> logging.Logger:
     """
     Setzt das Logging-System auf.
     Verwendet eine Rotations-Strategie für Log-Dateien basierend auf der Konfiguration.
-    
+    Im asynchronen Modus schreiben die Aufrufer nur in eine begrenzte Queue,
+    ein Listener-Thread übernimmt die Ausgabe auf stdout und in die Datei.
+
     Parameter:
     config (dict): Die Konfigurationsparameter für das Logging
-    
+
     Rückgabewert:
     logging.Logger: Der konfigurierte Logger
     """
+    global _log_listener, _queue_handler
+
     log_config = config.get("logging", {})
-    
+    async_mode = log_config.get("async", False)
+
     # Datei-Größe analysieren
     max_size = log_config.get("max_file_size", "10MB")
     if max_size.endswith("MB"):
         max_bytes = int(max_size[:-2]) * 1024 * 1024
     else:
         max_bytes = 10 * 1024 * 1024  # Standardgröße 10MB
-    
+
+    stream_handler_class = BatchStreamHandler if async_mode else logging.StreamHandler
+    file_handler_class = BatchRotatingFileHandler if async_mode else RotatingFileHandler
+
     # Logging-Handler einrichten
-    handlers = [logging.StreamHandler(sys.stdout)]
-    
+    handlers = [stream_handler_class(sys.stdout)]
+
     # Dateibasiertes Logging, wenn in Konfiguration angegeben
     if log_config.get("file"):
-        file_handler = RotatingFileHandler(
+        file_handler = file_handler_class(
             log_config["file"],
             maxBytes=max_bytes,
             backupCount=log_config.get("backup_count", 5)
         )
         handlers.append(file_handler)
-    
+
+    level = getattr(logging, log_config.get("level", "INFO").upper())
+    log_format = log_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if async_mode and _log_listener is None:
+        formatter = logging.Formatter(log_format)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.Queue(maxsize=max(1, log_config.get("queue_size", 10000)))
+        _queue_handler = DropOldestQueueHandler(log_queue)
+        # Der QueueHandler setzt nur die Nachricht zusammen, das Format wenden die Ziel-Handler an
+        _queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        _log_listener = BatchingQueueListener(log_queue, *handlers,
+                                              batch_size=log_config.get("batch_size", 256))
+        _log_listener.start()
+        atexit.register(shutdown_logging)
+        handlers = [_queue_handler]
+
     logging.basicConfig(
-        level=getattr(logging, log_config.get("level", "INFO").upper()),
-        format=log_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"),
+        level=level,
+        format=log_format,
         handlers=handlers
     )
-    
+
     return logging.getLogger(__name__)
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """
+    Gibt die Statistiken der asynchronen Log-Queue zurück.
+
+    Rückgabewert:
+    dict: Modus, Queue-Tiefe, Kapazität und verworfene Records
+    """
+    if _queue_handler is None:
+        return {'async': False, 'queue_depth': 0, 'queue_size': 0, 'dropped': 0}
+    return {
+        'async': True,
+        'queue_depth': _queue_handler.queue.qsize(),
+        'queue_size': _queue_handler.queue.maxsize,
+        'dropped': _queue_handler.dropped
+    }
+
+
+def shutdown_logging() -> None:
+    """
+    Beendet den Listener-Thread, nachdem alle anstehenden Records
+    ausgegeben wurden. Im synchronen Modus ohne Wirkung.
+    """
+    global _log_listener
+
+    listener = _log_listener
+    if listener is None:
+        return
+    _log_listener = None
+    listener.stop()
+    listener.flush_handlers()
@@ -0,0 +1,316 @@
+"""OpenMetrics exporter module for ChirpStack MQTT to UART Bridge.
+
+Der Endpunkt läuft in einem eigenen Thread. Bei jedem Abruf rufen die
+registrierten Collector-Funktionen die get_stats()-Momentaufnahmen der
+Komponenten ab; die Verarbeitung der Nachrichten wird dafür nicht
+angehalten.
+"""
+
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+from .histogram import LatencyHistogram
+
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+TEXT_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket-Grenzen der exportierten Latenz-Histogramme in Sekunden
+LATENCY_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                  0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_TYPES = ("counter", "gauge", "histogram")
+
+
+class MetricFamily:
+    """Eine Metrik mit Typ, Beschreibung und ihren Samples (pro Label-Kombination)."""
+
+    __slots__ = ('name', 'type', 'help', 'samples')
+
+    def __init__(self, name: str, metric_type: str, help_text: str):
+        """
+        Initialisiert eine leere Metrik.
+
+        Parameter:
+        name (str): Name ohne Suffix (_total, _bucket, ...)
+        metric_type (str): counter, gauge oder histogram
+        help_text (str): Beschreibung
+        """
+        if metric_type not in METRIC_TYPES:
+            raise ValueError(f"Unbekannter Metrik-Typ '{metric_type}'")
+        self.name = name
+        self.type = metric_type
+        self.help = help_text
+        self.samples: List[Tuple[str, Dict[str, str], float]] = []
+
+    def add(self, value: float, **labels: Any) -> "MetricFamily":
+        """
+        Fügt einen Wert hinzu (Counter erhalten das Suffix _total).
+
+        Parameter:
+        value (float): Der Wert
+        labels: Labels des Samples
+
+        Rückgabewert:
+        MetricFamily: self, zum Verketten
+        """
+        suffix = "_total" if self.type == "counter" else ""
+        self.samples.append((suffix, labels, value))
+        return self
+
+    def add_histogram(self, histogram: LatencyHistogram, bounds: Iterable[float] = LATENCY_BOUNDS,
+                      **labels: Any) -> "MetricFamily":
+        """
+        Fügt die kumulativen Buckets, Anzahl und Summe eines Histogramms hinzu.
+
+        Parameter:
+        histogram (LatencyHistogram): Das Histogramm
+        bounds (Iterable[float]): Bucket-Grenzen in Sekunden
+        labels: Labels der Samples
+
+        Rückgabewert:
+        MetricFamily: self, zum Verketten
+        """
+        buckets = histogram.get_buckets(bounds)
+        for bound, count in buckets['buckets']:
+            self.samples.append(("_bucket", {**labels, 'le': f"{bound:g}"}, count))
+        self.samples.append(("_bucket", {**labels, 'le': "+Inf"}, buckets['count']))
+        self.samples.append(("_count", labels, buckets['count']))
+        self.samples.append(("_sum", labels, buckets['sum']))
+        return self
+
+
+def _escape(value: Any) -> str:
+    """Maskiert einen Label-Wert."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def render(families: Iterable[MetricFamily], openmetrics: bool = True) -> str:
+    """
+    Erzeugt das Textformat aller Metriken.
+
+    Parameter:
+    families (Iterable[MetricFamily]): Die Metriken
+    openmetrics (bool): OpenMetrics 1.0 statt Prometheus-Text 0.0.4
+
+    Rückgabewert:
+    str: Der Text für die HTTP-Antwort
+    """
+    lines = []
+    for family in families:
+        # Im Prometheus-Format trägt die Typzeile eines Counters das Suffix _total
+        type_name = family.name + "_total" if family.type == "counter" and not openmetrics else family.name
+        lines.append(f"# HELP {type_name} {family.help}")
+        lines.append(f"# TYPE {type_name} {family.type}")
+        for suffix, labels, value in family.samples:
+            if labels:
+                label_text = ','.join(f'{key}="{_escape(item)}"' for key, item in labels.items())
+                lines.append(f"{family.name}{suffix}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{family.name}{suffix} {_format_value(value)}")
+    if openmetrics:
+        lines.append("# EOF")
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """
+    HTTP-Endpunkt für OpenMetrics/Prometheus. Collector-Funktionen liefern
+    bei jedem Abruf eine Liste von MetricFamily-Objekten.
+    """
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger):
+        """
+        Initialisiert den Server (noch ohne zu lauschen).
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        """
+        metrics_config = config.get("metrics", {})
+
+        self.logger = logger
+        self.host = metrics_config.get("host", "0.0.0.0")
+        self.port = int(metrics_config.get("port", 9108))
+        self.path = metrics_config.get("path", "/metrics")
+        self.collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self.scrapes = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """
+        Registriert eine Collector-Funktion.
+
+        Parameter:
+        collector (Callable): Liefert die aktuellen Metriken
+        """
+        self.collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        """Ruft alle Collector auf; fehlerhafte Collector werden übersprungen."""
+        families = []
+        for collector in self.collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                self.logger.error(f"Fehler beim Sammeln der Metriken: {e}")
+        return families
+
+    def start(self) -> bool:
+        """
+        Startet den HTTP-Server in einem Daemon-Thread.
+
+        Rückgabewert:
+        bool: True, wenn der Port geöffnet werden konnte
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != exporter.path:
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                body = render(exporter.collect(), openmetrics).encode('utf-8')
+                exporter.scrapes += 1
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else TEXT_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                exporter.logger.debug("Metrics: " + format, *args)
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            self.logger.error(f"Metrics-Endpunkt {self.host}:{self.port} nicht verfügbar: {e}")
+            return False
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Metrics-Endpunkt aktiv: http://{self.host}:{self.port}{self.path}")
+        return True
+
+    def stop(self) -> None:
+        """Beendet den HTTP-Server."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread:
+            self._thread.join(2.0)
+            self._thread = None
+
+
+def bridge_collector(stats_manager, uart_router=None, mqtt_handler=None,
+                     dedup=None) -> Callable[[], List[MetricFamily]]:
+    """
+    Erstellt den Collector für die Bridge-Komponenten.
+
+    Parameter:
+    stats_manager (StatsManager): Zähler und Latenz-Histogramme
+    uart_router (UARTRouter): Optional, Metriken pro UART-Port und Spool
+    mqtt_handler (MQTTHandler): Optional, Verbindungszähler
+    dedup (DedupCache): Optional, Duplikate pro Gerät
+
+    Rückgabewert:
+    Callable: Collector für MetricsServer.add_collector
+    """
+    def collect() -> List[MetricFamily]:
+        stats = stats_manager.get_stats()
+        families = [
+            MetricFamily("bridge_messages_received", "counter", "Empfangene MQTT-Nachrichten")
+            .add(stats['messages_received']),
+            MetricFamily("bridge_messages_sent", "counter", "An den UART gesendete Nachrichten")
+            .add(stats['messages_sent']),
+            MetricFamily("bridge_errors", "counter", "Fehler bei der Verarbeitung")
+            .add(stats['errors']),
+            MetricFamily("bridge_decode_errors", "counter", "Nicht dekodierbare Payloads")
+            .add(stats['decode_errors']),
+            MetricFamily("bridge_messages_dropped", "counter", "Wegen voller Pipeline-Queue verworfen")
+            .add(stats['messages_dropped']),
+            MetricFamily("bridge_pipeline_queue_depth", "gauge", "Nachrichten in der Pipeline-Queue")
+            .add(stats['queue_depth']),
+            MetricFamily("bridge_uptime_seconds", "gauge", "Laufzeit der Bridge")
+            .add(time.time() - stats['start_time'])
+        ]
+
+        shed = MetricFamily("bridge_frames_shed", "counter", "Wegen Überlast verworfene Frames")
+        for reason, count in sorted(stats['messages_shed'].items()):
+            shed.add(count, reason=reason)
+        families.append(shed)
+
+        device_messages = MetricFamily("bridge_device_messages", "counter", "Empfangene Nachrichten pro Gerät")
+        device_sent = MetricFamily("bridge_device_sent", "counter", "An den UART gesendete Nachrichten pro Gerät")
+        device_bytes = MetricFamily("bridge_device_bytes", "counter", "An den UART gesendete Bytes pro Gerät")
+        device_errors = MetricFamily("bridge_device_errors", "counter", "Fehler pro Gerät")
+        last_seen = MetricFamily("bridge_device_last_seen_timestamp_seconds", "gauge",
+                                 "Zeitpunkt der letzten Nachricht pro Gerät")
+        interval = MetricFamily("bridge_device_interval_seconds", "gauge",
+                                "Gleitender Mittelwert der Ankunftsabstände pro Gerät")
+        for device, counts in sorted(stats_manager.get_device_stats().items()):
+            device_messages.add(counts['messages'], device=device)
+            device_sent.add(counts['sent'], device=device)
+            device_bytes.add(counts['bytes'], device=device)
+            device_errors.add(counts['errors'], device=device)
+            if counts['last_seen'] is not None:
+                last_seen.add(counts['last_seen'], device=device)
+            if counts['interval'] is not None:
+                interval.add(counts['interval'], device=device)
+        families += [device_messages, device_sent, device_bytes, device_errors, last_seen, interval]
+
+        latency = MetricFamily("bridge_stage_latency_seconds", "histogram", "Dauer pro Verarbeitungsstufe")
+        for stage, histogram in list(stats_manager.stages.items()):
+            latency.add_histogram(histogram, stage=stage)
+        families.append(latency)
+
+        if uart_router is not None:
+            frames = MetricFamily("bridge_uart_frames", "counter", "Gesendete Frames pro UART-Port")
+            failed = MetricFamily("bridge_uart_failures", "counter", "Fehlgeschlagene Frames pro UART-Port")
+            sent_bytes = MetricFamily("bridge_uart_bytes", "counter", "Gesendete Bytes pro UART-Port")
+            depth = MetricFamily("bridge_uart_queue_depth", "gauge", "Wartende Frames pro UART-Port")
+            spooled = MetricFamily("bridge_spool_pending", "gauge", "Frames im Spool pro UART-Port")
+            for name, port in uart_router.ports.items():
+                counters = port.get_counters()
+                frames.add(counters['frames_sent'], port=name)
+                failed.add(counters['frames_failed'], port=name)
+                sent_bytes.add(counters['bytes_sent'], port=name)
+                depth.add(counters['queue_depth'], port=name)
+                spool = getattr(port.writer, 'spool', None)
+                if spool is not None:
+                    spooled.add(spool.pending(), port=name)
+            families += [frames, failed, sent_bytes, depth, spooled]
+
+        if mqtt_handler is not None:
+            families += [
+                MetricFamily("bridge_mqtt_connects", "counter", "Erfolgreiche MQTT-Verbindungen")
+                .add(mqtt_handler.connects),
+                MetricFamily("bridge_mqtt_reconnects", "counter", "MQTT-Wiederverbindungen")
+                .add(max(0, mqtt_handler.connects - 1)),
+                MetricFamily("bridge_mqtt_disconnects", "counter", "Unerwartete MQTT-Trennungen")
+                .add(mqtt_handler.disconnects)
+            ]
+
+        if dedup is not None:
+            duplicates = MetricFamily("bridge_duplicates", "counter", "Verworfene doppelte Uplinks pro Gerät")
+            for device, counts in sorted(dedup.get_device_stats().items()):
+                if counts['duplicates']:
+                    duplicates.add(counts['duplicates'], device=device)
+            families.append(duplicates)
+        return families
+
+    return collect
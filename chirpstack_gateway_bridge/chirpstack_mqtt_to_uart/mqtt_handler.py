@@ -2,7 +2,9 @@
 
 import logging
 import paho.mqtt.client as mqtt
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, Optional, Union
+
+from .topic_cache import TopicInfo, topic_parser
 
 
 class MQTTHandler:
@@ -21,6 +23,8 @@ class MQTTHandler:
         self.logger = logger
         self.message_callback = message_callback
         self.client = None
+        self.connects = 0
+        self.disconnects = 0
         self._setup_mqtt()
     
     def _setup_mqtt(self) -> None:
@@ -47,6 +51,7 @@ class MQTTHandler:
         mqtt_config = self.config.get("mqtt", {})
         
         if rc == 0:
+            self.connects += 1
             self.logger.info(f"Verbunden mit MQTT-Broker {mqtt_config.get('broker')}:{mqtt_config.get('port')}")
             topic = mqtt_config.get("topic", "application/+/device/+/event/up")
             client.subscribe(topic)
@@ -57,6 +62,7 @@ class MQTTHandler:
     def _on_disconnect(self, client, userdata, rc):
         """Callback für MQTT-Verbindungsverlust."""
         if rc != 0:
+            self.disconnects += 1
             self.logger.warning(f"Unerwartete MQTT Trennung, Code: {rc}")
     
     def _on_message(self, client, userdata, msg):
@@ -110,22 +116,27 @@ class MQTTHandler:
             self.logger.debug(f"Fehler beim Trennen der MQTT-Verbindung: {e}")
     
     @staticmethod
-    def extract_device_name(topic: str) -> str:
+    def parse_topic(topic: Union[str, bytes]) -> TopicInfo:
+        """
+        Zerlegt ein MQTT-Topic über den gemeinsamen Topic-Cache.
+        
+        Parameter:
+        topic (str | bytes): Das MQTT-Topic
+        
+        Rückgabewert:
+        TopicInfo: application_id, device_id, event_type und UART-Präfix
+        """
+        return topic_parser.parse(topic)
+    
+    @staticmethod
+    def extract_device_name(topic: Union[str, bytes]) -> str:
         """
         Extrahiert den Device-Namen aus einem MQTT-Topic.
         
         Parameter:
-        topic (str): Das MQTT-Topic
+        topic (str | bytes): Das MQTT-Topic
         
         Rückgabewert:
         str: Der Device-Name oder "unknown"
         """
-        try:
-            topic_parts = topic.split('/')
-            # Format: application/{app_id}/device/{device_id}/event/up
-            if len(topic_parts) >= 4:
-                return topic_parts[3]
-            else:
-                return "unknown"
-        except Exception:
-            return "unknown"
+        return topic_parser.parse(topic).device_id
@@ -0,0 +1,82 @@
+"""UART pacing module for ChirpStack MQTT to UART Bridge.
+
+Die Kapazität der Leitung ergibt sich aus der UART-Konfiguration: pro
+Zeichen werden ein Startbit, bytesize Datenbits, ein optionales
+Paritätsbit und stopbits Stopbits übertragen. Bei 115200 baud und 8N1
+sind das 11520 Bytes/s.
+"""
+
+import time
+import threading
+from typing import Dict, Any
+
+
+SHED_POLICIES = ("drop_oldest", "drop_duplicates", "ttl")
+
+
+def link_capacity(uart_config: Dict[str, Any]) -> float:
+    """
+    Berechnet die Nutzdatenrate der UART-Leitung.
+
+    Parameter:
+    uart_config (dict): Der "uart"-Abschnitt der Konfiguration
+
+    Rückgabewert:
+    float: Bytes pro Sekunde
+    """
+    bits_per_char = (
+        1
+        + uart_config.get("bytesize", 8)
+        + (0 if uart_config.get("parity", "none") == "none" else 1)
+        + uart_config.get("stopbits", 1)
+    )
+    return uart_config.get("baudrate", 115200) / bits_per_char
+
+
+class TokenBucket:
+    """
+    Token Bucket in Bytes. consume() darf das Guthaben ins Minus ziehen,
+    sodass auch Batches größer als burst gesendet werden; delay() gibt dann
+    die Zeit bis zum Ausgleich zurück.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        """
+        Initialisiert den Bucket (voll).
+
+        Parameter:
+        rate (float): Auffüllrate in Bytes pro Sekunde
+        burst (float): Maximales Guthaben in Bytes
+        """
+        self.rate = max(1.0, float(rate))
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def delay(self) -> float:
+        """
+        Gibt die Wartezeit zurück, bis wieder Guthaben vorhanden ist.
+
+        Rückgabewert:
+        float: Sekunden (0, wenn sofort gesendet werden darf)
+        """
+        with self._lock:
+            self._refill()
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def consume(self, size: int) -> None:
+        """
+        Bucht gesendete Bytes ab.
+
+        Parameter:
+        size (int): Anzahl Bytes
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= size
@@ -0,0 +1,103 @@
+"""Payload dump module for ChirpStack MQTT to UART Bridge."""
+
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Any, Optional
+
+
+class HexDump:
+    """Formatiert Bytes erst beim Ausgeben als Hex-String (für %s-Logging)."""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        return self.data.hex(' ').upper()
+
+
+class AsciiDump:
+    """Formatiert Bytes erst beim Ausgeben als ASCII mit \\xNN-Escapes."""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        return ''.join(chr(b) if 32 <= b < 127 else f'\\x{b:02x}' for b in self.data)
+
+
+class PayloadDumper:
+    """
+    Protokolliert Payload-Dumps nur, wenn das Log-Level aktiv ist.
+    Pro Gerät werden die ersten full_per_device Nachrichten vollständig
+    ausgegeben, danach jede sample_every-te; übersprungene Dumps werden
+    gezählt und mit log_summary() zusammengefasst.
+    """
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger):
+        """
+        Initialisiert den Dumper.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        """
+        dump_config = config.get("logging", {}).get("payload_dump", {})
+
+        self.logger = logger
+        self.level = getattr(logging, str(dump_config.get("level", "DEBUG")).upper(), logging.DEBUG)
+        self.full_per_device = dump_config.get("full_per_device", 10)
+        self.sample_every = dump_config.get("sample_every", 100)
+        self.always_devices = set(dump_config.get("devices", []))
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._suppressed: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def dump(self, device: str, payload: bytes, label: str = "Payload",
+             level: Optional[int] = None) -> None:
+        """
+        Gibt einen Hex-Dump der Payload aus, falls Level und Sampling es erlauben.
+
+        Parameter:
+        device (str): Der Device-Name
+        payload (bytes): Die auszugebenden Daten
+        label (str): Beschreibung im Log
+        level (int): Log-Level des Dumps, Standard: konfiguriertes Level
+        """
+        if level is None:
+            level = self.level
+        if not self.logger.isEnabledFor(level):
+            return
+
+        with self._lock:
+            self._counts[device] += 1
+            count = self._counts[device]
+            if not (device in self.always_devices or count <= self.full_per_device or
+                    (self.sample_every and count % self.sample_every == 0)):
+                self._suppressed[device] += 1
+                return
+
+        self.logger.log(level, "%s %s #%d (%d Bytes): %s",
+                        label, device, count, len(payload), HexDump(payload))
+
+    def log_summary(self, level: Optional[int] = None) -> None:
+        """
+        Fasst die seit der letzten Zusammenfassung übersprungenen Dumps zusammen.
+
+        Parameter:
+        level (int): Log-Level der Zusammenfassung, Standard: konfiguriertes Level
+        """
+        if level is None:
+            level = self.level
+        if not self.logger.isEnabledFor(level):
+            return
+        with self._lock:
+            suppressed = dict(self._suppressed)
+            self._suppressed.clear()
+        if suppressed:
+            summary = ', '.join(f"{device}: {count}" for device, count in sorted(suppressed.items()))
+            self.logger.log(level, "Payload-Dumps übersprungen (Sampling) - %s", summary)
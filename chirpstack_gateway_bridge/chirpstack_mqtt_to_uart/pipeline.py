@@ -0,0 +1,155 @@
+"""Message pipeline module for ChirpStack MQTT to UART Bridge."""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Callable, Optional
+
+from .stats import StatsManager
+
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class MessagePipeline:
+    """
+    Entkoppelt den MQTT-Empfang von der UART-Ausgabe.
+
+    Der MQTT-Callback legt nur (topic, payload, receive_ts) in eine begrenzte
+    Queue; ein eigener Worker-Thread arbeitet die Queue ab und ruft den
+    Verarbeitungs-Handler auf.
+    """
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger,
+                 stats_manager: StatsManager, handler: Callable):
+        """
+        Initialisiert die Pipeline.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        stats_manager (StatsManager): Empfänger der Queue-Metriken
+        handler (Callable): Verarbeitungsfunktion handler(topic, payload, receive_ts)
+        """
+        pipeline_config = config.get("pipeline", {})
+
+        self.logger = logger
+        self.stats_manager = stats_manager
+        self.handler = handler
+        self.max_size = max(1, int(pipeline_config.get("queue_size", 1000)))
+        self.overflow_policy = pipeline_config.get("overflow_policy", "drop_oldest")
+        self.put_timeout = pipeline_config.get("put_timeout", 0.1)
+
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            self.logger.warning(
+                f"Unbekannte Overflow-Policy '{self.overflow_policy}', verwende 'drop_oldest'"
+            )
+            self.overflow_policy = "drop_oldest"
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Startet den Worker-Thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="mqtt-pipeline", daemon=True)
+        self._thread.start()
+        self.logger.info(
+            f"Pipeline gestartet (Queue: {self.max_size}, Overflow: {self.overflow_policy})"
+        )
+
+    def submit(self, topic: str, payload: bytes, receive_ts: Optional[float] = None) -> bool:
+        """
+        Legt eine Nachricht in die Queue. Wird im MQTT-Callback aufgerufen
+        und blockiert höchstens put_timeout Sekunden (Policy 'block').
+
+        Parameter:
+        topic (str): Das MQTT-Topic
+        payload (bytes): Die rohe MQTT-Payload
+        receive_ts (float): Empfangszeitpunkt, Standard: jetzt
+
+        Rückgabewert:
+        bool: True, wenn die Nachricht angenommen wurde
+        """
+        if receive_ts is None:
+            receive_ts = time.time()
+        item = (topic, payload, receive_ts)
+
+        with self._lock:
+            if len(self._queue) >= self.max_size:
+                if self.overflow_policy == "drop_newest":
+                    self.stats_manager.increment_dropped()
+                    return False
+                elif self.overflow_policy == "drop_oldest":
+                    self._queue.popleft()
+                    self.stats_manager.increment_dropped()
+                else:
+                    deadline = time.monotonic() + self.put_timeout
+                    while len(self._queue) >= self.max_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats_manager.increment_dropped()
+                            return False
+                        self._not_full.wait(remaining)
+
+            self._queue.append(item)
+            self.stats_manager.update_queue_depth(len(self._queue))
+            self._not_empty.notify()
+        return True
+
+    def qsize(self) -> int:
+        """Gibt die aktuelle Queue-Tiefe zurück."""
+        with self._lock:
+            return len(self._queue)
+
+    def _run(self) -> None:
+        """Worker-Schleife: entnimmt Nachrichten und ruft den Handler auf."""
+        while True:
+            with self._lock:
+                while not self._queue and self._running:
+                    self._not_empty.wait(0.5)
+                if not self._queue:
+                    return
+                topic, payload, receive_ts = self._queue.popleft()
+                self.stats_manager.update_queue_depth(len(self._queue))
+                self._not_full.notify()
+
+            self.stats_manager.record_queue_wait(time.time() - receive_ts)
+            try:
+                self.handler(topic, payload, receive_ts)
+            except Exception as e:
+                self.logger.error(f"Fehler im Pipeline-Handler: {e}")
+                self.stats_manager.increment_errors()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stoppt den Worker-Thread. Noch anstehende Nachrichten werden
+        innerhalb des Timeouts abgearbeitet, danach verbliebene verworfen.
+
+        Parameter:
+        timeout (float): Maximale Wartezeit in Sekunden
+        """
+        with self._lock:
+            self._running = False
+            self._not_empty.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # Der Worker beendet nur noch die laufende Nachricht
+                with self._lock:
+                    abandoned = len(self._queue)
+                    self._queue.clear()
+                    self.stats_manager.update_queue_depth(0)
+                for _ in range(abandoned):
+                    self.stats_manager.increment_dropped()
+                self.logger.warning(
+                    f"Pipeline nicht rechtzeitig geleert, {abandoned} Nachrichten verworfen"
+                )
+            self._thread = None
@@ -5,6 +5,13 @@ import binascii
 import logging
 from typing import Optional, Dict, Any
 
+from .framing import BinaryFramer, MAX_PAYLOAD_SIZE
+from .payload_dump import HexDump, AsciiDump
+
+
+# Zeichen einer ASCII-Hex-Payload; translate() entfernt sie in C, bleibt nichts übrig, ist sie Hex
+HEX_DIGITS = b'0123456789abcdefABCDEF'
+
 
 class MessageProcessor:
     """Handles message processing including decoding and validation."""
@@ -20,6 +27,25 @@ class MessageProcessor:
         self.config = config
         self.logger = logger
 
+        # Frame-Format: "text" (Device-Name als Präfix) oder "binary"
+        self.frame_format = config.get("uart", {}).get("frame_format", "text")
+        self.framer = BinaryFramer(config, logger) if self.frame_format == "binary" else None
+
+        self.max_payload_size = config.get("uart", {}).get("max_payload_size", 255)
+        if self.framer and self.max_payload_size > MAX_PAYLOAD_SIZE:
+            logger.warning(
+                f"max_payload_size {self.max_payload_size} ist im Binär-Format nicht möglich, "
+                f"verwende {MAX_PAYLOAD_SIZE}"
+            )
+            self.max_payload_size = MAX_PAYLOAD_SIZE
+
+        # Kodierung pro Gerät ("hex" oder "raw") nach encoding_learn_count gleichen Ergebnissen
+        self.encoding_learn_count = config.get("parser", {}).get("encoding_learn_count", 3)
+        self.encodings: Dict[str, str] = {}
+        # Device -> [Kandidat, Anzahl gleicher Ergebnisse in Folge]
+        self._learning: Dict[str, list] = {}
+        self._mismatches: Dict[str, int] = {}
+
     def validate_payload(self, payload: bytes) -> bool:
         """
         Validiert die Payload, bevor sie über UART gesendet wird.
@@ -31,8 +57,7 @@ class MessageProcessor:
         Rückgabewert:
         bool: True, wenn payload gültig ist, sonst False
         """
-        uart_config = self.config.get("uart", {})
-        max_size = uart_config.get("max_payload_size", 255)
+        max_size = self.max_payload_size
 
         if not payload:
             self.logger.warning("Leere Payload empfangen")
@@ -44,28 +69,77 @@ class MessageProcessor:
 
         return True
 
-    def decode_payload(self, json_data: dict) -> Optional[bytes]:
+    def decode_payload(self, json_data: dict, device: Optional[str] = None) -> Optional[bytes]:
         """
         Dekodiert die Payload einer MQTT-Nachricht.
         Unterstützt Base64- und optionale ASCII-Hex-Dekodierung.
 
+        Ist für das Gerät eine Kodierung gelernt, entfällt die Erkennung: "raw"
+        wird unverändert übernommen, "hex" direkt mit unhexlify dekodiert.
+        Schlägt das fehl, wird der Eintrag verworfen und neu gelernt.
+
         Parameter:
         json_data (dict): Das JSON-Datenfeld der empfangenen Nachricht
+        device (str): Optional, das Gerät für den Kodierungs-Cache
 
         Rückgabewert:
         Optional[bytes]: Die dekodierte Payload oder None bei Fehler
         """
         try:
             decoded_payload = base64.b64decode(json_data['data'])
-            self.logger.debug(f"Base64 dekodiert ({len(decoded_payload)} Bytes)")
+            self.logger.debug("Base64 dekodiert (%d Bytes)", len(decoded_payload))
+
+            encoding = self.encodings.get(device) if device is not None else None
+            if encoding == "raw":
+                return decoded_payload
+            if encoding == "hex":
+                try:
+                    return binascii.unhexlify(decoded_payload)
+                except binascii.Error:
+                    self._mismatches[device] = self._mismatches.get(device, 0) + 1
+                    del self.encodings[device]
+                    self.logger.warning(f"Kodierung von {device} weicht ab (gelernt: hex), lerne neu")
 
             final_payload = self._check_double_encoding(decoded_payload)
+            if device is not None and self.encoding_learn_count:
+                self._learn_encoding(device, "raw" if final_payload is decoded_payload else "hex")
             return final_payload
 
         except Exception as e:
             self.logger.error(f"Fehler beim Dekodieren der Payload: {e}")
             return None
 
+    def _learn_encoding(self, device: str, encoding: str) -> None:
+        """
+        Zählt gleiche Erkennungsergebnisse in Folge und übernimmt die Kodierung
+        nach encoding_learn_count Bestätigungen in die Tabelle.
+        """
+        entry = self._learning.get(device)
+        if entry is None or entry[0] != encoding:
+            entry = self._learning[device] = [encoding, 0]
+        entry[1] += 1
+        if entry[1] >= self.encoding_learn_count:
+            del self._learning[device]
+            self.encodings[device] = encoding
+            self.logger.info(f"Kodierung von {device} gelernt: {encoding}")
+
+    def get_encoding_table(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Gibt die Kodierung pro Gerät zurück.
+
+        Rückgabewert:
+        dict: Device -> encoding ("hex", "raw" oder None während des Lernens),
+              confirmations (bisherige Bestätigungen beim Lernen) und mismatches
+        """
+        table = {device: {'encoding': encoding, 'confirmations': 0, 'mismatches': 0}
+                 for device, encoding in list(self.encodings.items())}
+        for device, (candidate, count) in list(self._learning.items()):
+            table[device] = {'encoding': None, 'confirmations': count, 'mismatches': 0}
+        for device, mismatches in list(self._mismatches.items()):
+            if device in table:
+                table[device]['mismatches'] = mismatches
+        return table
+
     def _check_double_encoding(self, decoded_payload: bytes) -> bytes:
         """
         Erkennung und Behandlung von doppelt kodierten Payloads.
@@ -75,35 +149,41 @@ class MessageProcessor:
         decoded_payload (bytes): Bereits base64-dekodierte Daten
 
         Rückgabewert:
-        bytes: Die endgültige dekodierte Payload
+        bytes: Die endgültige dekodierte Payload (dasselbe Objekt, wenn nicht Hex)
         """
-        try:
-            ascii_hex = decoded_payload.decode('ascii')
-            if all(c in '0123456789abcdefABCDEF' for c in ascii_hex):
-                self.logger.debug(f"ASCII-Hex String erkannt: {ascii_hex}")
-                final_payload = binascii.unhexlify(ascii_hex)
-                self.logger.debug(f"Final Payload ({len(final_payload)} Bytes): {final_payload.hex()}")
+        if not decoded_payload.translate(None, HEX_DIGITS):
+            try:
+                final_payload = binascii.unhexlify(decoded_payload)
+                self.logger.debug("ASCII-Hex String erkannt: %s", AsciiDump(decoded_payload))
+                self.logger.debug("Final Payload (%d Bytes): %s", len(final_payload), HexDump(final_payload))
                 return final_payload
-            else:
-                return decoded_payload
-        except (UnicodeDecodeError, ValueError):
-            self.logger.debug(f"Direkte Payload ({len(decoded_payload)} Bytes): {decoded_payload.hex()}")
-            return decoded_payload
-
-    def create_uart_message(self, device_name: str, payload: bytes) -> bytes:
+            except binascii.Error:
+                pass
+        self.logger.debug("Direkte Payload (%d Bytes): %s", len(decoded_payload), HexDump(decoded_payload))
+        return decoded_payload
+
+    def create_uart_message(self, device_name: str, payload: bytes,
+                            fport: Optional[int] = None,
+                            prefix: Optional[bytes] = None) -> bytes:
         """
         Erstellt eine formatierte Nachricht für den Versand über UART.
-        Fügt den Device-Namen als Präfix zur Payload hinzu.
+        Im Text-Format wird der Device-Name als Präfix zur Payload hinzugefügt,
+        im Binär-Format ein Frame mit Device-Index, Länge, fPort und CRC erstellt.
 
         Parameter:
         device_name (str): Der Name des Geräts
         payload (bytes): Die binären Daten der Nachricht
+        fport (int): Der LoRaWAN fPort (nur im Binär-Format verwendet)
+        prefix (bytes): Vorkodierter Text-Präfix, z.B. TopicInfo.uart_prefix
 
         Rückgabewert:
         bytes: Die formatierte Nachricht oder None bei Fehler
         """
         try:
-            device_prefix = f"{device_name}: ".encode('utf-8')
+            if self.framer:
+                return self.framer.build_frame(device_name, payload, fport)
+
+            device_prefix = prefix or f"{device_name}: ".encode('utf-8')
             message = device_prefix + payload
             return message
         except Exception as e:
@@ -0,0 +1,295 @@
+"""Multi-UART routing module for ChirpStack MQTT to UART Bridge.
+
+Jeder Eintrag in "uart_ports" erbt die Einstellungen aus "uart" und
+überschreibt einzelne Werte (port, baudrate, ...). Ein Gerät wird über die
+Regeln in "routing" einem Port zugeordnet; trifft keine Regel, entscheidet
+ein Rendezvous-Hash über den Device-Namen. Da ein Gerät so immer auf
+demselben Port landet und jeder Port seine Frames der Reihe nach schreibt,
+bleibt die Reihenfolge pro Gerät erhalten (solange keine fPort-Regel die
+Nachrichten eines Geräts auf mehrere Ports verteilt).
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from .uart_comm import UARTCommunicator
+from .processor import MessageProcessor
+
+
+class UARTPort:
+    """Eine UART-Schnittstelle mit eigenem Writer, Framer und Metriken."""
+
+    def __init__(self, name: str, config: Dict[str, Any], logger: logging.Logger,
+                 writer_factory: Optional[Callable] = None):
+        """
+        Initialisiert den Port.
+
+        Parameter:
+        name (str): Name des Ports für Routing-Regeln und Metriken
+        config (dict): Die Konfiguration mit den Port-Einstellungen in "uart"
+        logger (logging.Logger): Der Logger für Ausgaben
+        writer_factory (Callable): Optional writer_factory(uart_comm, config), liefert
+                                   einen Writer mit submit() oder None für direktes Senden
+        """
+        self.name = name
+        self.config = config
+        self.logger = logger
+        self.device = config.get("uart", {}).get("port")
+        self.uart_comm = UARTCommunicator(config, logger)
+        # Eigener Processor, damit jeder Port seine eigene Device-Tabelle (Binärformat) hat
+        self.processor = MessageProcessor(config, logger)
+        self.writer = writer_factory(self.uart_comm, config) if writer_factory else None
+
+        self.devices = set()
+        self.frames_sent = 0
+        self.frames_failed = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._last_report = (time.monotonic(), 0)
+
+    def submit(self, data: bytes, callback: Optional[Callable[[bool], None]] = None,
+               device: Optional[str] = None, fport: Optional[int] = None, priority: int = 0) -> None:
+        """
+        Sendet einen Frame über diesen Port, gepuffert über den Writer falls vorhanden.
+
+        Parameter:
+        data (bytes): Der fertige UART-Frame
+        callback (Callable): Optionaler Callback callback(success)
+        device (str): Optionaler Device-Name
+        fport (int): Optionaler LoRaWAN fPort
+        priority (int): Prioritätsklasse (0 = höchste)
+        """
+        if device is not None:
+            self.devices.add(device)
+        if self.writer:
+            self.writer.submit(data, lambda success: self._done(len(data), callback, success),
+                               device=device, fport=fport, priority=priority)
+        else:
+            self._done(len(data), callback, self.uart_comm.send(data))
+
+    def _done(self, size: int, callback: Optional[Callable[[bool], None]], success: bool) -> None:
+        """Aktualisiert die Metriken und ruft den Callback des Frames auf."""
+        with self._lock:
+            if success:
+                self.frames_sent += 1
+                self.bytes_sent += size
+            else:
+                self.frames_failed += 1
+        if callback:
+            callback(success)
+
+    def pending(self) -> int:
+        """Gibt die Anzahl wartender Frames zurück."""
+        return self.writer.pending() if self.writer else 0
+
+    def get_counters(self) -> Dict[str, Any]:
+        """
+        Gibt die Zähler des Ports zurück, ohne den Durchsatz-Zeitraum zu beenden.
+
+        Rückgabewert:
+        dict: Frames, Bytes, Fehler, Queue-Tiefe und Geräteanzahl
+        """
+        with self._lock:
+            return {
+                'port': self.device,
+                'frames_sent': self.frames_sent,
+                'frames_failed': self.frames_failed,
+                'bytes_sent': self.bytes_sent,
+                'queue_depth': self.pending(),
+                'devices': len(self.devices)
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Gibt die Metriken des Ports zurück. Der Durchsatz bezieht sich auf
+        den Zeitraum seit dem letzten Aufruf.
+
+        Rückgabewert:
+        dict: Frames, Bytes, Fehler, Durchsatz, Queue-Tiefe und Geräteanzahl
+        """
+        now = time.monotonic()
+        with self._lock:
+            last_time, last_bytes = self._last_report
+            elapsed = now - last_time
+            throughput = (self.bytes_sent - last_bytes) / elapsed if elapsed > 0 else 0.0
+            self._last_report = (now, self.bytes_sent)
+            return {
+                'port': self.device,
+                'frames_sent': self.frames_sent,
+                'frames_failed': self.frames_failed,
+                'bytes_sent': self.bytes_sent,
+                'throughput_bps': throughput,
+                'queue_depth': self.pending(),
+                'devices': len(self.devices)
+            }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Stoppt den Writer nach dem Senden aller Frames und schließt den UART.
+
+        Parameter:
+        timeout (float): Maximale Wartezeit für den Writer in Sekunden
+        """
+        if self.writer:
+            self.writer.stop(timeout)
+        self.uart_comm.close()
+
+
+class UARTRouter:
+    """Ordnet Geräte den konfigurierten UART-Ports zu."""
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger,
+                 writer_factory: Optional[Callable] = None):
+        """
+        Initialisiert den Router und öffnet alle Ports.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        writer_factory (Callable): Optional writer_factory(uart_comm, config) pro Port
+        """
+        self.logger = logger
+        uart_config = config.get("uart", {})
+
+        # Ohne "uart_ports" gibt es genau einen Port aus dem "uart"-Abschnitt
+        entries = config.get("uart_ports") or [{}]
+        self.ports: Dict[str, UARTPort] = {}
+        for index, entry in enumerate(entries):
+            name = entry.get("name") or entry.get("port") or uart_config.get("port") or f"uart{index}"
+            if name in self.ports:
+                raise ValueError(f"UART-Port '{name}' mehrfach konfiguriert")
+            port_settings = {key: value for key, value in entry.items() if key != "name"}
+            port_config = {**config, "uart": {**uart_config, **port_settings}}
+            self.ports[name] = UARTPort(name, port_config, logger, writer_factory)
+
+        routing_config = config.get("routing", {})
+        self.rules = self._load_rules(routing_config.get("rules", []))
+        self.default = routing_config.get("default", "hash")
+        if self.default != "hash" and self.default not in self.ports:
+            self.logger.warning(f"Unbekannter Standard-Port '{self.default}', verwende Hash-Verteilung")
+            self.default = "hash"
+
+        self._single = next(iter(self.ports.values())) if len(self.ports) == 1 else None
+        self._hash_cache: Dict[str, UARTPort] = {}
+
+        if len(self.ports) > 1:
+            self.logger.info(f"UART-Routing über {len(self.ports)} Ports: {', '.join(self.ports)}")
+
+    def _load_rules(self, rules: Iterable[Dict[str, Any]]) -> List[tuple]:
+        """Prüft die Routing-Regeln und bringt die Bedingungen in Mengenform."""
+        loaded = []
+        for rule in rules:
+            port = self.ports.get(rule.get("port"))
+            if port is None:
+                self.logger.warning(f"Routing-Regel {rule} verweist auf unbekannten Port, ignoriert")
+                continue
+            conditions = {}
+            for key in ("device", "application_id", "fport"):
+                if key in rule:
+                    values = rule[key] if isinstance(rule[key], list) else [rule[key]]
+                    conditions[key] = frozenset(values)
+            loaded.append((conditions, port))
+        return loaded
+
+    def route(self, device: str, application_id: Optional[str] = None,
+              fport: Optional[int] = None) -> UARTPort:
+        """
+        Bestimmt den Port für eine Nachricht. Die erste passende Regel gewinnt.
+
+        Parameter:
+        device (str): Der Device-Name
+        application_id (str): Die ChirpStack-Application-ID
+        fport (int): Der LoRaWAN fPort
+
+        Rückgabewert:
+        UARTPort: Der Zielport
+        """
+        if self._single:
+            return self._single
+
+        for conditions, port in self.rules:
+            if ("device" in conditions and device not in conditions["device"]) or \
+                    ("application_id" in conditions and application_id not in conditions["application_id"]) or \
+                    ("fport" in conditions and fport not in conditions["fport"]):
+                continue
+            return port
+
+        if self.default != "hash":
+            return self.ports[self.default]
+
+        port = self._hash_cache.get(device)
+        if port is None:
+            port = self._hash_cache[device] = self._rendezvous(device)
+        return port
+
+    def _rendezvous(self, device: str) -> UARTPort:
+        """
+        Rendezvous-Hashing: der Port mit dem höchsten Hash aus Port- und
+        Device-Name gewinnt. Kommt ein Port hinzu, wandern nur die Geräte, die
+        jetzt auf den neuen Port fallen.
+        """
+        def score(name: str) -> int:
+            digest = hashlib.blake2b(f"{name}/{device}".encode('utf-8'), digest_size=8).digest()
+            return int.from_bytes(digest, 'big')
+
+        return self.ports[max(self.ports, key=score)]
+
+    @property
+    def writers(self) -> List[Any]:
+        """Die Writer aller Ports (ohne Ports mit direktem Senden)."""
+        return [port.writer for port in self.ports.values() if port.writer]
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Gibt die Metriken aller Ports zurück.
+
+        Rückgabewert:
+        dict: Port-Name -> Metriken
+        """
+        return {name: port.get_stats() for name, port in self.ports.items()}
+
+    def print_stats(self) -> None:
+        """Gibt die Metriken pro Port (bei mehreren Ports), pro Prioritätsklasse und der Spools aus."""
+        if len(self.ports) > 1:
+            for name, stats in self.get_stats().items():
+                self.logger.info(
+                    f"UART {name} ({stats['port']}) - Frames: {stats['frames_sent']}, "
+                    f"Bytes: {stats['bytes_sent']}, Fehler: {stats['frames_failed']}, "
+                    f"Durchsatz: {stats['throughput_bps']:.0f} B/s, "
+                    f"Warteschlange: {stats['queue_depth']}, Geräte: {stats['devices']}"
+                )
+
+        for name, port in self.ports.items():
+            scheduler = getattr(port.writer, 'scheduler', None)
+            if scheduler is None:
+                continue
+            for class_name, stats in scheduler.get_stats().items():
+                self.logger.info(
+                    f"Priorität {class_name} ({name}) - Gesendet: {stats['sent']}, "
+                    f"Wartend: {stats['queued']}, Latenz p50/p95/p99/max: "
+                    f"{stats['p50'] * 1000:.1f}/{stats['p95'] * 1000:.1f}/"
+                    f"{stats['p99'] * 1000:.1f}/{stats['max'] * 1000:.1f} ms"
+                )
+
+        for name, port in self.ports.items():
+            spool = getattr(port.writer, 'spool', None)
+            if spool is None:
+                continue
+            stats = spool.get_stats()
+            self.logger.info(
+                f"Spool {name} - Wartend: {stats['pending']}, Gespoolt: {stats['spooled']}, "
+                f"Nachgesendet: {stats['replayed']}, Verworfen: {stats['dropped']}"
+            )
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Stoppt alle Writer und schließt alle Ports.
+
+        Parameter:
+        timeout (float): Maximale Wartezeit pro Writer in Sekunden
+        """
+        for port in self.ports.values():
+            port.close(timeout)
@@ -0,0 +1,288 @@
+"""Priority scheduling module for ChirpStack MQTT to UART Bridge.
+
+Frames werden einer Prioritätsklasse zugeordnet (erste passende Klasse in
+"scheduler.classes" gewinnt, sonst die Standardklasse). Zwischen den Klassen
+gilt strikte Priorität; innerhalb einer Klasse teilen sich die Geräte den
+Link per Deficit Round Robin, gewichtet über "device_weights".
+"""
+
+from collections import OrderedDict, deque
+from typing import Dict, Any, Callable, Deque, List, Optional
+
+from .uart_writer import UARTFrame
+from .histogram import LatencyHistogram
+
+
+class PriorityClassifier:
+    """Ordnet Nachrichten anhand von Device, Application, fPort oder Payload einer Klasse zu."""
+
+    def __init__(self, config: Dict[str, Any], logger):
+        """
+        Initialisiert den Classifier.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        """
+        scheduler_config = config.get("scheduler", {})
+        default_class = scheduler_config.get("default_class", "default")
+
+        self.logger = logger
+        self.class_names: List[str] = []
+        self._rules: List[tuple] = []
+
+        for class_config in scheduler_config.get("classes", []):
+            index = self._class_index(class_config.get("name") or f"class{len(self.class_names)}")
+            for rule in class_config.get("match", []):
+                self._rules.append((index, self._compile_rule(rule)))
+
+        self.default_index = self._class_index(default_class)
+
+    def _class_index(self, name: str) -> int:
+        """Gibt den Index einer Klasse zurück und legt sie bei Bedarf an."""
+        if name not in self.class_names:
+            self.class_names.append(name)
+        return self.class_names.index(name)
+
+    @staticmethod
+    def _compile_rule(rule: Dict[str, Any]) -> Callable[[str, Optional[str], Optional[int], bytes], bool]:
+        """Erstellt aus einer Regel ein Prädikat; alle angegebenen Bedingungen müssen zutreffen."""
+        def as_set(value):
+            return frozenset(value if isinstance(value, list) else [value])
+
+        devices = as_set(rule["device"]) if "device" in rule else None
+        applications = as_set(rule["application_id"]) if "application_id" in rule else None
+        fports = as_set(rule["fport"]) if "fport" in rule else None
+        prefix = bytes.fromhex(rule["payload_prefix"]) if "payload_prefix" in rule else None
+
+        def predicate(device, application_id, fport, payload):
+            return (devices is None or device in devices) and \
+                (applications is None or application_id in applications) and \
+                (fports is None or fport in fports) and \
+                (prefix is None or payload.startswith(prefix))
+
+        return predicate
+
+    def add_predicate(self, class_name: str,
+                      predicate: Callable[[str, Optional[str], Optional[int], bytes], bool]) -> None:
+        """
+        Ergänzt eine Regel als Funktion, z. B. für Schwellwerte in der Payload.
+        Die Regel wird hinter den konfigurierten Regeln geprüft.
+
+        Parameter:
+        class_name (str): Name der Klasse (muss konfiguriert sein)
+        predicate (Callable): predicate(device, application_id, fport, payload) -> bool
+        """
+        if class_name not in self.class_names:
+            raise ValueError(f"Unbekannte Prioritätsklasse '{class_name}'")
+        self._rules.append((self.class_names.index(class_name), predicate))
+
+    def classify(self, device: str, fport: Optional[int] = None, payload: bytes = b'',
+                 application_id: Optional[str] = None) -> int:
+        """
+        Bestimmt die Prioritätsklasse einer Nachricht.
+
+        Parameter:
+        device (str): Der Device-Name
+        fport (int): Der LoRaWAN fPort
+        payload (bytes): Die dekodierte Payload
+        application_id (str): Die ChirpStack-Application-ID
+
+        Rückgabewert:
+        int: Index der Klasse, 0 ist die höchste Priorität
+        """
+        for index, predicate in self._rules:
+            try:
+                if predicate(device, application_id, fport, payload):
+                    return index
+            except Exception as e:
+                self.logger.debug(f"Prioritätsregel fehlgeschlagen: {e}")
+        return self.default_index
+
+
+class _ClassQueue:
+    """Warteschlangen einer Prioritätsklasse mit Deficit Round Robin über die Geräte."""
+
+    __slots__ = ('queues', 'ring', 'deficits', 'size')
+
+    def __init__(self):
+        self.queues: Dict[Optional[str], Deque[UARTFrame]] = {}
+        self.ring: Deque[Optional[str]] = deque()
+        self.deficits: Dict[Optional[str], int] = {}
+        self.size = 0
+
+
+class PriorityScheduler:
+    """
+    Warteschlange für den CoalescingWriter mit strikter Priorität zwischen
+    den Klassen und gewichtetem Deficit Round Robin zwischen den Geräten.
+    Bietet die vom Writer genutzten deque-Operationen (append, popleft,
+    [0], len); der Zugriff erfolgt unter dem Lock des Writers.
+    """
+
+    def __init__(self, config: Dict[str, Any], classifier: PriorityClassifier):
+        """
+        Initialisiert den Scheduler.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter
+        classifier (PriorityClassifier): Liefert die Klassennamen
+        """
+        scheduler_config = config.get("scheduler", {})
+
+        self.class_names = list(classifier.class_names)
+        self.quantum = max(1, int(scheduler_config.get("quantum", 256)))
+        self.device_weights: Dict[str, float] = scheduler_config.get("device_weights", {})
+        self._classes = [_ClassQueue() for _ in self.class_names]
+        self._size = 0
+
+        self._latencies = [LatencyHistogram() for _ in self.class_names]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, frame: UARTFrame) -> None:
+        """Reiht einen Frame in seine Klasse und die Queue seines Geräts ein."""
+        cls = self._classes[min(frame.priority, len(self._classes) - 1)]
+        queue = cls.queues.get(frame.device)
+        if queue is None:
+            queue = cls.queues[frame.device] = deque()
+            cls.ring.append(frame.device)
+            cls.deficits[frame.device] = 0
+        queue.append(frame)
+        cls.size += 1
+        self._size += 1
+
+    def _select(self) -> _ClassQueue:
+        """
+        Bestimmt die Klasse des nächsten Frames und dreht den DRR-Ring, bis
+        das vorderste Gerät genug Guthaben für seinen nächsten Frame hat.
+        """
+        for cls in self._classes:
+            if cls.size:
+                break
+        else:
+            raise IndexError("Scheduler ist leer")
+
+        while True:
+            device = cls.ring[0]
+            if cls.deficits[device] >= len(cls.queues[device][0].data):
+                return cls
+            weight = self.device_weights.get(device, 1)
+            cls.deficits[device] += max(1, int(self.quantum * weight))
+            cls.ring.rotate(-1)
+
+    def __getitem__(self, index: int) -> UARTFrame:
+        """Gibt den nächsten Frame zurück, ohne ihn zu entnehmen (nur Index 0)."""
+        if index != 0:
+            raise IndexError("Nur der nächste Frame (Index 0) ist abrufbar")
+        cls = self._select()
+        return cls.queues[cls.ring[0]][0]
+
+    def popleft(self) -> UARTFrame:
+        """Entnimmt den nächsten Frame."""
+        cls = self._select()
+        device = cls.ring[0]
+        queue = cls.queues[device]
+        frame = queue.popleft()
+        cls.deficits[device] -= len(frame.data)
+        cls.size -= 1
+        self._size -= 1
+        if not queue:
+            # Leere Geräte verlassen den Ring und verlieren ihr Guthaben
+            del cls.queues[device]
+            del cls.deficits[device]
+            cls.ring.popleft()
+        return frame
+
+    def drop_oldest(self) -> Optional[UARTFrame]:
+        """
+        Entfernt den ältesten nicht fixierten Frame der niedrigsten belegten
+        Klasse (für den Lastabwurf).
+
+        Rückgabewert:
+        Optional[UARTFrame]: Der entfernte Frame oder None
+        """
+        for cls in reversed(self._classes):
+            victim = None
+            victim_device = None
+            for device, queue in cls.queues.items():
+                frame = next((item for item in queue if not item.pinned), None)
+                if frame is not None and (victim is None or frame.submitted_at < victim.submitted_at):
+                    victim, victim_device = frame, device
+            if victim is None:
+                continue
+            self._unlink(cls, victim_device, victim)
+            return victim
+        return None
+
+    def drop_expired(self, cutoff: float) -> List[UARTFrame]:
+        """
+        Entfernt alle nicht fixierten Frames, die vor cutoff eingereiht wurden
+        (Policy "ttl" beim Lastabwurf).
+
+        Parameter:
+        cutoff (float): time.monotonic()-Zeitpunkt
+
+        Rückgabewert:
+        List[UARTFrame]: Die entfernten Frames
+        """
+        expired = []
+        for cls in self._classes:
+            for device, queue in list(cls.queues.items()):
+                for frame in [item for item in queue if not item.pinned and item.submitted_at < cutoff]:
+                    self._unlink(cls, device, frame)
+                    expired.append(frame)
+        return expired
+
+    def remove(self, frame: UARTFrame) -> None:
+        """
+        Entfernt einen bestimmten wartenden Frame (z. B. einen durch neuere
+        Daten ersetzten Frame bei drop_duplicates).
+
+        Parameter:
+        frame (UARTFrame): Der Frame, muss in der Warteschlange stehen
+        """
+        self._unlink(self._classes[min(frame.priority, len(self._classes) - 1)], frame.device, frame)
+
+    def _unlink(self, cls: _ClassQueue, device: Optional[str], frame: UARTFrame) -> None:
+        """Nimmt einen Frame aus der Queue seines Geräts, leere Geräte verlassen den Ring."""
+        queue = cls.queues[device]
+        queue.remove(frame)
+        cls.size -= 1
+        self._size -= 1
+        if not queue:
+            del cls.queues[device]
+            del cls.deficits[device]
+            cls.ring.remove(device)
+
+    def record_latency(self, priority: int, latency: float) -> None:
+        """
+        Erfasst die Zeit vom Einreihen bis zum Senden eines Frames.
+
+        Parameter:
+        priority (int): Index der Klasse
+        latency (float): Latenz in Sekunden
+        """
+        self._latencies[min(priority, len(self._latencies) - 1)].record(latency)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Gibt pro Klasse Queue-Tiefe, gesendete Frames und die Latenz-Perzentile
+        aller gesendeten Frames zurück.
+
+        Rückgabewert:
+        dict: Klassenname -> Statistiken (Latenzen in Sekunden)
+        """
+        stats = OrderedDict()
+        for index, name in enumerate(self.class_names):
+            latency = self._latencies[index].get_stats()
+            stats[name] = {
+                'queued': self._classes[index].size,
+                'sent': latency['count'],
+                'p50': latency['p50'],
+                'p95': latency['p95'],
+                'p99': latency['p99'],
+                'max': latency['max']
+            }
+        return stats
@@ -0,0 +1,339 @@
+"""Payload schema registry for ChirpStack MQTT to UART Bridge.
+
+Ein Schema beschreibt ein festes Binärlayout deklarativ als Liste von
+Feldern und wird einmalig in ein struct.Struct übersetzt. Einzelne Payloads
+werden mit unpack_from() in typisierte Felder zerlegt; mit NumPy (optional)
+wird eine ganze Spalte gleich langer Payloads mit einem frombuffer()-Aufruf
+in typisierte Arrays umgewandelt.
+
+Beispiel (Sensor aus compare_data.py, 24 Bytes, Little Endian):
+
+    'T' | f32 | f32 | 'D' | f32 | 'P' | f32 | 'S' | f32
+"""
+
+import struct
+import logging
+import binascii
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .session_events import iter_session_rows
+
+
+# Feldtyp -> (struct-Format, NumPy-Typ ohne Byte-Order)
+FIELD_TYPES = {
+    'int8': ('b', 'i1'),
+    'uint8': ('B', 'u1'),
+    'int16': ('h', 'i2'),
+    'uint16': ('H', 'u2'),
+    'int32': ('i', 'i4'),
+    'uint32': ('I', 'u4'),
+    'int64': ('q', 'i8'),
+    'uint64': ('Q', 'u8'),
+    'float32': ('f', 'f4'),
+    'float64': ('d', 'f8')
+}
+BYTE_ORDERS = {'little': '<', 'big': '>'}
+
+# Bekannte Layouts, die ohne eigene Definition über ihren Namen nutzbar sind
+KNOWN_SCHEMAS = {
+    'tdps24': {
+        'byte_order': 'little',
+        'allow_trailing': True,
+        'fields': [
+            {'type': 'marker', 'value': 'T'},
+            {'name': 't1', 'type': 'float32'},
+            {'name': 't2', 'type': 'float32'},
+            {'type': 'marker', 'value': 'D'},
+            {'name': 'd', 'type': 'float32'},
+            {'type': 'marker', 'value': 'P'},
+            {'name': 'p', 'type': 'float32'},
+            {'type': 'marker', 'value': 'S'},
+            {'name': 's', 'type': 'float32'}
+        ]
+    }
+}
+
+
+class PayloadSchema:
+    """
+    Ein übersetztes Payload-Schema. Feldtypen: die Zahlentypen aus
+    FIELD_TYPES (optional mit "scale"), "bytes" und "padding" mit "size"
+    sowie "marker" mit festem "value" (wird geprüft, nicht ausgegeben).
+    """
+
+    def __init__(self, name: str, definition: Dict[str, Any]):
+        """
+        Übersetzt eine Schema-Definition.
+
+        Parameter:
+        name (str): Name des Schemas
+        definition (dict): byte_order ("little"/"big"), allow_trailing und fields
+
+        Rückgabewert:
+        Löst ValueError bei ungültiger Definition aus
+        """
+        self.name = name
+        byte_order = definition.get('byte_order', 'little')
+        if byte_order not in BYTE_ORDERS:
+            raise ValueError(f"Schema {name}: unbekannte Byte-Order {byte_order}")
+        prefix = BYTE_ORDERS[byte_order]
+        # Längere Payloads zulassen (z. B. angehängte Füllbytes), ausgewertet wird der Anfang
+        self.allow_trailing = bool(definition.get('allow_trailing', False))
+
+        formats = []
+        dtype = []
+        # (Position im Ergebnis von unpack, Name, Skalierung)
+        self._values: List[Tuple[int, str, Optional[float]]] = []
+        # (Position im Ergebnis von unpack, Name, erwarteter Wert)
+        self._markers: List[Tuple[int, str, bytes]] = []
+        position = 0
+        for index, field in enumerate(definition.get('fields', [])):
+            field_type = field.get('type')
+            field_name = field.get('name') or f"_{field_type}{index}"
+            if field_type in FIELD_TYPES:
+                code, numpy_type = FIELD_TYPES[field_type]
+                formats.append(code)
+                dtype.append((field_name, prefix + numpy_type))
+                self._values.append((position, field_name, field.get('scale')))
+            elif field_type == 'marker':
+                value = field.get('value', '')
+                value = value.encode('latin-1') if isinstance(value, str) else bytes(value)
+                formats.append(f"{len(value)}s")
+                dtype.append((field_name, f"S{len(value)}"))
+                self._markers.append((position, field_name, value))
+            elif field_type == 'bytes':
+                formats.append(f"{int(field['size'])}s")
+                dtype.append((field_name, f"S{int(field['size'])}"))
+                self._values.append((position, field_name, None))
+            elif field_type == 'padding':
+                formats.append(f"{int(field['size'])}x")
+                dtype.append((field_name, f"V{int(field['size'])}"))
+                continue
+            else:
+                raise ValueError(f"Schema {name}: unbekannter Feldtyp {field_type}")
+            position += 1
+
+        if not self._values:
+            raise ValueError(f"Schema {name}: keine Datenfelder")
+        self.struct = struct.Struct(prefix + ''.join(formats))
+        self.size = self.struct.size
+        self.fields = [field_name for _, field_name, _ in self._values]
+        self._dtype = dtype
+
+    def decode(self, payload: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Zerlegt eine Payload in typisierte Felder.
+
+        Parameter:
+        payload (bytes): Die binäre Payload
+
+        Rückgabewert:
+        Optional[dict]: Feldname -> Wert, None bei falscher Länge oder Marker
+        """
+        if len(payload) != self.size and not (self.allow_trailing and len(payload) > self.size):
+            return None
+        values = self.struct.unpack_from(payload)
+        for position, _, marker in self._markers:
+            if values[position] != marker:
+                return None
+        return {
+            name: values[position] * scale if scale else values[position]
+            for position, name, scale in self._values
+        }
+
+    @property
+    def dtype(self):
+        """NumPy-Structured-Dtype des Layouts (benötigt numpy)."""
+        if numpy is None:
+            raise RuntimeError("Batch-Dekodierung benötigt numpy")
+        return numpy.dtype(self._dtype)
+
+    def decode_batch(self, payloads: Iterable[bytes]) -> Dict[str, Any]:
+        """
+        Dekodiert viele Payloads mit einem frombuffer()-Aufruf. Payloads mit
+        falscher Länge oder falschen Markern werden übersprungen.
+
+        Parameter:
+        payloads (Iterable[bytes]): Die binären Payloads, z. B. eine Session-Spalte
+
+        Rückgabewert:
+        dict: Feldname -> NumPy-Array (skaliert) und "row" mit dem Index der
+              jeweiligen Payload in der Eingabe
+        """
+        payloads = list(payloads)
+        size = self.size
+        rows = [row for row, payload in enumerate(payloads)
+                if len(payload) == size or (self.allow_trailing and len(payload) > size)]
+        if self.allow_trailing:
+            buffer = b''.join(payloads[row][:size] for row in rows)
+        else:
+            buffer = b''.join(payloads[row] for row in rows)
+        return self._columns(buffer, rows)
+
+    def decode_hex_batch(self, hex_payloads: Iterable[str]) -> Dict[str, Any]:
+        """
+        Wie decode_batch für Hex-Strings (z. B. raw_data_hex der Session-CSVs);
+        alle passenden Strings werden mit einem unhexlify() umgewandelt.
+
+        Parameter:
+        hex_payloads (Iterable[str]): Die Payloads als Hex-Strings
+
+        Rückgabewert:
+        dict: Feldname -> NumPy-Array (skaliert) und "row"
+        """
+        hex_payloads = list(hex_payloads)
+        width = 2 * self.size
+        rows = [row for row, text in enumerate(hex_payloads)
+                if text and (len(text) == width or (self.allow_trailing and len(text) > width))]
+        try:
+            buffer = binascii.unhexlify(''.join(hex_payloads[row][:width] for row in rows))
+        except binascii.Error:
+            # Einzelne ungültige Strings: zeilenweise aussortieren
+            valid = []
+            for row in rows:
+                try:
+                    binascii.unhexlify(hex_payloads[row][:width])
+                    valid.append(row)
+                except binascii.Error:
+                    pass
+            rows = valid
+            buffer = binascii.unhexlify(''.join(hex_payloads[row][:width] for row in rows))
+        return self._columns(buffer, rows)
+
+    def _columns(self, buffer: bytes, rows: List[int]) -> Dict[str, Any]:
+        """Wandelt einen Puffer aus aneinandergereihten Records in Spalten um."""
+        records = numpy.frombuffer(buffer, dtype=self.dtype)
+        valid = numpy.ones(len(records), dtype=bool)
+        for _, name, marker in self._markers:
+            valid &= records[name] == marker
+        records = records[valid]
+        columns = {'row': numpy.asarray(rows, dtype=numpy.int64)[valid]}
+        for _, name, scale in self._values:
+            columns[name] = records[name] * scale if scale else records[name]
+        return columns
+
+
+class SchemaRegistry:
+    """
+    Ordnet Geräten und fPorts ein Schema zu (Gerät vor fPort) und zählt
+    dekodierte und nicht passende Payloads pro Schema.
+    """
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger):
+        """
+        Initialisiert die Registry.
+
+        Parameter:
+        config (dict): Die Konfigurationsparameter (Abschnitt schemas)
+        logger (logging.Logger): Der Logger für Ausgaben
+        """
+        schema_config = config.get("schemas", {})
+
+        self.logger = logger
+        self.schemas: Dict[str, PayloadSchema] = {}
+        definitions = dict(KNOWN_SCHEMAS)
+        definitions.update(schema_config.get("definitions", {}))
+        for name, definition in definitions.items():
+            try:
+                self.schemas[name] = PayloadSchema(name, definition)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Ungültiges Payload-Schema {name}: {e}")
+
+        self.devices = self._resolve_map(schema_config.get("devices", {}))
+        self.fports = {int(fport): schema
+                       for fport, schema in self._resolve_map(schema_config.get("fports", {})).items()}
+        self.counts: Dict[str, List[int]] = {name: [0, 0] for name in self.schemas}  # [dekodiert, abgelehnt]
+
+    def _resolve_map(self, mapping: Dict[str, str]) -> Dict[str, PayloadSchema]:
+        """Löst Schema-Namen einer Zuordnung auf, unbekannte Namen werden gemeldet."""
+        resolved = {}
+        for key, name in mapping.items():
+            schema = self.schemas.get(name)
+            if schema is None:
+                self.logger.error(f"Payload-Schema {name} für {key} nicht definiert")
+            else:
+                resolved[key] = schema
+        return resolved
+
+    def get(self, device: Optional[str] = None, fport: Optional[int] = None) -> Optional[PayloadSchema]:
+        """
+        Gibt das Schema eines Geräts bzw. fPorts zurück.
+
+        Parameter:
+        device (str): Der Device-Name bzw. die DevEUI
+        fport (int): Der LoRaWAN fPort
+
+        Rückgabewert:
+        Optional[PayloadSchema]: Das Schema oder None
+        """
+        schema = self.devices.get(device) if device is not None else None
+        if schema is None and fport is not None:
+            schema = self.fports.get(fport)
+        return schema
+
+    def decode(self, payload: bytes, device: Optional[str] = None,
+               fport: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Dekodiert eine Payload mit dem zugeordneten Schema.
+
+        Parameter:
+        payload (bytes): Die binäre Payload
+        device (str): Der Device-Name bzw. die DevEUI
+        fport (int): Der LoRaWAN fPort
+
+        Rückgabewert:
+        Optional[dict]: Die Felder oder None (kein Schema oder Payload passt nicht)
+        """
+        schema = self.get(device, fport)
+        if schema is None:
+            return None
+        fields = schema.decode(payload)
+        self.counts[schema.name][0 if fields is not None else 1] += 1
+        return fields
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Gibt die Zähler pro Schema zurück.
+
+        Rückgabewert:
+        dict: Schema -> decoded, rejected
+        """
+        return {name: {'decoded': decoded, 'rejected': rejected}
+                for name, (decoded, rejected) in self.counts.items() if decoded or rejected}
+
+
+def decode_session_payloads(paths: List[str], schema: PayloadSchema,
+                            fport: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Liest die raw_data_hex-Spalte von Session-Dateien (CSV oder Parquet) und
+    dekodiert alle passenden Uplinks auf einmal (benötigt numpy).
+
+    Parameter:
+    paths (List[str]): Dateien oder Verzeichnisse mit lorawan_session_*
+    schema (PayloadSchema): Das Layout
+    fport (int): Optional, nur Uplinks mit diesem fPort
+
+    Rückgabewert:
+    dict: Feldname -> Array sowie timestamp und device_eui der dekodierten Zeilen
+    """
+    timestamps, devices, payloads = [], [], []
+    columns = ['timestamp', 'device_eui', 'event_type', 'fport', 'raw_data_hex']
+    for row in iter_session_rows(paths, columns):
+        if row.get('event_type') != 'up':
+            continue
+        if fport is not None and str(row.get('fport')) != str(fport):
+            continue
+        timestamps.append(row.get('timestamp'))
+        devices.append(row.get('device_eui'))
+        payloads.append(row.get('raw_data_hex') or '')
+
+    columns = schema.decode_hex_batch(payloads)
+    rows = columns['row']
+    columns['timestamp'] = numpy.array(timestamps, dtype='datetime64[s]')[rows]
+    columns['device_eui'] = numpy.array(devices, dtype=object)[rows]
+    return columns
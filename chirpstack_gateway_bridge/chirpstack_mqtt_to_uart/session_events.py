@@ -0,0 +1,189 @@
+"""Rebuilds ChirpStack uplink events from recorded monitor session files (CSV or Parquet)."""
+
+import csv
+import glob
+import json
+import base64
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class RecordedEvent(NamedTuple):
+    """Ein aus einer Session-Zeile rekonstruiertes Uplink-Event."""
+    timestamp: float
+    topic: str
+    payload: bytes
+    device_eui: str
+    fcnt: Optional[int]
+
+
+def _to_number(value: Any, cast=float):
+    """Wandelt einen CSV- oder Parquet-Wert um, leere Werte werden zu None."""
+    if value in (None, ''):
+        return None
+    try:
+        return cast(float(value)) if cast is int else cast(value)
+    except ValueError:
+        return None
+
+
+def build_uplink_event(row: Dict[str, Any]) -> Optional[RecordedEvent]:
+    """
+    Baut aus einer Zeile von LoRaWANSystemMonitor.write_to_csv ein
+    ChirpStack-v4-Uplink-Event (JSON) samt Topic.
+
+    Parameter:
+    row (dict): Eine Session-Zeile (CSV: Texte, Parquet: typisierte Werte)
+
+    Rückgabewert:
+    Optional[RecordedEvent]: Das Event oder None, wenn die Zeile kein Uplink mit Daten ist
+    """
+    if row.get('event_type') != 'up' or not row.get('raw_data_hex'):
+        return None
+    try:
+        data = bytes.fromhex(row['raw_data_hex'])
+        timestamp = row['timestamp']
+        if not isinstance(timestamp, datetime):
+            timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    application_id = row.get('application_id') or 'unknown'
+    device_eui = row.get('device_eui') or 'unknown'
+    fcnt = _to_number(row.get('fcnt'), int)
+
+    rx_info = {
+        "gatewayId": row.get('gateway_id') or "0000000000000000",
+        "rssi": _to_number(row.get('rssi_dbm'), int),
+        "snr": _to_number(row.get('snr_db')),
+        "channel": 0,
+        "rfChain": 0,
+        "context": "AAAAAA==",
+        "metadata": {"region_config_id": "eu868", "region_common_name": "EU868"},
+        "crcStatus": "CRC_OK"
+    }
+    if row.get('gateway_lat') not in (None, ''):
+        rx_info["location"] = {
+            "latitude": _to_number(row.get('gateway_lat')),
+            "longitude": _to_number(row.get('gateway_lon')),
+            "altitude": _to_number(row.get('gateway_alt'))
+        }
+
+    spreading_factor = str(row.get('spreading_factor') or '').upper().lstrip('SF')
+    event = {
+        "deduplicationId": str(uuid.uuid4()),
+        "time": timestamp.isoformat(),
+        "deviceInfo": {
+            "tenantName": "ChirpStack",
+            "applicationId": application_id,
+            "deviceName": device_eui,
+            "devEui": device_eui,
+            "deviceClassEnabled": "CLASS_A",
+            "tags": {}
+        },
+        "devAddr": "00000000",
+        "adr": True,
+        "dr": 0,
+        "fCnt": fcnt,
+        "fPort": _to_number(row.get('fport'), int),
+        "confirmed": False,
+        "data": base64.b64encode(data).decode('ascii'),
+        "rxInfo": [rx_info],
+        "txInfo": {
+            "frequency": _to_number(row.get('frequency'), int),
+            "modulation": {
+                "lora": {
+                    "bandwidth": _to_number(row.get('bandwidth'), int),
+                    "spreadingFactor": _to_number(spreading_factor, int),
+                    "codeRate": "CR_4_5"
+                }
+            }
+        }
+    }
+
+    topic = f"application/{application_id}/device/{device_eui}/event/up"
+    return RecordedEvent(timestamp.timestamp(), topic, json.dumps(event).encode('utf-8'),
+                         device_eui, fcnt)
+
+
+def session_files(paths: List[str]) -> List[str]:
+    """
+    Sammelt die Session-Dateien. In Verzeichnissen werden lorawan_session_*.csv
+    und *.parquet gesucht; gibt es beide Formate einer Session, gilt Parquet.
+
+    Parameter:
+    paths (List[str]): Dateien oder Verzeichnisse
+
+    Rückgabewert:
+    List[str]: Die Dateien
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        found = sorted(glob.glob(os.path.join(path, "lorawan_session_*.csv")) +
+                       glob.glob(os.path.join(path, "lorawan_session_*.parquet")))
+        parquet = {os.path.splitext(file_path)[0] for file_path in found if file_path.endswith('.parquet')}
+        files += [file_path for file_path in found
+                  if file_path.endswith('.parquet') or os.path.splitext(file_path)[0] not in parquet]
+    return files
+
+
+def iter_session_rows(paths: List[str], columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Liest Session-Dateien zeilenweise. Parquet wird pro Row Group gelesen
+    (benötigt pyarrow) und liefert typisierte Werte statt Texten.
+
+    Parameter:
+    paths (List[str]): Dateien oder Verzeichnisse
+    columns (List[str]): Optional, nur diese Spalten aus Parquet lesen
+
+    Rückgabewert:
+    Iterator[dict]: Die Zeilen
+    """
+    for file_path in session_files(paths):
+        if file_path.endswith('.parquet'):
+            if pyarrow is None:
+                raise RuntimeError(f"pyarrow wird zum Lesen von {file_path} benötigt")
+            for batch in pyarrow.parquet.ParquetFile(file_path).iter_batches(columns=columns):
+                yield from batch.to_pylist()
+        else:
+            with open(file_path, newline='', encoding='utf-8') as csvfile:
+                yield from csv.DictReader(csvfile)
+
+
+def iter_session_events(paths: List[str]) -> Iterator[RecordedEvent]:
+    """
+    Liest Session-Dateien und liefert die rekonstruierten Uplinks in Dateireihenfolge.
+
+    Parameter:
+    paths (List[str]): CSV-/Parquet-Dateien oder Verzeichnisse mit lorawan_session_*
+
+    Rückgabewert:
+    Iterator[RecordedEvent]: Die Events
+    """
+    for row in iter_session_rows(paths):
+        event = build_uplink_event(row)
+        if event:
+            yield event
+
+
+def load_session_events(paths: List[str]) -> List[RecordedEvent]:
+    """
+    Lädt alle Uplinks und sortiert sie nach Zeitstempel.
+
+    Parameter:
+    paths (List[str]): CSV-Dateien oder Verzeichnisse
+
+    Rückgabewert:
+    List[RecordedEvent]: Die Events in zeitlicher Reihenfolge
+    """
+    return sorted(iter_session_events(paths), key=lambda event: event.timestamp)
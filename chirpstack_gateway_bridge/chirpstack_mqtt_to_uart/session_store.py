@@ -0,0 +1,265 @@
+"""Indexed SQLite session store for recorded monitor session data.
+
+Die Tabelle events entspricht den Spalten der Session-CSVs und wird von
+lorawan_system_monitor.py (SESSION_DB_PATH) im WAL-Modus befüllt. Über die
+Indizes auf (device_eui, timestamp), (gateway_id, timestamp) und
+session_id beantworten Abfragen wie "alle Uplinks von Gerät X zwischen zwei
+Zeitpunkten" ohne alle Session-Dateien zu lesen.
+
+Aufruf (aus chirpstack_gateway_bridge/):
+    python -m chirpstack_mqtt_to_uart.session_store DB import ../Lora_Sesion_Data
+    python -m chirpstack_mqtt_to_uart.session_store DB query --device 78563412efbeadde
+        --from "2025-07-16 07:00:00" --to "2025-07-16 08:00:00" [--json]
+    python -m chirpstack_mqtt_to_uart.session_store DB devices|sessions
+"""
+
+import csv
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .session_events import iter_session_rows, session_files
+
+COLUMNS = [
+    ('timestamp', 'TEXT'), ('session_id', 'TEXT'), ('application_id', 'TEXT'), ('device_eui', 'TEXT'),
+    ('event_type', 'TEXT'), ('fcnt', 'INTEGER'), ('fport', 'INTEGER'), ('raw_data_hex', 'TEXT'),
+    ('raw_data_ascii', 'TEXT'), ('decoded_payload', 'TEXT'), ('gateway_id', 'TEXT'),
+    ('rssi_dbm', 'INTEGER'), ('snr_db', 'REAL'), ('spreading_factor', 'INTEGER'),
+    ('bandwidth', 'INTEGER'), ('frequency', 'INTEGER'), ('gateway_lat', 'REAL'), ('gateway_lon', 'REAL'),
+    ('gateway_alt', 'REAL'), ('device_lat', 'REAL'), ('device_lon', 'REAL'), ('device_alt', 'REAL'),
+    ('battery_level', 'INTEGER'), ('margin_db', 'INTEGER'), ('acknowledged', 'INTEGER'),
+    ('gps_source', 'TEXT'), ('gps_format', 'TEXT')
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    {', '.join(f'{name} {sql_type}' for name, sql_type in COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS events_device_time ON events (device_eui, timestamp);
+CREATE INDEX IF NOT EXISTS events_gateway_time ON events (gateway_id, timestamp);
+CREATE INDEX IF NOT EXISTS events_session ON events (session_id);
+"""
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+INSERT_BATCH = 5000
+
+
+def _convert(value: Any, sql_type: str) -> Any:
+    """Wandelt einen CSV- oder Parquet-Wert in den Spaltentyp um, ungültige Werte werden zu None."""
+    if value is None or value == '':
+        return None
+    try:
+        if sql_type == 'INTEGER':
+            if value in ('True', 'False'):
+                return int(value == 'True')
+            if isinstance(value, str):
+                value = value.upper().lstrip('SF')
+            return int(float(value))
+        if sql_type == 'REAL':
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return str(value)
+
+
+def _timestamp(value: Union[str, datetime, None]) -> Optional[str]:
+    """Zeitgrenze als Text im Format der Tabelle."""
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value
+
+
+class SessionStore:
+    """
+    Zugriff auf die SQLite-Datenbank mit Session-Events (WAL-Modus, damit
+    Abfragen parallel zum schreibenden Monitor laufen).
+    """
+
+    def __init__(self, path: str):
+        """
+        Öffnet oder erstellt die Datenbank.
+
+        Parameter:
+        path (str): Pfad der Datenbankdatei
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def insert_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Fügt Session-Zeilen in Transaktionen zu je INSERT_BATCH Zeilen ein.
+
+        Parameter:
+        rows (Iterable[dict]): Zeilen mit den Spalten der Session-CSVs
+
+        Rückgabewert:
+        int: Anzahl eingefügter Zeilen
+        """
+        statement = (f"INSERT INTO events ({', '.join(COLUMN_NAMES)}) "
+                     f"VALUES ({', '.join('?' * len(COLUMNS))})")
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(tuple(_convert(row.get(name), sql_type) for name, sql_type in COLUMNS))
+            if len(batch) >= INSERT_BATCH:
+                with self.connection:
+                    self.connection.executemany(statement, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            with self.connection:
+                self.connection.executemany(statement, batch)
+            count += len(batch)
+        return count
+
+    def import_files(self, paths: List[str]) -> int:
+        """
+        Importiert Session-Dateien (CSV oder Parquet). Sessions, die bereits
+        in der Datenbank stehen, und Zeilen ohne session_id werden übersprungen.
+
+        Parameter:
+        paths (List[str]): Dateien oder Verzeichnisse mit lorawan_session_*
+
+        Rückgabewert:
+        int: Anzahl importierter Zeilen
+        """
+        known = {row[0] for row in self.connection.execute("SELECT DISTINCT session_id FROM events")}
+        count = 0
+        for file_path in session_files(paths):
+            count += self.insert_rows(row for row in iter_session_rows([file_path])
+                                      if row.get('session_id') and row['session_id'] not in known)
+        return count
+
+    def query(self, device: Optional[str] = None, gateway: Optional[str] = None,
+              session: Optional[str] = None, event_type: Optional[str] = None,
+              fport: Optional[int] = None, start: Union[str, datetime, None] = None,
+              end: Union[str, datetime, None] = None, columns: Optional[List[str]] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Liefert Events nach Zeit sortiert. Alle Filter sind optional.
+
+        Parameter:
+        device (str): device_eui
+        gateway (str): gateway_id
+        session (str): session_id
+        event_type (str): z. B. "up"
+        fport (int): fPort
+        start (str/datetime): Ab diesem Zeitpunkt (einschließlich)
+        end (str/datetime): Bis zu diesem Zeitpunkt (ausschließlich)
+        columns (List[str]): Optional, nur diese Spalten
+        limit (int): Optional, maximale Anzahl Zeilen
+
+        Rückgabewert:
+        List[dict]: Die Events
+        """
+        selected = columns or COLUMN_NAMES
+        unknown = set(selected) - set(COLUMN_NAMES)
+        if unknown:
+            raise ValueError(f"Unbekannte Spalten: {', '.join(sorted(unknown))}")
+
+        conditions = []
+        params: List[Any] = []
+        for column, value in (('device_eui', device), ('gateway_id', gateway), ('session_id', session),
+                              ('event_type', event_type), ('fport', fport)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(_timestamp(start))
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(_timestamp(end))
+
+        sql = f"SELECT {', '.join(selected)} FROM events"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp, id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def _summary(self, column: str) -> List[Dict[str, Any]]:
+        sql = (f"SELECT {column}, COUNT(*) AS events, MIN(timestamp) AS first_seen, "
+               f"MAX(timestamp) AS last_seen FROM events GROUP BY {column} ORDER BY {column}")
+        return [dict(row) for row in self.connection.execute(sql)]
+
+    def devices(self) -> List[Dict[str, Any]]:
+        """Geräte mit Anzahl Events sowie erstem und letztem Zeitstempel."""
+        return self._summary('device_eui')
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        """Sessions mit Anzahl Events sowie erstem und letztem Zeitstempel."""
+        return self._summary('session_id')
+
+    def close(self):
+        """Schließt die Verbindung."""
+        self.connection.close()
+
+
+def _print_rows(rows: List[Dict[str, Any]], as_json: bool):
+    if as_json:
+        for row in rows:
+            print(json.dumps(row))
+        return
+    if rows:
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('database', help='SQLite-Datenbank (z. B. Lora_Sesion_Data/lorawan_sessions.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='Session-Dateien (CSV/Parquet) importieren')
+    import_parser.add_argument('paths', nargs='+')
+
+    query_parser = commands.add_parser('query', help='Events abfragen (CSV auf stdout)')
+    query_parser.add_argument('--device')
+    query_parser.add_argument('--gateway')
+    query_parser.add_argument('--session')
+    query_parser.add_argument('--event', dest='event_type')
+    query_parser.add_argument('--fport', type=int)
+    query_parser.add_argument('--from', dest='start', help='"JJJJ-MM-TT HH:MM:SS", einschließlich')
+    query_parser.add_argument('--to', dest='end', help='"JJJJ-MM-TT HH:MM:SS", ausschließlich')
+    query_parser.add_argument('--columns', help='Kommagetrennte Spalten')
+    query_parser.add_argument('--limit', type=int)
+    query_parser.add_argument('--json', action='store_true', help='Eine JSON-Zeile pro Event')
+
+    for name in ('devices', 'sessions'):
+        summary_parser = commands.add_parser(name, help=f'Übersicht der {name}')
+        summary_parser.add_argument('--json', action='store_true')
+
+    args = parser.parse_args()
+    store = SessionStore(args.database)
+    try:
+        if args.command == 'import':
+            print(f"{store.import_files(args.paths)} Zeilen importiert", file=sys.stderr)
+        elif args.command == 'query':
+            rows = store.query(device=args.device, gateway=args.gateway, session=args.session,
+                               event_type=args.event_type, fport=args.fport, start=args.start,
+                               end=args.end, limit=args.limit,
+                               columns=args.columns.split(',') if args.columns else None)
+            _print_rows(rows, args.json)
+        else:
+            _print_rows(getattr(store, args.command)(), args.json)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
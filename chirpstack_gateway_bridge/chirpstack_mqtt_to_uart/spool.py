@@ -0,0 +1,317 @@
+"""Store-and-forward spool module for ChirpStack MQTT to UART Bridge.
+
+Der Spool besteht aus einem Ring von gleich großen Segmentdateien, die per
+mmap beschrieben werden. Jeder Eintrag hat den Aufbau
+
+    Länge (u32) | CRC-32 (u32) | Sequenznummer (u64) | Device | fPort | Daten
+
+und ist nur gültig, wenn CRC und die erwartete Sequenznummer passen; alte
+Einträge aus einer früheren Runde im Ring werden so erkannt. Lese- und
+Schreibposition stehen in der Datei "spool.meta". Daten und Metadaten
+werden gebündelt alle fsync_interval Sekunden auf die Karte geschrieben.
+"""
+
+import os
+import mmap
+import time
+import zlib
+import struct
+import logging
+import threading
+from typing import Dict, Any, List, NamedTuple, Optional
+
+
+_HEADER = struct.Struct("<IIQ")
+_META = struct.Struct("<IIQIIQ")
+_FPORT = struct.Struct("<h")
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+
+class SpoolRecord(NamedTuple):
+    """Ein gespoolter UART-Frame."""
+    seq: int
+    device: Optional[str]
+    fport: Optional[int]
+    data: bytes
+
+
+class Spool:
+    """Persistenter FIFO-Ringpuffer für nicht zustellbare UART-Frames."""
+
+    def __init__(self, path: str, config: Dict[str, Any], logger: logging.Logger):
+        """
+        Öffnet oder erstellt den Spool.
+
+        Parameter:
+        path (str): Verzeichnis für Segmente und Metadaten
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        """
+        spool_config = config.get("spool", {})
+
+        self.path = path
+        self.logger = logger
+        self.segment_size = int(spool_config.get("segment_size", 1024 * 1024))
+        self.segment_count = max(2, int(spool_config.get("segments", 8)))
+        self.fsync_interval = float(spool_config.get("fsync_interval", 1.0))
+        self.overflow_policy = spool_config.get("overflow_policy", "drop_oldest")
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            self.logger.warning(f"Unbekannte overflow_policy '{self.overflow_policy}' für Spool, verwende 'drop_oldest'")
+            self.overflow_policy = "drop_oldest"
+
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._meta_dirty = False
+        self._last_flush = time.monotonic()
+
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "spool.meta")
+        fresh = not os.path.exists(self._meta_path)
+        self._files = []
+        self._maps = []
+        for index in range(self.segment_count):
+            segment_path = os.path.join(path, f"segment-{index:03d}.spool")
+            handle = open(segment_path, "a+b")
+            if fresh or os.path.getsize(segment_path) != self.segment_size:
+                # Ohne Metadaten sind alte Einträge nicht zuordenbar und werden verworfen
+                handle.truncate(0)
+                handle.truncate(self.segment_size)
+            self._files.append(handle)
+            self._maps.append(mmap.mmap(handle.fileno(), self.segment_size))
+
+        # Lese- und Schreibposition: (Segment, Offset, Sequenznummer)
+        self._read = (0, 0, 0)
+        self._write = (0, 0, 0)
+        if not fresh:
+            self._load_meta()
+        self._recover()
+
+        if self.pending():
+            self.logger.info(f"Spool {path}: {self.pending()} Frames aus vorherigem Lauf zum Nachsenden")
+
+    def _load_meta(self) -> None:
+        """Liest Lese- und Schreibposition aus der Metadatei."""
+        try:
+            with open(self._meta_path, "rb") as handle:
+                values = _META.unpack(handle.read(_META.size))
+            self._read, self._write = values[:3], values[3:]
+            if self._read[0] >= self.segment_count or self._write[0] >= self.segment_count:
+                raise ValueError("Segmentanzahl geändert")
+        except (OSError, struct.error, ValueError) as e:
+            self.logger.warning(f"Spool-Metadaten unbrauchbar ({e}), Spool wird geleert")
+            self._read = self._write = (0, 0, 0)
+
+    def _recover(self) -> None:
+        """Übernimmt Einträge, die nach dem letzten Sichern der Metadaten geschrieben wurden."""
+        position = self._write
+        while True:
+            record, next_position = self._read_at(position)
+            if record is None:
+                break
+            position = next_position
+        if position != self._write:
+            self._write = position
+            self._meta_dirty = True
+
+    def _read_at(self, position: tuple):
+        """
+        Liest den Eintrag mit der Sequenznummer der Position, ggf. am Anfang
+        des nächsten Segments. Gibt (None, position) zurück, wenn keiner existiert.
+        """
+        segment, offset, seq = position
+        for candidate in ((segment, offset), ((segment + 1) % self.segment_count, 0)):
+            record = self._decode(candidate[0], candidate[1], seq)
+            if record is not None:
+                size = _HEADER.size + record[1]
+                return record[0], (candidate[0], candidate[1] + size, seq + 1)
+        return None, position
+
+    def _decode(self, segment: int, offset: int, seq: int):
+        """Prüft und dekodiert einen Eintrag an einer Stelle."""
+        if offset + _HEADER.size > self.segment_size:
+            return None
+        mm = self._maps[segment]
+        length, crc, record_seq = _HEADER.unpack_from(mm, offset)
+        end = offset + _HEADER.size + length
+        if record_seq != seq or length < 3 or end > self.segment_size:
+            return None
+        body = mm[offset + _HEADER.size:end]
+        if zlib.crc32(body, seq & 0xFFFFFFFF) != crc:
+            return None
+        name_length = body[0]
+        device = body[1:1 + name_length].decode('utf-8', errors='replace') if name_length else None
+        fport = _FPORT.unpack_from(body, 1 + name_length)[0]
+        data = body[3 + name_length:]
+        return SpoolRecord(seq, device, None if fport < 0 else fport, data), length
+
+    def pending(self) -> int:
+        """Gibt die Anzahl noch nicht nachgesendeter Frames zurück."""
+        return self._write[2] - self._read[2]
+
+    def append(self, data: bytes, device: Optional[str] = None, fport: Optional[int] = None) -> Optional[int]:
+        """
+        Hängt einen Frame an den Spool an.
+
+        Parameter:
+        data (bytes): Der UART-Frame
+        device (str): Optionaler Device-Name
+        fport (int): Optionaler LoRaWAN fPort
+
+        Rückgabewert:
+        Optional[int]: Sequenznummer des Eintrags oder None, wenn der Frame
+                       verworfen wurde (zu groß oder Spool voll bei drop_newest)
+        """
+        name = (device or "").encode('utf-8')[:255]
+        body = bytes((len(name),)) + name + _FPORT.pack(-1 if fport is None else fport) + data
+        size = _HEADER.size + len(body)
+        if size > self.segment_size:
+            self.logger.error(f"Frame ({len(data)} Bytes) größer als ein Spool-Segment, verworfen")
+            self.dropped += 1
+            return None
+
+        with self._lock:
+            segment, offset, seq = self._write
+            if offset + size > self.segment_size:
+                segment, offset = (segment + 1) % self.segment_count, 0
+                if segment == self._read[0] and self.pending():
+                    if self.overflow_policy == "drop_newest":
+                        self.dropped += 1
+                        return None
+                    self._drop_segment(segment)
+                    if not self.pending():
+                        self._read = (segment, 0, seq)
+
+            mm = self._maps[segment]
+            _HEADER.pack_into(mm, offset, len(body), zlib.crc32(body, seq & 0xFFFFFFFF), seq)
+            mm[offset + _HEADER.size:offset + size] = body
+            self._write = (segment, offset + size, seq + 1)
+            self._dirty.add(segment)
+            self._meta_dirty = True
+            self.spooled += 1
+            self._maybe_flush()
+        return seq
+
+    def _drop_segment(self, segment: int) -> None:
+        """Verwirft die ältesten Einträge, bis das Segment frei ist (Policy drop_oldest)."""
+        position = self._read
+        while position[0] == segment and position[2] < self._write[2]:
+            record, position = self._read_at(position)
+            if record is None:
+                position = self._write
+                break
+            if position[0] != segment:
+                # Der Eintrag lag bereits im nächsten Segment, er bleibt erhalten
+                position = (position[0], 0, record.seq)
+                break
+        dropped = position[2] - self._read[2]
+        if dropped > 0:
+            self.dropped += dropped
+            self.logger.warning(f"Spool voll, {dropped} älteste Frames verworfen")
+        self._read = position
+
+    def peek(self, max_bytes: int) -> List[SpoolRecord]:
+        """
+        Gibt die ältesten Frames zurück, ohne sie zu entfernen.
+
+        Parameter:
+        max_bytes (int): Maximale Summe der Frame-Größen (mindestens ein Frame)
+
+        Rückgabewert:
+        List[SpoolRecord]: Die Frames in Reihenfolge
+        """
+        records = []
+        size = 0
+        with self._lock:
+            position = self._read
+            while position[2] < self._write[2]:
+                record, next_position = self._read_at(position)
+                if record is None:
+                    self.logger.error(f"Spool beschädigt bei Eintrag {position[2]}, Rest wird verworfen")
+                    self.dropped += self._write[2] - position[2]
+                    self._read = self._write
+                    self._meta_dirty = True
+                    break
+                if records and size + len(record.data) > max_bytes:
+                    break
+                records.append(record)
+                size += len(record.data)
+                position = next_position
+        return records
+
+    def commit(self, count: int) -> None:
+        """
+        Entfernt die ersten count Frames nach erfolgreichem Nachsenden.
+
+        Parameter:
+        count (int): Anzahl der zugestellten Frames
+        """
+        with self._lock:
+            position = self._read
+            for _ in range(min(count, self.pending())):
+                record, position = self._read_at(position)
+                if record is None:
+                    position = self._write
+                    break
+            self.replayed += position[2] - self._read[2]
+            self._read = position
+            self._meta_dirty = True
+            self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if time.monotonic() - self._last_flush >= self.fsync_interval:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Schreibt geänderte Segmente und die Metadaten auf die Karte."""
+        for segment in self._dirty:
+            self._maps[segment].flush()
+        self._dirty.clear()
+        if self._meta_dirty:
+            temp_path = self._meta_path + ".tmp"
+            with open(temp_path, "wb") as handle:
+                handle.write(_META.pack(*self._read, *self._write))
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temp_path, self._meta_path)
+            self._meta_dirty = False
+        self._last_flush = time.monotonic()
+
+    def sync(self) -> None:
+        """Schreibt ausstehende Änderungen, sobald fsync_interval abgelaufen ist."""
+        with self._lock:
+            if self._dirty or self._meta_dirty:
+                self._maybe_flush()
+
+    def flush(self) -> None:
+        """Erzwingt das Schreiben aller ausstehenden Änderungen."""
+        with self._lock:
+            self._flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Gibt die Spool-Statistiken zurück.
+
+        Rückgabewert:
+        dict: Wartende, gespoolte, nachgesendete und verworfene Frames
+        """
+        return {
+            'pending': self.pending(),
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'dropped': self.dropped
+        }
+
+    def close(self) -> None:
+        """Sichert den Spool und schließt alle Segmente."""
+        with self._lock:
+            self._flush()
+            for mm in self._maps:
+                mm.close()
+            for handle in self._files:
+                handle.close()
+            self._maps = []
+            self._files = []
@@ -2,40 +2,271 @@
 
 import time
 import logging
-from typing import Dict, Any
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from .histogram import LatencyHistogram
+
+
+# Verarbeitungsstufen in Reihenfolge des Nachrichtenflusses
+STAGES = (
+    'parse',        # MQTT-Empfang (bzw. Entnahme aus der Pipeline) bis Event geparst
+    'decode',       # Base64/Hex-Dekodierung und Validierung
+    'frame',        # Aufbau des UART-Frames
+    'queue_wait',   # Wartezeit in der Pipeline-Queue
+    'uart_queue',   # Wartezeit im UART-Writer bis zum Write
+    'uart_write',   # write() auf die serielle Schnittstelle
+    'uart_drain'    # flush() bis alle Bytes übertragen sind
+)
+
+
+# Zähler, die pro Thread summiert werden
+COUNTERS = (
+    'messages_received', 'messages_sent', 'errors', 'decode_errors',
+    'messages_dropped', 'queue_wait_count', 'queue_wait_total'
+)
+
+# Gewicht eines neuen Abstands im gleitenden Mittel der Ankunftsabstände
+EWMA_ALPHA = 0.2
+# Ein Gerät gilt frühestens nach so vielen mittleren Abständen als still
+SILENT_INTERVALS = 3
+
+# Felder eines Geräteeintrags in einem Shard
+_RECEIVED, _SENT, _BYTES, _ERRORS, _LAST_SEEN, _INTERVAL = range(6)
+
+
+def format_duration(seconds: float) -> str:
+    """Formatiert eine Dauer als HH:MM:SS, ab einem Tag mit vorangestellten Tagen (z. B. "2d 03:00:00")."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    text = f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{days}d {text}" if days else text
+
+
+class _Shard:
+    """Zähler eines einzelnen Threads; nur dieser Thread schreibt hinein."""
+
+    __slots__ = ('counters', 'shed', 'queue_wait_max', 'devices')
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.counters['queue_wait_total'] = 0.0
+        self.shed: Dict[str, int] = {}
+        self.queue_wait_max = 0.0
+        # Device -> [empfangen, gesendet, Bytes, Fehler, zuletzt gesehen, mittlerer Abstand]
+        self.devices: Dict[str, list] = {}
 
 
 class StatsManager:
-    """Manages statistics and performance monitoring."""
+    """
+    Manages statistics and performance monitoring.
 
-    def __init__(self, logger: logging.Logger):
+    Zähler werden pro Thread in einem eigenen Shard geführt, sodass die
+    Callbacks ohne gemeinsames Lock zählen können; get_stats() und
+    get_device_stats() führen die Shards erst bei der Abfrage zusammen.
+    """
+
+    def __init__(self, logger: logging.Logger, config: Optional[Dict[str, Any]] = None):
         """
         Initialisiert den Stats Manager.
 
         Parameter:
         logger (logging.Logger): Der Logger für Ausgaben
+        config (dict): Optional, die Konfigurationsparameter (Abschnitt system)
         """
+        system_config = (config or {}).get("system", {})
+
         self.logger = logger
-        self.stats = {
-            'messages_received': 0,
-            'messages_sent': 0,
-            'errors': 0,
+        self.top_devices = int(system_config.get("stats_top_devices", 5))
+        self.silent_after = float(system_config.get("silent_after", 900))
+        self.stats = self._initial_stats()
+        self.stages: Dict[str, LatencyHistogram] = OrderedDict((stage, LatencyHistogram()) for stage in STAGES)
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+
+    @staticmethod
+    def _initial_stats() -> Dict[str, Any]:
+        """Gibt die Werte zurück, die nicht pro Thread gezählt werden."""
+        return {
+            'queue_depth': 0,
+            'queue_depth_max': 0,
             'last_message_time': None,
             'start_time': time.time()
         }
 
+    def _shard(self) -> _Shard:
+        """Gibt den Shard des aufrufenden Threads zurück und legt ihn bei Bedarf an."""
+        shard = getattr(self._local, 'shard', None)
+        shards = self._shards
+        if shard is None or getattr(self._local, 'shards', None) is not shards:
+            shard = _Shard()
+            with self._shards_lock:
+                shards = self._shards
+                shards.append(shard)
+            self._local.shard = shard
+            self._local.shards = shards
+        return shard
+
+    def _device(self, shard: _Shard, device: str) -> list:
+        """Gibt den Geräteeintrag eines Shards zurück und legt ihn bei Bedarf an."""
+        entry = shard.devices.get(device)
+        if entry is None:
+            entry = shard.devices[device] = [0, 0, 0, 0, None, None]
+        return entry
+
     def increment_received(self) -> None:
         """Erhöht den Zähler für empfangene Nachrichten."""
-        self.stats['messages_received'] += 1
+        self._shard().counters['messages_received'] += 1
         self.stats['last_message_time'] = time.time()
 
     def increment_sent(self) -> None:
         """Erhöht den Zähler für gesendete Nachrichten."""
-        self.stats['messages_sent'] += 1
+        self._shard().counters['messages_sent'] += 1
+
+    def record_device_received(self, device: str) -> None:
+        """
+        Zählt eine empfangene Nachricht eines Geräts und aktualisiert den
+        gleitenden Mittelwert der Ankunftsabstände.
+
+        Parameter:
+        device (str): Der Device-Name
+        """
+        entry = self._device(self._shard(), device)
+        now = time.time()
+        last_seen = entry[_LAST_SEEN]
+        if last_seen is not None and now >= last_seen:
+            interval = now - last_seen
+            average = entry[_INTERVAL]
+            entry[_INTERVAL] = interval if average is None else average + EWMA_ALPHA * (interval - average)
+        entry[_LAST_SEEN] = now
+        entry[_RECEIVED] += 1
+
+    def record_device_sent(self, device: str, size: int) -> None:
+        """
+        Zählt eine an den UART gesendete Nachricht eines Geräts.
+
+        Parameter:
+        device (str): Der Device-Name
+        size (int): Größe des UART-Frames in Bytes
+        """
+        entry = self._device(self._shard(), device)
+        entry[_SENT] += 1
+        entry[_BYTES] += size
+
+    def get_device_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Führt die Gerätezähler aller Threads zusammen. Sieht jeder Thread nur
+        einen Teil der Nachrichten eines Geräts, addieren sich die Raten der
+        Teilströme; der mittlere Abstand ist der Kehrwert ihrer Summe.
+
+        Rückgabewert:
+        dict: Device -> messages, sent, bytes, errors, last_seen (Unix-Zeit)
+              und interval (mittlerer Ankunftsabstand in Sekunden oder None)
+        """
+        merged: Dict[str, list] = {}
+        for shard in list(self._shards):
+            for device, entry in list(shard.devices.items()):
+                received, sent, size, errors, last_seen, interval = entry
+                total = merged.get(device)
+                if total is None:
+                    total = merged[device] = [0, 0, 0, 0, None, 0.0]
+                total[_RECEIVED] += received
+                total[_SENT] += sent
+                total[_BYTES] += size
+                total[_ERRORS] += errors
+                if last_seen is not None and (total[_LAST_SEEN] is None or last_seen > total[_LAST_SEEN]):
+                    total[_LAST_SEEN] = last_seen
+                if interval:
+                    total[_INTERVAL] += 1.0 / interval
+
+        return {
+            device: {
+                'messages': received,
+                'sent': sent,
+                'bytes': size,
+                'errors': errors,
+                'last_seen': last_seen,
+                'interval': 1.0 / rate if rate else None
+            }
+            for device, (received, sent, size, errors, last_seen, rate) in merged.items()
+        }
+
+    def increment_errors(self, device: Optional[str] = None) -> None:
+        """
+        Erhöht den Fehlerzähler.
+
+        Parameter:
+        device (str): Optional, das betroffene Gerät
+        """
+        shard = self._shard()
+        shard.counters['errors'] += 1
+        if device is not None:
+            self._device(shard, device)[_ERRORS] += 1
+
+    def increment_decode_errors(self, device: Optional[str] = None) -> None:
+        """
+        Erhöht den Fehlerzähler für nicht dekodierbare Payloads.
+
+        Parameter:
+        device (str): Optional, das betroffene Gerät
+        """
+        self._shard().counters['decode_errors'] += 1
+        self.increment_errors(device)
+
+    def increment_dropped(self) -> None:
+        """Erhöht den Zähler für wegen voller Queue verworfene Nachrichten."""
+        self._shard().counters['messages_dropped'] += 1
+
+    def increment_shed(self, reason: str) -> None:
+        """
+        Erhöht den Zähler für wegen Überlast verworfene Frames.
+
+        Parameter:
+        reason (str): Grund des Verwerfens (oldest, duplicate, ttl)
+        """
+        shed = self._shard().shed
+        shed[reason] = shed.get(reason, 0) + 1
+
+    def update_queue_depth(self, depth: int) -> None:
+        """
+        Aktualisiert die aktuelle Queue-Tiefe.
+
+        Parameter:
+        depth (int): Anzahl der Nachrichten in der Queue
+        """
+        self.stats['queue_depth'] = depth
+        if depth > self.stats['queue_depth_max']:
+            self.stats['queue_depth_max'] = depth
 
-    def increment_errors(self) -> None:
-        """Erhöht den Fehlerzähler."""
-        self.stats['errors'] += 1
+    def record_queue_wait(self, wait_time: float) -> None:
+        """
+        Erfasst die Wartezeit einer Nachricht in der Queue.
+
+        Parameter:
+        wait_time (float): Wartezeit in Sekunden
+        """
+        shard = self._shard()
+        shard.counters['queue_wait_count'] += 1
+        shard.counters['queue_wait_total'] += wait_time
+        if wait_time > shard.queue_wait_max:
+            shard.queue_wait_max = wait_time
+        self.stages['queue_wait'].record(wait_time)
+
+    def record_stage(self, stage: str, duration: float) -> None:
+        """
+        Erfasst die Dauer einer Verarbeitungsstufe im Histogramm der Stufe.
+
+        Parameter:
+        stage (str): Name der Stufe (siehe STAGES, weitere werden angelegt)
+        duration (float): Dauer in Sekunden
+        """
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages.setdefault(stage, LatencyHistogram())
+        histogram.record(duration)
 
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -44,26 +275,98 @@ class StatsManager:
         Rückgabewert:
         dict: Die aktuellen Statistiken
         """
-        return self.stats.copy()
+        stats = self.stats.copy()
+        stats.update(dict.fromkeys(COUNTERS, 0))
+        stats['queue_wait_max'] = 0.0
+        shed: Dict[str, int] = {}
+        for shard in list(self._shards):
+            for name, value in list(shard.counters.items()):
+                stats[name] += value
+            for reason, count in list(shard.shed.items()):
+                shed[reason] = shed.get(reason, 0) + count
+            stats['queue_wait_max'] = max(stats['queue_wait_max'], shard.queue_wait_max)
+        stats['messages_shed'] = shed
+        stats['stages'] = {stage: histogram.get_stats() for stage, histogram in list(self.stages.items())}
+        return stats
 
     def print_stats(self) -> None:
         """Gibt die erweiterten Statistiken aus."""
-        uptime = time.time() - self.stats['start_time']
-        uptime_str = time.strftime("%H:%M:%S", time.gmtime(uptime))
+        stats = self.get_stats()
+        uptime = time.time() - stats['start_time']
+        uptime_str = format_duration(uptime)
 
         self.logger.info(
             f"Statistiken - Uptime: {uptime_str}, "
-            f"Empfangen: {self.stats['messages_received']}, "
-            f"Gesendet: {self.stats['messages_sent']}, "
-            f"Fehler: {self.stats['errors']}"
+            f"Empfangen: {stats['messages_received']}, "
+            f"Gesendet: {stats['messages_sent']}, "
+            f"Fehler: {stats['errors']}"
         )
 
+        if stats['queue_wait_count']:
+            avg_wait_ms = stats['queue_wait_total'] / stats['queue_wait_count'] * 1000
+            self.logger.info(
+                f"Queue - Tiefe: {stats['queue_depth']} "
+                f"(max: {stats['queue_depth_max']}), "
+                f"Wartezeit: avg {avg_wait_ms:.1f} ms, "
+                f"max {stats['queue_wait_max'] * 1000:.1f} ms, "
+                f"Verworfen: {stats['messages_dropped']}"
+            )
+
+        if stats['messages_shed']:
+            shed = ', '.join(f"{reason}: {count}" for reason, count in sorted(stats['messages_shed'].items()))
+            self.logger.info(f"Lastabwurf - {shed}")
+
+        self._print_device_stats()
+
+        for stage, latency in stats['stages'].items():
+            if not latency['count']:
+                continue
+            self.logger.info(
+                f"Latenz {stage} - Anzahl: {latency['count']}, p50/p95/p99/max: "
+                f"{latency['p50'] * 1000:.2f}/{latency['p95'] * 1000:.2f}/"
+                f"{latency['p99'] * 1000:.2f}/{latency['max'] * 1000:.2f} ms"
+            )
+
+    def _print_device_stats(self) -> None:
+        """
+        Gibt die aktivsten Geräte (nach Nachrichten) und die stillen Geräte aus.
+        Still ist ein Gerät, dessen letzte Nachricht länger als silent_after
+        und länger als SILENT_INTERVALS mittlere Abstände zurückliegt.
+        """
+        devices = self.get_device_stats()
+        if not devices:
+            return
+        now = time.time()
+
+        busiest = sorted(devices.items(), key=lambda item: item[1]['messages'], reverse=True)[:self.top_devices]
+        top = ', '.join(
+            f"{device}: {values['messages']} ({values['bytes']} B"
+            + (f", alle {values['interval']:.1f} s" if values['interval'] else "")
+            + (f", {values['errors']} Fehler" if values['errors'] else "") + ")"
+            for device, values in busiest
+        )
+        self.logger.info(f"Geräte - Aktiv: {len(devices)}, Top: {top}")
+
+        silent = []
+        for device, values in devices.items():
+            if values['last_seen'] is None:
+                continue
+            idle = now - values['last_seen']
+            if idle > max(self.silent_after, SILENT_INTERVALS * (values['interval'] or 0.0)):
+                silent.append((idle, device))
+        if silent:
+            silent.sort(reverse=True)
+            listed = ', '.join(
+                f"{device} (seit {format_duration(idle)})"
+                for idle, device in silent[:self.top_devices]
+            )
+            self.logger.warning(f"Stille Geräte - {len(silent)}: {listed}")
+
     def reset(self) -> None:
         """Setzt die Statistiken zurück."""
-        self.stats = {
-            'messages_received': 0,
-            'messages_sent': 0,
-            'errors': 0,
-            'last_message_time': None,
-            'start_time': time.time()
-        }
+        self.stats = self._initial_stats()
+        with self._shards_lock:
+            # Threads legen beim nächsten Zählen einen neuen Shard an
+            self._shards = []
+        for histogram in self.stages.values():
+            histogram.reset()
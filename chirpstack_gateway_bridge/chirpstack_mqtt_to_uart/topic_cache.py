@@ -0,0 +1,107 @@
+"""Topic parsing cache module for ChirpStack MQTT to UART Bridge."""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, NamedTuple, Union
+
+
+class TopicInfo(NamedTuple):
+    """Unveränderliches Ergebnis der Topic-Analyse."""
+    application_id: str
+    device_id: str
+    event_type: str
+    uart_prefix: bytes
+
+
+UNKNOWN_TOPIC = TopicInfo("unknown", "unknown", "unknown", b"unknown: ")
+
+
+class TopicParser:
+    """
+    Zerlegt ChirpStack-Topics der Form
+    application/{app_id}/device/{device_id}/event/{event} und hält die
+    Ergebnisse in einem begrenzten LRU-Cache. Die Strings werden interniert,
+    sodass jedes Gerät nur einmal im Speicher liegt.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialisiert den Parser.
+
+        Parameter:
+        max_entries (int): Maximale Anzahl gecachter Topics
+        """
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[Union[str, bytes], TopicInfo]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, topic: Union[str, bytes]) -> TopicInfo:
+        """
+        Gibt die Topic-Informationen zurück, aus dem Cache wenn möglich.
+
+        Parameter:
+        topic (str | bytes): Das MQTT-Topic, bevorzugt als rohe Bytes
+
+        Rückgabewert:
+        TopicInfo: application_id, device_id, event_type und UART-Präfix
+        """
+        with self._lock:
+            info = self._cache.get(topic)
+            if info is not None:
+                self.hits += 1
+                self._cache.move_to_end(topic)
+                return info
+            self.misses += 1
+
+        info = self._parse(topic)
+
+        with self._lock:
+            self._cache[topic] = info
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return info
+
+    @staticmethod
+    def _parse(topic: Union[str, bytes]) -> TopicInfo:
+        """Zerlegt ein Topic ohne Cache."""
+        try:
+            if isinstance(topic, bytes):
+                topic = topic.decode('utf-8')
+            parts = topic.split('/')
+        except Exception:
+            return UNKNOWN_TOPIC
+
+        # Format: application/{app_id}/device/{device_id}/event/up
+        if len(parts) < 4:
+            return UNKNOWN_TOPIC
+
+        device_id = sys.intern(parts[3])
+        return TopicInfo(
+            application_id=sys.intern(parts[1]),
+            device_id=device_id,
+            event_type=sys.intern(parts[5]) if len(parts) >= 6 else "unknown",
+            uart_prefix=f"{device_id}: ".encode('utf-8')
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Gibt die Cache-Statistiken zurück.
+
+        Rückgabewert:
+        dict: Einträge, Treffer, Fehlzugriffe und Trefferquote
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+# Gemeinsamer Parser für alle Komponenten eines Prozesses
+topic_parser = TopicParser()
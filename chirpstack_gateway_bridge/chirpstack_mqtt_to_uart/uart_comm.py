@@ -3,7 +3,9 @@
 import time
 import serial
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional
+
+from .payload_dump import HexDump
 
 
 class UARTCommunicator:
@@ -20,6 +22,8 @@ class UARTCommunicator:
         self.config = config
         self.logger = logger
         self.ser = None
+        # Optional: record_stage(stage, seconds) für die Dauer von write() und flush()
+        self.record_stage: Optional[Callable[[str, float], None]] = None
         self._setup_uart()
     
     def _setup_uart(self) -> None:
@@ -71,27 +75,72 @@ class UARTCommunicator:
         Rückgabewert:
         bool: True bei Erfolg, False bei Fehler
         """
+        return self.send_batch([message])[0]
+    
+    def send_batch(self, messages: List[bytes]) -> List[bool]:
+        """
+        Sendet mehrere Nachrichten mit einem einzigen write() und nur einem
+        flush() am Ende des Batches.
+        
+        Parameter:
+        messages (List[bytes]): Die zu sendenden Nachrichten in Reihenfolge
+        
+        Rückgabewert:
+        List[bool]: Erfolg pro Nachricht (True, wenn vollständig geschrieben)
+        """
+        if not messages:
+            return []
+        
+        buffer = messages[0] if len(messages) == 1 else b''.join(messages)
+        bytes_written = self._write_buffer(buffer)
+        
+        results = []
+        end = 0
+        for message in messages:
+            end += len(message)
+            results.append(end <= bytes_written)
+        return results
+    
+    def _write_buffer(self, buffer: bytes) -> int:
+        """
+        Schreibt einen Puffer mit Wiederholungsmechanismus und drained einmalig.
+        Bei Teil-Schreibvorgängen wird nur der Rest erneut gesendet.
+        
+        Parameter:
+        buffer (bytes): Die zu sendenden Daten
+        
+        Rückgabewert:
+        int: Anzahl der erfolgreich geschriebenen Bytes
+        """
         system_config = self.config.get("system", {})
         max_retries = system_config.get("retry_attempts", 3)
         retry_delay = system_config.get("retry_delay", 0.5)
         
+        total = len(buffer)
+        offset = 0
+        
         for attempt in range(max_retries):
             try:
                 if not self.ser or not self.ser.is_open:
                     self.logger.warning("UART nicht verfügbar, versuche Wiederverbindung...")
                     self._setup_uart()
                 
-                bytes_written = self.ser.write(message)
+                started = time.perf_counter()
+                bytes_written = self.ser.write(buffer[offset:] if offset else buffer)
+                written = time.perf_counter()
                 self.ser.flush()
+                if self.record_stage:
+                    self.record_stage('uart_write', written - started)
+                    self.record_stage('uart_drain', time.perf_counter() - written)
+                offset += bytes_written or 0
                 
-                if bytes_written == len(message):
-                    self.logger.info(f"{bytes_written} Bytes erfolgreich an UART gesendet")
-                    # Log hex representation of sent data
-                    hex_data = ' '.join([f'{b:02X}' for b in message])
-                    self.logger.debug(f"UART Hex gesendet: {hex_data}")
-                    return True
+                if offset == total:
+                    self.logger.info("%d Bytes erfolgreich an UART gesendet", total)
+                    # Hex-Darstellung wird nur bei aktivem DEBUG formatiert
+                    self.logger.debug("UART Hex gesendet: %s", HexDump(buffer))
+                    return total
                 else:
-                    self.logger.warning(f"Nur {bytes_written}/{len(message)} Bytes gesendet")
+                    self.logger.warning(f"Nur {offset}/{total} Bytes gesendet")
                     
             except serial.SerialException as e:
                 self.logger.error(f"UART Fehler (Versuch {attempt + 1}/{max_retries}): {e}")
@@ -103,12 +152,12 @@ class UARTCommunicator:
                         pass
                     self._setup_uart()
                 else:
-                    return False
+                    return offset
             except Exception as e:
                 self.logger.error(f"Unerwarteter Fehler beim UART-Senden: {e}")
-                return False
+                return offset
         
-        return False
+        return offset
     
     def close(self) -> None:
         """Schließt die UART-Verbindung."""
@@ -0,0 +1,481 @@
+"""Coalescing UART writer module for ChirpStack MQTT to UART Bridge."""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Callable, List, Optional
+
+from .uart_comm import UARTCommunicator
+from .framing import TABLE_FRAME_START, split_table_frames
+from .pacing import SHED_POLICIES, TokenBucket, link_capacity
+
+
+class UARTFrame:
+    """Ein zum Senden anstehender UART-Frame samt Rückmelde-Callback."""
+
+    __slots__ = ('data', 'device', 'fport', 'priority', 'pinned', 'submitted_at', 'callback')
+
+    def __init__(self, data: bytes, device: Optional[str] = None, fport: Optional[int] = None,
+                 callback: Optional[Callable[[bool], None]] = None, priority: int = 0,
+                 pinned: bool = False):
+        self.data = data
+        self.device = device
+        self.fport = fport
+        self.priority = priority
+        # Steuer-Frames (Device-Tabelle) werden nie verworfen
+        self.pinned = pinned
+        self.submitted_at = time.monotonic()
+        self.callback = callback
+
+
+class CoalescingWriter:
+    """
+    Fasst anstehende UART-Frames zu einem Puffer zusammen und sendet diesen
+    mit einem write() und einem flush(). Ein Batch wird geschlossen, sobald
+    coalesce_max_bytes erreicht sind oder der älteste Frame coalesce_max_delay
+    Sekunden wartet. Mit einem PriorityScheduler als Warteschlange werden
+    die Frames nach Priorität statt in Ankunftsreihenfolge gebündelt.
+
+    Mit "pacing" werden die Writes per Token Bucket auf die Leitungskapazität
+    begrenzt. Übersteigt der Rückstau max_backlog Sekunden Sendezeit, werden
+    Frames nach shed_policy verworfen und über on_shed gemeldet.
+
+    Mit einem Spool werden Frames, die nicht geschrieben werden konnten, auf
+    Disk gesichert. Bis der Spool leer ist, landen auch alle neuen Frames
+    dort, damit die Reihenfolge erhalten bleibt; nach retry_interval
+    Sekunden prüft der Writer mit dem ältesten Eintrag, ob der UART wieder
+    verfügbar ist, und sendet den Spool mit höchstens replay_rate Bytes/s nach.
+    """
+
+    def __init__(self, uart_comm: UARTCommunicator, config: Dict[str, Any], logger: logging.Logger,
+                 scheduler=None, on_shed: Optional[Callable[[UARTFrame, str], None]] = None,
+                 spool=None, record_stage: Optional[Callable[[str, float], None]] = None):
+        """
+        Initialisiert den Writer.
+
+        Parameter:
+        uart_comm (UARTCommunicator): Die UART-Schnittstelle
+        config (dict): Die Konfigurationsparameter
+        logger (logging.Logger): Der Logger für Ausgaben
+        scheduler (PriorityScheduler): Optionale Warteschlange statt FIFO
+        on_shed (Callable): Optionaler Callback on_shed(frame, reason) für verworfene Frames
+        spool (Spool): Optionaler Spool für Frames während eines UART-Ausfalls
+        record_stage (Callable): Optional record_stage(stage, seconds) für die Wartezeit im Writer
+        """
+        uart_config = config.get("uart", {})
+        pacing_config = config.get("pacing", {})
+        spool_config = config.get("spool", {})
+
+        self.uart_comm = uart_comm
+        self.logger = logger
+        self.max_bytes = max(1, int(uart_config.get("coalesce_max_bytes", 512)))
+        self.max_delay = float(uart_config.get("coalesce_max_delay", 0.002))
+
+        self.scheduler = scheduler
+        self.on_shed = on_shed
+        self.record_stage = record_stage
+        self._queue = scheduler if scheduler is not None else deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Pacing und Lastabwurf
+        self.bucket: Optional[TokenBucket] = None
+        self.max_backlog_bytes = 0
+        self.shed_policy = pacing_config.get("shed_policy", "drop_oldest")
+        self.ttl = float(pacing_config.get("ttl", 10.0))
+        if pacing_config.get("enabled", False):
+            if self.shed_policy not in SHED_POLICIES:
+                self.logger.warning(f"Unbekannte shed_policy '{self.shed_policy}', verwende 'drop_oldest'")
+                self.shed_policy = "drop_oldest"
+            rate = link_capacity(uart_config) * pacing_config.get("rate_factor", 1.0)
+            self.bucket = TokenBucket(rate, pacing_config.get("burst_bytes", self.max_bytes))
+            self.max_backlog_bytes = int(rate * pacing_config.get("max_backlog", 2.0))
+        self._queued_bytes = 0
+        self._latest: Dict[tuple, UARTFrame] = {}
+        self._overloaded = False
+
+        # Store-and-forward
+        self.spool = spool
+        self.retry_interval = float(spool_config.get("retry_interval", 5.0))
+        replay_rate = float(spool_config.get("replay_rate", 0))
+        self.replay_bucket = TokenBucket(replay_rate, self.max_bytes) if replay_rate > 0 else None
+        self._uart_down = False
+        self._next_probe = 0.0
+        # Callbacks gespoolter Frames dieses Laufs, nach Sequenznummer
+        self._spooled_callbacks: Dict[int, Callable[[bool], None]] = {}
+
+    def start(self) -> None:
+        """Startet den Writer-Thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="uart-coalescer", daemon=True)
+        self._thread.start()
+        self.logger.info(
+            f"UART-Coalescing aktiv (max {self.max_bytes} Bytes / {self.max_delay * 1000:.1f} ms)"
+        )
+        if self.bucket:
+            self.logger.info(
+                f"UART-Pacing aktiv ({self.bucket.rate:.0f} Bytes/s, Rückstau max "
+                f"{self.max_backlog_bytes} Bytes, Policy: {self.shed_policy})"
+            )
+        if self.spool is not None:
+            self.logger.info(f"UART-Spool aktiv ({self.spool.path})")
+
+    def submit(self, data: bytes, callback: Optional[Callable[[bool], None]] = None,
+               device: Optional[str] = None, fport: Optional[int] = None, priority: int = 0) -> bool:
+        """
+        Reiht einen Frame zum Senden ein. Der Callback wird nach dem
+        Schreiben des Batches mit dem Erfolg dieses Frames aufgerufen; ein
+        durch neuere Daten ersetzter Frame (drop_duplicates) meldet False.
+
+        Parameter:
+        data (bytes): Der fertige UART-Frame
+        callback (Callable): Optionaler Callback callback(success)
+        device (str): Optionaler Device-Name
+        fport (int): Optionaler LoRaWAN fPort
+        priority (int): Prioritätsklasse (0 = höchste), nur mit Scheduler wirksam
+
+        Rückgabewert:
+        bool: False, wenn der Writer überlastet ist und Frames verwirft
+        """
+        frames = []
+        if data[:1] == bytes((TABLE_FRAME_START,)):
+            # Tabellen-Frames getrennt und mit höchster Priorität einreihen,
+            # damit sie weder verworfen noch von Alarmen überholt werden
+            table, data = split_table_frames(data)
+            frames.append(UARTFrame(table, device, None, None, 0, pinned=True))
+        frame = UARTFrame(data, device, fport, callback, priority)
+        frames.append(frame)
+
+        replaced = None
+        with self._cond:
+            key = (device, fport)
+            if self.max_backlog_bytes and self.shed_policy == "drop_duplicates" and \
+                    len(frames) == 1 and key in self._latest:
+                # Neuere Daten ersetzen den wartenden Frame desselben Geräts schon
+                # vor dem Rückstau-Limit; der neue Frame wird mit seiner eigenen
+                # Priorität eingereiht
+                replaced = self._latest.pop(key)
+                self._queue.remove(replaced)
+                self._queued_bytes -= len(replaced.data)
+                self._shed(replaced, "duplicate")
+
+            for item in frames:
+                self._queue.append(item)
+                self._queued_bytes += len(item.data)
+            if self.max_backlog_bytes:
+                self._latest[key] = frame
+                if self._queued_bytes > self.max_backlog_bytes:
+                    self._shed_overflow()
+            self._cond.notify()
+            accepted = not self._overloaded
+
+        if replaced is not None:
+            self._notify(replaced.callback, False)
+        return accepted
+
+    def _shed_overflow(self) -> None:
+        """
+        Verwirft Frames, bis der Rückstau wieder unter dem Limit liegt: mit
+        Policy "ttl" zuerst die abgelaufenen, danach die ältesten.
+        """
+        if not self._overloaded:
+            self._overloaded = True
+            self.logger.warning(
+                f"UART überlastet: {self._queued_bytes} Bytes Rückstau "
+                f"(max {self.max_backlog_bytes}), verwerfe Frames"
+            )
+        if self.shed_policy == "ttl":
+            for victim in self._drop_expired(time.monotonic() - self.ttl):
+                self._queued_bytes -= len(victim.data)
+                self._forget(victim)
+                self._shed(victim, "ttl")
+        while self._queued_bytes > self.max_backlog_bytes:
+            victim = self._drop_oldest()
+            if victim is None:
+                break
+            self._queued_bytes -= len(victim.data)
+            self._forget(victim)
+            self._shed(victim, "oldest")
+
+    def _drop_oldest(self) -> Optional[UARTFrame]:
+        """Entfernt den ältesten nicht fixierten Frame aus der Warteschlange."""
+        if self.scheduler is not None:
+            return self.scheduler.drop_oldest()
+        for index, frame in enumerate(self._queue):
+            if not frame.pinned:
+                del self._queue[index]
+                return frame
+        return None
+
+    def _drop_expired(self, cutoff: float) -> List[UARTFrame]:
+        """Entfernt alle nicht fixierten Frames, die vor cutoff eingereiht wurden."""
+        if self.scheduler is not None:
+            return self.scheduler.drop_expired(cutoff)
+        expired = [frame for frame in self._queue if not frame.pinned and frame.submitted_at < cutoff]
+        if expired:
+            dropped = set(map(id, expired))
+            kept = [frame for frame in self._queue if id(frame) not in dropped]
+            self._queue.clear()
+            self._queue.extend(kept)
+        return expired
+
+    def _forget(self, frame: UARTFrame) -> None:
+        """Entfernt einen Frame aus dem Index der letzten Frames pro Gerät."""
+        key = (frame.device, frame.fport)
+        if self._latest.get(key) is frame:
+            del self._latest[key]
+
+    def _shed(self, frame: UARTFrame, reason: str) -> None:
+        """Meldet einen verworfenen Frame."""
+        if self.on_shed:
+            try:
+                self.on_shed(frame, reason)
+            except Exception as e:
+                self.logger.error(f"Fehler im Shed-Callback: {e}")
+
+    def _pop(self) -> Optional[UARTFrame]:
+        """
+        Entnimmt den nächsten Frame; mit Policy "ttl" werden dabei zu alte
+        Frames verworfen. Gibt None zurück, wenn nichts mehr ansteht.
+        """
+        while self._queue:
+            frame = self._queue.popleft()
+            self._queued_bytes -= len(frame.data)
+            if self.max_backlog_bytes:
+                self._forget(frame)
+                if self.shed_policy == "ttl" and not frame.pinned and \
+                        time.monotonic() - frame.submitted_at > self.ttl:
+                    self._shed(frame, "ttl")
+                    continue
+            return frame
+        return None
+
+    def pending(self) -> int:
+        """Gibt die Anzahl wartender Frames zurück."""
+        with self._cond:
+            return len(self._queue)
+
+    def backlog_seconds(self) -> float:
+        """
+        Gibt die geschätzte Sendezeit des Rückstaus zurück.
+
+        Rückgabewert:
+        float: Sekunden (0 ohne Pacing)
+        """
+        with self._cond:
+            return self._queued_bytes / self.bucket.rate if self.bucket else 0.0
+
+    def _next_batch(self, idle_timeout: Optional[float] = None) -> List[UARTFrame]:
+        """
+        Wartet auf den nächsten Batch. Gibt eine leere Liste zurück, wenn der
+        Writer gestoppt wurde und nichts mehr ansteht oder idle_timeout
+        Sekunden lang kein Frame kam.
+
+        Parameter:
+        idle_timeout (float): Optionale maximale Wartezeit auf den ersten Frame
+        """
+        idle_deadline = time.monotonic() + idle_timeout if idle_timeout is not None else None
+        with self._cond:
+            while True:
+                while not self._queue and self._running:
+                    if idle_deadline is None:
+                        self._cond.wait(0.5)
+                        continue
+                    remaining = idle_deadline - time.monotonic()
+                    if remaining <= 0:
+                        return []
+                    self._cond.wait(min(0.5, remaining))
+                first = self._pop()
+                if first is not None:
+                    break
+                if not self._running:
+                    return []
+
+            batch = [first]
+            size = len(first.data)
+            deadline = first.submitted_at + self.max_delay
+
+            while size < self.max_bytes:
+                if self._queue:
+                    if size + len(self._queue[0].data) > self.max_bytes:
+                        break
+                    frame = self._pop()
+                    if frame is None:
+                        continue
+                    batch.append(frame)
+                    size += len(frame.data)
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    break
+                self._cond.wait(remaining)
+
+            if self._overloaded and self._queued_bytes <= self.max_backlog_bytes // 2:
+                self._overloaded = False
+                self.logger.info("UART-Überlast beendet")
+            return batch
+
+    def _run(self) -> None:
+        """Writer-Schleife: sammelt Frames und sendet sie gebündelt."""
+        while True:
+            if self.bucket:
+                # Erst warten, bis die Leitung den letzten Batch abgearbeitet hat,
+                # damit später eintreffende Frames noch nach Priorität einsortiert werden
+                delay = self.bucket.delay()
+                if delay > 0:
+                    time.sleep(delay)
+
+            batch = self._next_batch(self._replay_wait())
+            if batch:
+                self._send(batch)
+            elif not self._running:
+                return
+
+            if self.spool is not None:
+                if self.spool.pending() and self._replay_wait() == 0:
+                    self._replay()
+                self.spool.sync()
+
+    def _send(self, batch: List[UARTFrame]) -> None:
+        """Sendet einen Batch; bei Ausfall oder vollem Spool werden die Frames gespoolt."""
+        if self.spool is not None and (self._uart_down or self.spool.pending()):
+            # Neue Frames hinter den Spool stellen, damit die Reihenfolge erhalten bleibt
+            self._spool_frames(batch)
+            return
+
+        if self.record_stage:
+            started = time.monotonic()
+            for frame in batch:
+                if not frame.pinned:
+                    self.record_stage('uart_queue', started - frame.submitted_at)
+
+        if self.bucket:
+            self.bucket.consume(sum(len(frame.data) for frame in batch))
+        try:
+            results = self.uart_comm.send_batch([frame.data for frame in batch])
+        except Exception as e:
+            self.logger.error(f"Fehler beim gebündelten UART-Senden: {e}")
+            results = [False] * len(batch)
+
+        if len(batch) > 1:
+            self.logger.debug(f"{len(batch)} Frames in einem UART-Write gebündelt")
+
+        if self.scheduler is not None:
+            now = time.monotonic()
+            for frame in batch:
+                if not frame.pinned:
+                    self.scheduler.record_latency(frame.priority, now - frame.submitted_at)
+
+        if self.spool is not None and not all(results):
+            # Ab dem ersten fehlgeschlagenen Frame alles spoolen
+            failed = results.index(False)
+            self._mark_down()
+            self._spool_frames(batch[failed:])
+            batch, results = batch[:failed], results[:failed]
+
+        for frame, success in zip(batch, results):
+            self._notify(frame.callback, success)
+
+    def _notify(self, callback: Optional[Callable[[bool], None]], success: bool) -> None:
+        """Ruft den Callback eines Frames auf."""
+        if callback:
+            try:
+                callback(success)
+            except Exception as e:
+                self.logger.error(f"Fehler im UART-Callback: {e}")
+
+    def _spool_frames(self, frames: List[UARTFrame]) -> None:
+        """Sichert Frames im Spool; der Callback folgt erst beim Nachsenden."""
+        for frame in frames:
+            seq = self.spool.append(frame.data, frame.device, frame.fport)
+            if seq is None:
+                self._shed(frame, "spool_full")
+                self._notify(frame.callback, False)
+            elif frame.callback:
+                self._spooled_callbacks[seq] = frame.callback
+
+    def _mark_down(self) -> None:
+        """Merkt den UART als ausgefallen vor und plant die nächste Prüfung."""
+        if not self._uart_down:
+            self._uart_down = True
+            self.logger.warning(
+                f"UART nicht beschreibbar, spoole Frames (Prüfung alle {self.retry_interval:g} s)"
+            )
+        self._next_probe = time.monotonic() + self.retry_interval
+
+    def _replay_wait(self) -> Optional[float]:
+        """
+        Gibt die Zeit bis zum nächsten Nachsenden aus dem Spool zurück
+        (None ohne Spool; ohne nachzusendende Frames das fsync-Intervall).
+        """
+        if self.spool is None:
+            return None
+        if not self.spool.pending():
+            return self.spool.fsync_interval
+        if self._uart_down:
+            return max(0.0, self._next_probe - time.monotonic())
+        return self.replay_bucket.delay() if self.replay_bucket else 0.0
+
+    def _replay(self) -> None:
+        """Sendet die ältesten Frames aus dem Spool nach (bei Ausfall als Prüfung nur einen)."""
+        records = self.spool.peek(1 if self._uart_down else self.max_bytes)
+        if not records:
+            return
+        self._discard_lost_callbacks(records[0].seq)
+
+        size = sum(len(record.data) for record in records)
+        if self.bucket:
+            self.bucket.consume(size)
+        if self.replay_bucket:
+            self.replay_bucket.consume(size)
+        try:
+            results = self.uart_comm.send_batch([record.data for record in records])
+        except Exception as e:
+            self.logger.error(f"Fehler beim Nachsenden aus dem Spool: {e}")
+            results = [False] * len(records)
+
+        sent = results.index(False) if not all(results) else len(results)
+        self.spool.commit(sent)
+        if sent < len(records):
+            self._mark_down()
+        elif self._uart_down:
+            self._uart_down = False
+            self.logger.info(f"UART wieder verfügbar, sende {self.spool.pending()} gespoolte Frames nach")
+
+        for record in records[:sent]:
+            self._notify(self._spooled_callbacks.pop(record.seq, None), True)
+
+    def _discard_lost_callbacks(self, oldest_seq: int) -> None:
+        """Meldet Frames, die der Spool wegen Platzmangel verworfen hat, als fehlgeschlagen."""
+        if not self._spooled_callbacks:
+            return
+        for seq in [seq for seq in self._spooled_callbacks if seq < oldest_seq]:
+            self._notify(self._spooled_callbacks.pop(seq), False)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stoppt den Writer-Thread nach dem Senden aller anstehenden Frames.
+
+        Parameter:
+        timeout (float): Maximale Wartezeit in Sekunden
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                self.logger.warning(f"UART-Writer nicht rechtzeitig beendet, {self.pending()} Frames offen")
+                if self.spool is not None:
+                    self.spool.flush()
+                self._thread = None
+                return
+            self._thread = None
+        if self.spool is not None:
+            if self.spool.pending():
+                self.logger.info(f"{self.spool.pending()} Frames verbleiben im Spool für den nächsten Start")
+            self.spool.close()
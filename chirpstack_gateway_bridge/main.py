@@ -2,15 +2,22 @@
 Main script for ChirpStack MQTT to UART Bridge.
 """
 
+import os
+import re
 import sys
 import json
 import time
 import logging
 import signal
 import threading
+import functools
 from chirpstack_mqtt_to_uart import (
-    load_config, setup_logging, UARTCommunicator,
-    MQTTHandler, MessageProcessor, StatsManager
+    load_config, setup_logging, shutdown_logging, get_logging_stats, UARTRouter,
+    MQTTHandler, MessageProcessor, StatsManager, MessagePipeline,
+    CoalescingWriter, topic_parser, EventParser, PayloadDumper,
+    AsyncMQTTHandler, AsyncSerialTransport, AsyncBridgeEngine,
+    PriorityClassifier, PriorityScheduler, Spool, DedupCache,
+    MetricsServer, bridge_collector, SchemaRegistry
 )
 
 def main(config_file="config.json"):
@@ -20,57 +27,146 @@ def main(config_file="config.json"):
     logger = setup_logging(config)
     
     # Initialize components
-    stats_manager = StatsManager(logger)
-    uart_comm = UARTCommunicator(config, logger)
+    stats_manager = StatsManager(logger, config)
     message_processor = MessageProcessor(config, logger)
+    event_parser = EventParser(config, logger)
+    payload_dumper = PayloadDumper(config, logger)
     
-    def process_message(topic, payload):
-        """Callback to process incoming MQTT messages."""
+    # Optional: drop uplinks delivered twice (overlapping gateways, QoS redelivery)
+    dedup = DedupCache(config, logger) if config.get("dedup", {}).get("enabled", False) else None
+    
+    # Optional: split binary payloads into typed fields (per device or fPort)
+    schema_config = config.get("schemas", {})
+    schema_registry = SchemaRegistry(config, logger) \
+        if schema_config.get("devices") or schema_config.get("fports") else None
+    
+    # "asyncio" drives MQTT and the UART fd from one event loop
+    engine = config.get("system", {}).get("engine", "sync")
+    
+    # With several UART ports each port gets its own writer thread so a slow
+    # line never holds up the others
+    multi_port = len(config.get("uart_ports") or []) > 1
+    
+    # Optional: strict priority classes with fair sharing between devices
+    scheduling = config.get("scheduler", {}).get("enabled", False)
+    if scheduling and engine == "asyncio":
+        logger.warning("Scheduler is only supported by the sync engine, disabled")
+        scheduling = False
+    classifier = PriorityClassifier(config, logger) if scheduling else None
+    
+    # Optional: meter writes to the line rate and shed load under overload
+    pacing = config.get("pacing", {}).get("enabled", False)
+    if pacing and engine == "asyncio":
+        logger.warning("Pacing is only supported by the sync engine, disabled")
+        pacing = False
+    
+    # Optional: keep frames on disk while the UART is gone and replay them later
+    spooling = config.get("spool", {}).get("enabled", False)
+    if spooling and engine == "asyncio":
+        logger.warning("Spool is only supported by the sync engine, disabled")
+        spooling = False
+    
+    def make_writer(uart_comm, port_config):
+        """Create the writer of one UART port (None: send directly)."""
+        uart_comm.record_stage = stats_manager.record_stage
+        if engine == "asyncio":
+            return AsyncSerialTransport(uart_comm, logger)
+        if spooling or pacing or scheduling or multi_port or \
+                port_config.get("uart", {}).get("write_coalescing", False):
+            # Optional: coalesce pending frames into one UART write/drain
+            scheduler = PriorityScheduler(port_config, classifier) if scheduling else None
+            spool = None
+            if spooling:
+                port = str(port_config["uart"].get("port", "uart"))
+                port_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', port).strip('_')
+                spool = Spool(os.path.join(config["spool"].get("path", "spool"), port_name or "uart"),
+                              port_config, logger)
+            writer = CoalescingWriter(uart_comm, port_config, logger, scheduler,
+                                      on_shed=lambda frame, reason: stats_manager.increment_shed(reason),
+                                      spool=spool, record_stage=stats_manager.record_stage)
+            writer.start()
+            return writer
+        return None
+    
+    uart_router = UARTRouter(config, logger, make_writer)
+    
+    def report_send(device_name, size, success):
+        """Record the UART send result of a single message."""
+        if success:
+            stats_manager.increment_sent()
+            stats_manager.record_device_sent(device_name, size)
+            logger.info("Successfully sent message for device %s", device_name)
+        else:
+            stats_manager.increment_errors(device_name)
+            logger.error("Failed to send message to UART")
+    
+    def process_message(topic, payload, receive_ts=None):
+        """Process an incoming MQTT message and forward it to UART."""
         stats_manager.increment_received()
+        started = time.perf_counter()
         
         try:
             # Log the raw payload
-            logger.debug(f"Raw payload received: {payload}")
+            logger.debug("Raw payload received: %s", payload)
+            
+            # Extract device name (cached per topic)
+            topic_info = MQTTHandler.parse_topic(topic)
+            device_name = topic_info.device_id
+            logger.info("Device Name: %s", device_name)
             
-            # Extract device name
-            device_name = MQTTHandler.extract_device_name(topic)
-            logger.info(f"Device Name: {device_name}")
+            # Parse only the fields the bridge needs (data, fCnt, fPort)
+            json_data = event_parser.parse(payload)
+            logger.debug("Parsed event fields: %s", json_data)
+            parsed = time.perf_counter()
+            stats_manager.record_stage('parse', parsed - started)
             
-            # Parse JSON
-            json_data = json.loads(payload)
-            logger.debug(f"Parsed JSON data: {json.dumps(json_data, indent=2)}")
+            # Drop duplicates before decoding (the topic carries the DevEUI)
+            if dedup and dedup.is_duplicate(device_name, json_data.get('fCnt')):
+                logger.debug("Duplicate uplink %s fCnt %s dropped", device_name, json_data.get('fCnt'))
+                return
+            # Per-device accounting (EWMA interval, last seen) only for first deliveries
+            stats_manager.record_device_received(device_name)
             
             # Decode payload
-            decoded_payload = message_processor.decode_payload(json_data)
+            decoded_payload = message_processor.decode_payload(json_data, device_name)
             if not decoded_payload:
                 logger.error("Failed to decode payload")
-                stats_manager.increment_errors()
+                stats_manager.increment_decode_errors(device_name)
                 return
                 
-            # Log decoded payload in hex format
-            payload_hex = ' '.join([f'{b:02X}' for b in decoded_payload])
-            logger.info(f"Decoded payload ({len(decoded_payload)} bytes): {payload_hex}")
+            # Log decoded payload in hex format (lazy, sampled per device)
+            payload_dumper.dump(device_name, decoded_payload, "Decoded payload")
                 
             # Validate payload
             if not message_processor.validate_payload(decoded_payload):
                 logger.error("Payload validation failed")
-                stats_manager.increment_errors()
+                stats_manager.increment_errors(device_name)
                 return
+            fport = json_data.get('fPort')
+            if schema_registry:
+                fields = schema_registry.decode(decoded_payload, device_name, fport)
+                if fields is not None:
+                    logger.info("Schema fields %s: %s", device_name, fields)
+            decoded = time.perf_counter()
+            stats_manager.record_stage('decode', decoded - parsed)
                 
-            # Create UART message
-            uart_message = message_processor.create_uart_message(device_name, decoded_payload)
+            # Pick the UART port for this device
+            uart_port = uart_router.route(device_name, topic_info.application_id, fport)
+            
+            # Create UART message (framing state is per port)
+            uart_message = uart_port.processor.create_uart_message(
+                device_name, decoded_payload, fport, topic_info.uart_prefix)
             if not uart_message:
                 logger.error("Failed to create UART message")
-                stats_manager.increment_errors()
+                stats_manager.increment_errors(device_name)
                 return
+            stats_manager.record_stage('frame', time.perf_counter() - decoded)
                 
             # Send to UART
-            if uart_comm.send(uart_message):
-                stats_manager.increment_sent()
-                logger.info(f"Successfully sent message for device {device_name}")
-            else:
-                stats_manager.increment_errors()
-                logger.error("Failed to send message to UART")
+            priority = classifier.classify(device_name, fport, decoded_payload,
+                                           topic_info.application_id) if classifier else 0
+            uart_port.submit(uart_message, functools.partial(report_send, device_name, len(uart_message)),
+                             device=device_name, fport=fport, priority=priority)
                 
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error: {e}")
@@ -81,11 +177,77 @@ def main(config_file="config.json"):
             logger.exception("Full traceback:")
             stats_manager.increment_errors()
 
-    mqtt_handler = MQTTHandler(config, logger, process_message)
+    def print_stats():
+        stats_manager.print_stats()
+        uart_router.print_stats()
+        payload_dumper.log_summary()
+        encodings = message_processor.get_encoding_table()
+        if encodings:
+            learned = [entry['encoding'] for entry in encodings.values()]
+            logger.info(
+                f"Payload-Kodierung - hex: {learned.count('hex')}, raw: {learned.count('raw')}, "
+                f"lernend: {learned.count(None)}, Abweichungen: "
+                f"{sum(entry['mismatches'] for entry in encodings.values())}"
+            )
+        if dedup:
+            dedup.log_summary()
+        if schema_registry:
+            for name, counts in schema_registry.get_stats().items():
+                logger.info(f"Payload-Schema {name} - dekodiert: {counts['decoded']}, "
+                            f"abgelehnt: {counts['rejected']}")
+        cache = topic_parser.get_stats()
+        logger.info(
+            f"Topic-Cache - Einträge: {cache['entries']}, Treffer: {cache['hits']}, "
+            f"Fehlzugriffe: {cache['misses']} ({cache['hit_rate']:.1%})"
+        )
+        log_stats = get_logging_stats()
+        if log_stats['async']:
+            logger.info(
+                f"Log-Queue - Tiefe: {log_stats['queue_depth']}/{log_stats['queue_size']}, "
+                f"verworfen: {log_stats['dropped']}"
+            )
+    
+    def start_metrics(mqtt_handler):
+        """Start the optional OpenMetrics endpoint (None if disabled)."""
+        if not config.get("metrics", {}).get("enabled", False):
+            return None
+        metrics_server = MetricsServer(config, logger)
+        metrics_server.add_collector(bridge_collector(stats_manager, uart_router, mqtt_handler, dedup))
+        return metrics_server if metrics_server.start() else None
+    
+    if engine == "asyncio":
+        # No pipeline or writer threads: messages are processed in the event loop
+        mqtt_handler = AsyncMQTTHandler(config, logger, process_message)
+        metrics_server = start_metrics(mqtt_handler)
+        try:
+            AsyncBridgeEngine(config, logger, mqtt_handler, uart_router.writers, print_stats).run()
+        finally:
+            if metrics_server:
+                metrics_server.stop()
+            uart_router.close()
+            print_stats()  # Final statistics
+            shutdown_logging()
+        return
+
+    # In pipelined mode the MQTT callback only enqueues, the mqtt-pipeline
+    # worker thread does parsing, decoding and the blocking UART write.
+    pipeline = None
+    if config.get("pipeline", {}).get("enabled", False):
+        pipeline = MessagePipeline(config, logger, stats_manager, process_message)
+        pipeline.start()
+        mqtt_handler = MQTTHandler(config, logger, pipeline.submit)
+    else:
+        mqtt_handler = MQTTHandler(config, logger, process_message)
+    metrics_server = start_metrics(mqtt_handler)
 
     # Connect to MQTT
     if not mqtt_handler.connect():
         logger.error("Unable to connect to MQTT Broker")
+        if pipeline:
+            pipeline.stop()
+        if metrics_server:
+            metrics_server.stop()
+        uart_router.close()
         return
 
     # Setup for periodic statistics
@@ -111,7 +273,7 @@ def main(config_file="config.json"):
             # Print statistics periodically
             current_time = time.time()
             if current_time - last_stats_time > stats_interval:
-                stats_manager.print_stats()
+                print_stats()
                 last_stats_time = current_time
                 
     except Exception as e:
@@ -119,8 +281,14 @@ def main(config_file="config.json"):
     finally:
         logger.info("Shutting down...")
         mqtt_handler.disconnect()
-        uart_comm.close()
-        stats_manager.print_stats()  # Final statistics
+        shutdown_timeout = config.get("system", {}).get("graceful_shutdown_timeout", 5)
+        if pipeline:
+            pipeline.stop(shutdown_timeout)
+        uart_router.close(shutdown_timeout)
+        if metrics_server:
+            metrics_server.stop()
+        print_stats()  # Final statistics
+        shutdown_logging()  # Drain the async log queue
 
 if __name__ == "__main__":
     # Use the first command line argument as the config file name if available
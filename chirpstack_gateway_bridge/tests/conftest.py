@@ -0,0 +1,43 @@
+"""Gemeinsame Fixtures der Tests.
+
+Die Tests laufen ohne Hardware; chirpstack_gateway_bridge/ wird vorne in den
+Suchpfad gestellt, damit das Paket chirpstack_mqtt_to_uart und nicht das
+gleichnamige Skript im Repository-Wurzelverzeichnis importiert wird.
+"""
+
+import os
+import csv
+import sys
+import logging
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger("tests")
+
+
+SESSION_COLUMNS = ['timestamp', 'session_id', 'device_eui', 'event_type', 'fcnt', 'fport',
+                   'raw_data_hex', 'gateway_id', 'rssi_dbm', 'snr_db', 'spreading_factor', 'acknowledged']
+
+
+def session_row(timestamp, device, fcnt, **values):
+    """Eine Zeile im Format der Session-CSVs des Monitors."""
+    row = dict.fromkeys(SESSION_COLUMNS, '')
+    row.update(timestamp=timestamp, session_id='session-1', device_eui=device, event_type='up',
+               fcnt=str(fcnt), fport='2', raw_data_hex='0102', gateway_id='gw-1',
+               rssi_dbm='-90', snr_db='7.5', spreading_factor='SF7', acknowledged='False')
+    row.update(values)
+    return row
+
+
+def write_session_csv(path, rows):
+    """Schreibt Zeilen wie LoRaWANSystemMonitor.write_to_csv."""
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=SESSION_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
@@ -0,0 +1,75 @@
+"""Tests für die Duplikaterkennung über (DevEUI, fCnt)."""
+
+import pytest
+
+from chirpstack_mqtt_to_uart import dedup
+from chirpstack_mqtt_to_uart.dedup import DedupCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_cache(logger, **dedup_config):
+    return DedupCache({"dedup": dedup_config}, logger)
+
+
+def test_duplicate_within_ttl(logger, clock):
+    cache = make_cache(logger, ttl=60)
+
+    assert not cache.is_duplicate("0011", 1)
+    assert not cache.is_duplicate("0011", 2)
+    assert not cache.is_duplicate("0022", 1)
+    clock[0] += 59
+    assert cache.is_duplicate("0011", 1)
+    assert cache.get_stats()["duplicates"] == 1
+
+
+def test_entries_expire_after_ttl(logger, clock):
+    cache = make_cache(logger, ttl=60)
+    cache.is_duplicate("0011", 1)
+    clock[0] += 30
+    cache.is_duplicate("0011", 2)
+
+    # Ein Duplikat verlängert das Zeitfenster nicht
+    clock[0] += 20
+    assert cache.is_duplicate("0011", 1)
+    clock[0] += 10
+    assert not cache.is_duplicate("0011", 1)
+    assert cache.is_duplicate("0011", 2)
+
+    clock[0] += 60
+    assert not cache.is_duplicate("0011", 2)
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_max_entries_evicts_oldest(logger, clock):
+    cache = make_cache(logger, ttl=60, max_entries=2)
+    for fcnt in (1, 2, 3):
+        cache.is_duplicate("0011", fcnt)
+
+    assert cache.get_stats()["entries"] == 2
+    assert cache.is_duplicate("0011", 3)
+    assert not cache.is_duplicate("0011", 1)
+
+
+def test_missing_fcnt_is_never_duplicate(logger, clock):
+    cache = make_cache(logger)
+    assert not cache.is_duplicate("0011", None)
+    assert not cache.is_duplicate("0011", None)
+    assert cache.get_stats()["checked"] == 0
+
+
+def test_device_stats(logger, clock):
+    cache = make_cache(logger)
+    for fcnt in (1, 1, 1, 2):
+        cache.is_duplicate("0011", fcnt)
+    cache.is_duplicate("0022", 1)
+
+    assert cache.get_device_stats() == {
+        "0011": {"checked": 4, "duplicates": 2, "duplicate_rate": 0.5},
+        "0022": {"checked": 1, "duplicates": 0, "duplicate_rate": 0.0},
+    }
@@ -0,0 +1,84 @@
+"""Tests für das binäre UART-Framing (BinaryFramer / FrameParser)."""
+
+from chirpstack_mqtt_to_uart.framing import (
+    BinaryFramer, FrameParser, crc16, split_table_frames,
+    DATA_FRAME_START, TABLE_FRAME_START, MAX_PAYLOAD_SIZE
+)
+
+
+def make_framer(logger):
+    return BinaryFramer({"uart": {"table_resend_interval": 0}}, logger)
+
+
+def test_crc16_check_value():
+    # Prüfwert der CRC-16/CCITT-FALSE
+    assert crc16(b"123456789") == 0x29B1
+
+
+def test_round_trip(logger):
+    framer = make_framer(logger)
+    parser = FrameParser()
+    stream = b''.join((
+        framer.build_frame("sensor-a", b"\x01\x02\x03", fport=2),
+        framer.build_frame("sensor-b", b"", fport=None),
+        framer.build_frame("sensor-a", bytes(range(MAX_PAYLOAD_SIZE)), fport=10),
+    ))
+
+    frames = parser.feed(stream)
+
+    assert [(f.kind, f.device_index, f.fport, f.data) for f in frames] == [
+        (TABLE_FRAME_START, 0, None, b"sensor-a"),
+        (DATA_FRAME_START, 0, 2, b"\x01\x02\x03"),
+        (TABLE_FRAME_START, 1, None, b"sensor-b"),
+        (DATA_FRAME_START, 1, 0, b""),
+        (DATA_FRAME_START, 0, 10, bytes(range(MAX_PAYLOAD_SIZE))),
+    ]
+    assert parser.device_names == {0: "sensor-a", 1: "sensor-b"}
+    assert parser.crc_errors == 0
+
+
+def test_round_trip_byte_by_byte(logger):
+    framer = make_framer(logger)
+    parser = FrameParser()
+    stream = framer.build_frame("sensor-a", b"hello", fport=1)
+
+    frames = []
+    for i in range(len(stream)):
+        frames += parser.feed(stream[i:i + 1])
+
+    assert [f.data for f in frames] == [b"sensor-a", b"hello"]
+
+
+def test_resync_after_garbage_and_corruption(logger):
+    framer = make_framer(logger)
+    parser = FrameParser()
+    parser.feed(framer.build_frame("sensor-a", b"x", fport=1))
+
+    corrupted = bytearray(framer.build_frame("sensor-a", b"\xA5\x00\x02bad", fport=1))
+    corrupted[-1] ^= 0xFF
+    good = framer.build_frame("sensor-a", b"good", fport=3)
+
+    # Das 0xA5 in der Payload des beschädigten Frames ist ein falsches
+    # Startbyte, das erst über den CRC verworfen wird
+    frames = parser.feed(b"\x00\x13noise" + bytes(corrupted) + good)
+
+    assert [(f.fport, f.data) for f in frames] == [(3, b"good")]
+    assert parser.crc_errors == 2
+
+
+def test_oversized_payload_is_rejected(logger):
+    framer = make_framer(logger)
+    assert framer.build_frame("sensor-a", bytes(MAX_PAYLOAD_SIZE + 1)) is None
+    assert framer.device_table == {}
+
+
+def test_split_table_frames(logger):
+    framer = make_framer(logger)
+    first = framer.build_frame("sensor-a", b"data", fport=1)
+    table, rest = split_table_frames(first)
+
+    assert table[0] == TABLE_FRAME_START
+    assert rest[0] == DATA_FRAME_START
+    assert table + rest == first
+    # Bekanntes Gerät: kein Tabellen-Frame mehr
+    assert split_table_frames(framer.build_frame("sensor-a", b"data", fport=1))[0] == b""
@@ -0,0 +1,76 @@
+"""Tests für das log-lineare Latenz-Histogramm."""
+
+import random
+
+import pytest
+
+from chirpstack_mqtt_to_uart.histogram import (
+    LatencyHistogram, SUB_BUCKETS, _bucket_index, _bucket_upper
+)
+
+
+def test_bucket_bounds_are_contiguous():
+    previous = -1
+    for index in range(_bucket_index(10_000_000) + 1):
+        upper = _bucket_upper(index)
+        assert upper > previous
+        # Der erste Wert des Buckets und seine Obergrenze liegen im Bucket
+        assert _bucket_index(previous + 1) == index
+        assert _bucket_index(upper) == index
+        previous = upper
+
+
+def test_small_values_are_exact():
+    for value in range(2 * SUB_BUCKETS):
+        assert _bucket_upper(_bucket_index(value)) == value
+
+
+def test_bucket_relative_error():
+    for value in (33, 100, 999, 12_345, 1_000_000, 9_876_543):
+        upper = _bucket_upper(_bucket_index(value))
+        assert value <= upper <= value * (1 + 1 / SUB_BUCKETS)
+
+
+def test_percentiles_within_error_bound():
+    rng = random.Random(1)
+    values = sorted(rng.uniform(0.0001, 2.0) for _ in range(10_000))
+    histogram = LatencyHistogram(max_seconds=10)
+    for value in values:
+        histogram.record(value)
+
+    stats = histogram.get_stats()
+    assert stats["count"] == len(values)
+    assert stats["mean"] == pytest.approx(sum(values) / len(values), rel=1e-3)
+    for fraction in (0.50, 0.95, 0.99):
+        exact = values[int(fraction * len(values) + 0.5) - 1]
+        assert exact <= stats[f"p{fraction * 100:g}"] + 1e-6
+        assert stats[f"p{fraction * 100:g}"] <= exact * (1 + 1 / SUB_BUCKETS)
+    assert stats["max"] == pytest.approx(values[-1], abs=1e-6)
+
+
+def test_values_above_max_are_clamped():
+    histogram = LatencyHistogram(max_seconds=1)
+    histogram.record(5.0)
+    histogram.record(-1.0)
+    stats = histogram.get_stats()
+    assert stats["max"] == 1.0
+    assert stats["p99"] == 1.0
+
+
+def test_empty_histogram():
+    stats = LatencyHistogram().get_stats()
+    assert stats == {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+
+def test_get_buckets_is_cumulative():
+    histogram = LatencyHistogram(max_seconds=10)
+    for value in (0.000010, 0.004, 0.004, 0.2, 3.0):
+        histogram.record(value)
+
+    result = histogram.get_buckets((0.001, 0.01, 0.1, 1.0, 10.0))
+    assert result["buckets"] == [(0.001, 1), (0.01, 3), (0.1, 3), (1.0, 4), (10.0, 5)]
+    assert result["count"] == 5
+    assert result["sum"] == pytest.approx(3.20801)
+
+    histogram.reset()
+    assert histogram.get_stats()["count"] == 0
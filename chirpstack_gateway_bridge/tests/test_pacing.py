@@ -0,0 +1,43 @@
+"""Tests für Leitungskapazität und Token Bucket der UART-Drosselung."""
+
+import pytest
+
+from chirpstack_mqtt_to_uart import pacing
+from chirpstack_mqtt_to_uart.pacing import TokenBucket, link_capacity
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(pacing.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_link_capacity():
+    assert link_capacity({}) == 11520
+    assert link_capacity({"baudrate": 9600}) == 960
+    # 8E2: Start + 8 Daten + Parität + 2 Stop = 12 Bit
+    assert link_capacity({"baudrate": 9600, "parity": "even", "stopbits": 2}) == 800
+    assert link_capacity({"baudrate": 9600, "bytesize": 7}) == pytest.approx(9600 / 9)
+
+
+def test_token_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=1024, burst=512)
+    assert bucket.delay() == 0.0
+
+    bucket.consume(512)
+    assert bucket.delay() == 0.0
+    bucket.consume(256)
+    assert bucket.delay() == 0.25
+
+    clock[0] += 0.125
+    assert bucket.delay() == 0.125
+    clock[0] += 0.125
+    assert bucket.delay() == 0.0
+
+
+def test_token_bucket_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=1000, burst=500)
+    clock[0] += 60
+    bucket.consume(1500)
+    assert bucket.delay() == pytest.approx(1.0)
@@ -0,0 +1,116 @@
+"""Tests für Prioritätsklassen und Deficit Round Robin im PriorityScheduler."""
+
+import pytest
+
+from chirpstack_mqtt_to_uart.uart_writer import UARTFrame
+from chirpstack_mqtt_to_uart.scheduler import PriorityClassifier, PriorityScheduler
+
+
+CONFIG = {
+    "scheduler": {
+        "quantum": 100,
+        "classes": [
+            {"name": "alarm", "match": [{"fport": 99}, {"payload_prefix": "ff"}]},
+            {"name": "control", "match": [{"device": ["valve-1", "valve-2"]}]}
+        ],
+        "default_class": "telemetry"
+    }
+}
+
+
+def make_scheduler(logger, **scheduler_config):
+    config = {"scheduler": dict(CONFIG["scheduler"], **scheduler_config)}
+    classifier = PriorityClassifier(config, logger)
+    return classifier, PriorityScheduler(config, classifier)
+
+
+def drain(scheduler):
+    frames = []
+    while len(scheduler):
+        frames.append(scheduler.popleft())
+    return frames
+
+
+def test_classifier_rules(logger):
+    classifier, _ = make_scheduler(logger)
+    assert classifier.class_names == ["alarm", "control", "telemetry"]
+    assert classifier.classify("sensor", fport=99) == 0
+    assert classifier.classify("sensor", fport=1, payload=b"\xff\x01") == 0
+    assert classifier.classify("valve-2", fport=1) == 1
+    assert classifier.classify("sensor", fport=1, payload=b"\x01") == 2
+
+
+def test_classifier_predicates(logger):
+    classifier, _ = make_scheduler(logger)
+    classifier.add_predicate("control", lambda device, app, fport, payload: payload[0] > 0x80)
+    # Fehlerhafte Prädikate werden übersprungen
+    classifier.add_predicate("alarm", lambda device, app, fport, payload: payload[5])
+
+    assert classifier.classify("sensor", payload=b"\x90") == 1
+    assert classifier.classify("sensor", payload=b"\x10") == 2
+    with pytest.raises(ValueError):
+        classifier.add_predicate("unknown", lambda *args: True)
+
+
+def test_strict_priority_between_classes(logger):
+    _, scheduler = make_scheduler(logger)
+    low = UARTFrame(b"low", device="a", priority=2)
+    control = UARTFrame(b"control", device="valve-1", priority=1)
+    alarm = UARTFrame(b"alarm", device="a", priority=0)
+    for item in (low, control, alarm):
+        scheduler.append(item)
+
+    assert scheduler[0] is alarm
+    assert drain(scheduler) == [alarm, control, low]
+
+
+def test_round_robin_between_devices(logger):
+    _, scheduler = make_scheduler(logger)
+    # Frames so groß wie das Quantum: ein Frame pro Gerät und Runde
+    for index in range(4):
+        scheduler.append(UARTFrame(b"a%d" % index + bytes(98), device="busy", priority=2))
+    scheduler.append(UARTFrame(b"b0" + bytes(98), device="quiet", priority=2))
+
+    assert [item.data[:2] for item in drain(scheduler)] == [b"a0", b"b0", b"a1", b"a2", b"a3"]
+
+
+def test_device_weights_share_bytes(logger):
+    _, scheduler = make_scheduler(logger, device_weights={"heavy": 2})
+    for index in range(20):
+        scheduler.append(UARTFrame(bytes(50), device="heavy", priority=2))
+        scheduler.append(UARTFrame(bytes(50), device="light", priority=2))
+
+    first = [item.device for item in drain(scheduler)][:12]
+    assert first.count("heavy") == 8
+    assert first.count("light") == 4
+
+
+def test_drop_oldest_prefers_lowest_class_and_skips_pinned(logger):
+    _, scheduler = make_scheduler(logger)
+    table = UARTFrame(b"table", device="a", priority=2, pinned=True)
+    telemetry = UARTFrame(b"telemetry", device="a", priority=2)
+    alarm = UARTFrame(b"alarm", device="b", priority=0)
+    for item in (alarm, table, telemetry):
+        scheduler.append(item)
+
+    assert scheduler.drop_oldest() is telemetry
+    assert scheduler.drop_oldest() is alarm
+    assert scheduler.drop_oldest() is None
+    assert drain(scheduler) == [table]
+
+
+def test_drop_expired_and_remove(logger):
+    _, scheduler = make_scheduler(logger)
+    old = UARTFrame(b"old", device="a", priority=2)
+    old.submitted_at -= 10
+    fresh = UARTFrame(b"fresh", device="a", priority=2)
+    other = UARTFrame(b"other", device="b", priority=1)
+    for item in (old, fresh, other):
+        scheduler.append(item)
+
+    assert scheduler.drop_expired(old.submitted_at + 1) == [old]
+    scheduler.remove(other)
+    assert len(scheduler) == 1
+    assert drain(scheduler) == [fresh]
+    with pytest.raises(IndexError):
+        scheduler[0]
@@ -0,0 +1,105 @@
+"""Tests für die Payload-Schemas und die Schema-Registry."""
+
+import struct
+
+import pytest
+
+from chirpstack_mqtt_to_uart.schemas import PayloadSchema, SchemaRegistry, KNOWN_SCHEMAS
+
+
+def tdps24(t1, t2, d, p, s):
+    return struct.pack("<cffcfcfcf", b"T", t1, t2, b"D", d, b"P", p, b"S", s)
+
+
+COUNTER = {
+    "byte_order": "big",
+    "fields": [
+        {"name": "counter", "type": "uint16"},
+        {"type": "padding", "size": 1},
+        {"name": "temperature", "type": "int16", "scale": 0.1},
+        {"name": "tag", "type": "bytes", "size": 2}
+    ]
+}
+
+
+def test_decode_known_schema():
+    schema = PayloadSchema("tdps24", KNOWN_SCHEMAS["tdps24"])
+    assert schema.size == 24
+    assert schema.fields == ["t1", "t2", "d", "p", "s"]
+
+    payload = tdps24(21.5, 22.0, 1.25, 1013.0, 3.5)
+    assert schema.decode(payload) == {"t1": 21.5, "t2": 22.0, "d": 1.25, "p": 1013.0, "s": 3.5}
+    # allow_trailing: angehängte Bytes werden ignoriert
+    assert schema.decode(payload + b"\x00\x00")["s"] == 3.5
+
+
+def test_decode_rejects_wrong_length_and_marker():
+    schema = PayloadSchema("tdps24", KNOWN_SCHEMAS["tdps24"])
+    payload = tdps24(1, 2, 3, 4, 5)
+    assert schema.decode(payload[:-1]) is None
+    assert schema.decode(b"X" + payload[1:]) is None
+
+
+def test_big_endian_scale_padding_bytes():
+    schema = PayloadSchema("counter", COUNTER)
+    assert schema.size == 7
+    fields = schema.decode(b"\x01\x02\xff\xff\x38ok")
+    assert fields["counter"] == 0x0102
+    assert fields["temperature"] == pytest.approx(-20.0)
+    assert fields["tag"] == b"ok"
+    # Ohne allow_trailing muss die Länge exakt passen
+    assert schema.decode(b"\x01\x02\xff\xff\x38ok!") is None
+
+
+@pytest.mark.parametrize("definition", [
+    {"byte_order": "middle", "fields": [{"name": "a", "type": "uint8"}]},
+    {"fields": [{"name": "a", "type": "uint128"}]},
+    {"fields": [{"type": "marker", "value": "T"}]}
+])
+def test_invalid_definitions(definition):
+    with pytest.raises(ValueError):
+        PayloadSchema("broken", definition)
+
+
+def test_registry_lookup_and_counts(logger):
+    registry = SchemaRegistry({
+        "schemas": {
+            "definitions": {"counter": COUNTER},
+            "devices": {"sensor-1": "tdps24", "sensor-2": "missing"},
+            "fports": {"5": "counter"}
+        }
+    }, logger)
+
+    assert registry.get("sensor-1", 5).name == "tdps24"
+    assert registry.get("sensor-9", 5).name == "counter"
+    assert registry.get("sensor-2") is None
+    assert registry.decode(b"\x00\x01\x00\x00\x0aok", device="sensor-9", fport=5)["counter"] == 1
+    assert registry.decode(b"short", fport=5) is None
+    assert registry.decode(b"whatever", fport=7) is None
+    assert registry.get_stats() == {"counter": {"decoded": 1, "rejected": 1}}
+
+
+def test_decode_batch_matches_decode():
+    numpy = pytest.importorskip("numpy")
+    schema = PayloadSchema("tdps24", KNOWN_SCHEMAS["tdps24"])
+    payloads = [tdps24(i, i + 0.5, 1, 2, 3) for i in range(5)]
+    payloads.insert(2, b"short")
+    payloads.insert(4, b"X" + payloads[0][1:])
+
+    columns = schema.decode_batch(payloads)
+    assert columns["row"].tolist() == [0, 1, 3, 5, 6]
+    assert columns["t1"].tolist() == [0, 1, 2, 3, 4]
+    for row, value in zip(columns["row"], columns["t2"]):
+        assert schema.decode(payloads[row])["t2"] == pytest.approx(value)
+    assert columns["t1"].dtype == numpy.float32
+
+
+def test_decode_hex_batch_skips_invalid_hex():
+    pytest.importorskip("numpy")
+    schema = PayloadSchema("counter", COUNTER)
+    hex_payloads = ["0001000064aabb", "zz01000064aabb", "", "0002000032ccdd"]
+
+    columns = schema.decode_hex_batch(hex_payloads)
+    assert columns["row"].tolist() == [0, 3]
+    assert columns["counter"].tolist() == [1, 2]
+    assert columns["temperature"].tolist() == pytest.approx([10.0, 5.0])
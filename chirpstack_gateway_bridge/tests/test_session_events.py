@@ -0,0 +1,73 @@
+"""Tests für das Lesen der Session-Dateien (CSV und Parquet) und den Event-Nachbau."""
+
+import json
+import base64
+from datetime import datetime
+
+import pytest
+
+from chirpstack_mqtt_to_uart.session_events import (
+    build_uplink_event, iter_session_rows, load_session_events, session_files
+)
+
+from conftest import session_row, write_session_csv
+
+
+def test_session_files_prefers_parquet(tmp_path):
+    for name in ("lorawan_session_a.csv", "lorawan_session_a.parquet", "lorawan_session_b.csv", "other.csv"):
+        (tmp_path / name).write_bytes(b"")
+    single = tmp_path / "single.csv"
+
+    assert session_files([str(tmp_path), str(single)]) == [
+        str(tmp_path / "lorawan_session_a.parquet"),
+        str(tmp_path / "lorawan_session_b.csv"),
+        str(single),
+    ]
+
+
+def test_csv_rows_and_events(tmp_path):
+    path = write_session_csv(tmp_path / "lorawan_session_1.csv", [
+        session_row("2025-07-16 07:00:05", "dev-b", 8),
+        session_row("2025-07-16 07:00:00", "dev-a", 7, raw_data_hex="cafe"),
+        session_row("2025-07-16 07:00:01", "dev-a", "", event_type="join"),
+        session_row("2025-07-16 07:00:02", "dev-a", 9, raw_data_hex=""),
+    ])
+
+    assert len(list(iter_session_rows([path]))) == 4
+    events = load_session_events([str(tmp_path)])
+    assert [(event.device_eui, event.fcnt) for event in events] == [("dev-a", 7), ("dev-b", 8)]
+    assert events[0].topic == "application/unknown/device/dev-a/event/up"
+
+    uplink = json.loads(events[0].payload)
+    assert base64.b64decode(uplink["data"]) == b"\xca\xfe"
+    assert uplink["fPort"] == 2
+    assert uplink["rxInfo"][0]["rssi"] == -90
+    assert uplink["rxInfo"][0]["snr"] == 7.5
+    assert uplink["txInfo"]["modulation"]["lora"]["spreadingFactor"] == 7
+
+
+def test_build_uplink_event_rejects_bad_rows():
+    assert build_uplink_event(session_row("2025-07-16 07:00:00", "dev-a", 1, raw_data_hex="zz")) is None
+    assert build_uplink_event(session_row("16.07.2025", "dev-a", 1)) is None
+
+
+def test_parquet_rows_typed(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    rows = [
+        {"timestamp": datetime(2025, 7, 16, 7, 0, second), "session_id": "session-1", "device_eui": "dev-a",
+         "event_type": "up", "fcnt": second, "fport": 2, "raw_data_hex": "0102", "rssi_dbm": -90}
+        for second in range(5)
+    ]
+    path = tmp_path / "lorawan_session_1.parquet"
+    pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), str(path), row_group_size=2)
+    # Die gleichnamige CSV wird ignoriert
+    write_session_csv(tmp_path / "lorawan_session_1.csv", [session_row("2025-07-16 08:00:00", "dev-x", 1)])
+
+    read = list(iter_session_rows([str(tmp_path)], columns=["timestamp", "fcnt"]))
+    assert read == [{"timestamp": row["timestamp"], "fcnt": row["fcnt"]} for row in rows]
+
+    events = load_session_events([str(tmp_path)])
+    assert [event.fcnt for event in events] == [0, 1, 2, 3, 4]
+    assert {event.device_eui for event in events} == {"dev-a"}
@@ -0,0 +1,90 @@
+"""Tests für den SQLite-Session-Store."""
+
+from datetime import datetime
+
+import pytest
+
+from chirpstack_mqtt_to_uart.session_store import SessionStore
+
+from conftest import session_row, write_session_csv
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+
+def test_insert_converts_types(store):
+    store.insert_rows([session_row("2025-07-16 07:00:00", "dev-a", "7", acknowledged="True")])
+    row = store.query()[0]
+    assert row["fcnt"] == 7
+    assert row["rssi_dbm"] == -90
+    assert row["snr_db"] == 7.5
+    assert row["spreading_factor"] == 7
+    assert row["acknowledged"] == 1
+    # Fehlende Spalten bleiben leer
+    assert row["battery_level"] is None
+
+
+def test_query_filters(store):
+    store.insert_rows([
+        session_row("2025-07-16 07:00:00", "dev-a", 1),
+        session_row("2025-07-16 07:30:00", "dev-a", 2, gateway_id="gw-2"),
+        session_row("2025-07-16 08:00:00", "dev-a", 3),
+        session_row("2025-07-16 07:15:00", "dev-b", 1, fport="5"),
+        session_row("2025-07-16 07:20:00", "dev-b", "", event_type="join"),
+    ])
+
+    rows = store.query(device="dev-a", start="2025-07-16 07:00:00", end=datetime(2025, 7, 16, 8),
+                       columns=["fcnt"])
+    assert rows == [{"fcnt": 1}, {"fcnt": 2}]
+    assert [row["device_eui"] for row in store.query(gateway="gw-1", event_type="up")] == \
+        ["dev-a", "dev-b", "dev-a"]
+    assert store.query(fport=5, columns=["device_eui"]) == [{"device_eui": "dev-b"}]
+    assert len(store.query(limit=2)) == 2
+    with pytest.raises(ValueError):
+        store.query(columns=["fcnt; DROP TABLE events"])
+
+
+def test_import_skips_known_sessions(store, tmp_path):
+    directory = tmp_path / "sessions"
+    directory.mkdir()
+    write_session_csv(directory / "lorawan_session_1.csv", [
+        session_row("2025-07-16 07:00:00", "dev-a", 1),
+        session_row("2025-07-16 07:00:10", "dev-b", 1),
+        session_row("2025-07-16 07:00:20", "dev-c", 1, session_id=""),
+    ])
+
+    assert store.import_files([str(directory)]) == 2
+    assert store.import_files([str(directory)]) == 0
+
+    write_session_csv(directory / "lorawan_session_2.csv", [
+        session_row("2025-07-17 07:00:00", "dev-a", 2, session_id="session-2"),
+    ])
+    assert store.import_files([str(directory)]) == 1
+
+    assert store.devices() == [
+        {"device_eui": "dev-a", "events": 2, "first_seen": "2025-07-16 07:00:00",
+         "last_seen": "2025-07-17 07:00:00"},
+        {"device_eui": "dev-b", "events": 1, "first_seen": "2025-07-16 07:00:10",
+         "last_seen": "2025-07-16 07:00:10"},
+    ]
+    assert [row["session_id"] for row in store.sessions()] == ["session-1", "session-2"]
+
+
+def test_import_parquet_timestamps(store, tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    path = tmp_path / "lorawan_session_1.parquet"
+    pyarrow.parquet.write_table(pyarrow.Table.from_pylist([
+        {"timestamp": datetime(2025, 7, 16, 7, 0, 5), "session_id": "session-1", "device_eui": "dev-a",
+         "event_type": "up", "fcnt": 4, "snr_db": 7.5}
+    ]), str(path))
+
+    assert store.import_files([str(path)]) == 1
+    assert store.query(columns=["timestamp", "fcnt", "snr_db"]) == [
+        {"timestamp": "2025-07-16 07:00:05", "fcnt": 4, "snr_db": 7.5}
+    ]
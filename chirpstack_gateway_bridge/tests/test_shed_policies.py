@@ -0,0 +1,104 @@
+"""Tests für den Lastabwurf im CoalescingWriter (pacing.shed_policy)."""
+
+import time
+
+from chirpstack_mqtt_to_uart.uart_writer import CoalescingWriter
+from chirpstack_mqtt_to_uart.scheduler import PriorityClassifier, PriorityScheduler
+
+
+class FakeUART:
+    """Nimmt alle Frames an und merkt sie sich in Sende-Reihenfolge."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_batch(self, messages):
+        self.sent.extend(messages)
+        return [True] * len(messages)
+
+
+def make_writer(logger, policy, scheduler=None, ttl=10.0):
+    # 9600 baud 8N1 = 960 Bytes/s, max_backlog 0.1 s = 96 Bytes Rückstau
+    config = {
+        "uart": {"baudrate": 9600},
+        "pacing": {"enabled": True, "max_backlog": 0.1, "shed_policy": policy, "ttl": ttl}
+    }
+    shed = []
+    writer = CoalescingWriter(FakeUART(), config, logger, scheduler,
+                              on_shed=lambda frame, reason: shed.append((frame.data, reason)))
+    return writer, shed
+
+
+def drain(writer):
+    writer.start()
+    writer.stop(5)
+    return writer.uart_comm.sent
+
+
+def frame(name):
+    return name.encode().ljust(10, b'.')
+
+
+def test_drop_duplicates_replaces_before_limit(logger):
+    results = {}
+    sent = {}
+    for policy in ("drop_oldest", "drop_duplicates"):
+        writer, shed = make_writer(logger, policy)
+        callbacks = {}
+        for name, device in (("A1", "a"), ("B1", "b"), ("A2", "a"), ("A3", "a")):
+            writer.submit(frame(name), callbacks.setdefault(name, []).append, device=device, fport=1)
+        sent[policy] = drain(writer)
+        results[policy] = (shed, callbacks)
+
+    # 40 Bytes liegen weit unter dem Limit: drop_oldest verwirft nichts
+    assert sent["drop_oldest"] == [frame(n) for n in ("A1", "B1", "A2", "A3")]
+    assert results["drop_oldest"][0] == []
+
+    # drop_duplicates sendet pro Gerät nur die neuesten Daten
+    assert sent["drop_duplicates"] == [frame("B1"), frame("A3")]
+    shed, callbacks = results["drop_duplicates"]
+    assert shed == [(frame("A1"), "duplicate"), (frame("A2"), "duplicate")]
+    assert callbacks == {"A1": [False], "B1": [True], "A2": [False], "A3": [True]}
+
+
+def test_drop_duplicates_keeps_priority_of_replacement(logger):
+    config = {"scheduler": {"classes": [{"name": "alarm", "match": [{"device": "x"}]}]}}
+    classifier = PriorityClassifier(config, logger)
+    writer, _ = make_writer(logger, "drop_duplicates", PriorityScheduler(config, classifier))
+    writer.submit(frame("A1"), device="a", fport=1, priority=1)
+    writer.submit(frame("B1"), device="b", fport=1, priority=1)
+    writer.submit(frame("A2"), device="a", fport=1, priority=0)
+
+    assert drain(writer) == [frame("A2"), frame("B1")]
+
+
+def test_ttl_sheds_expired_frames_first_at_limit(logger):
+    sent = {}
+    shed_by_policy = {}
+    for policy in ("drop_oldest", "ttl"):
+        writer, shed = make_writer(logger, policy, ttl=0.05)
+        for index in range(5):
+            writer.submit(frame(f"old{index}"), device=f"d{index}", fport=1)
+        time.sleep(0.1)
+        # 100 Bytes überschreiten das Limit von 96 Bytes
+        for index in range(5):
+            writer.submit(frame(f"new{index}"), device=f"d{index}", fport=1)
+        sent[policy] = drain(writer)
+        shed_by_policy[policy] = shed
+
+    # drop_oldest verwirft nur so viel wie nötig
+    assert shed_by_policy["drop_oldest"] == [(frame("old0"), "oldest")]
+    assert sent["drop_oldest"][:4] == [frame(f"old{i}") for i in range(1, 5)]
+
+    # ttl verwirft am Limit alle abgelaufenen Frames
+    assert shed_by_policy["ttl"] == [(frame(f"old{i}"), "ttl") for i in range(5)]
+    assert sent["ttl"] == [frame(f"new{i}") for i in range(5)]
+
+
+def test_drop_oldest_enforces_hard_limit_for_every_policy(logger):
+    for policy in ("drop_oldest", "drop_duplicates", "ttl"):
+        writer, shed = make_writer(logger, policy)
+        for index in range(12):
+            writer.submit(frame(f"f{index}"), device=f"d{index}", fport=1)
+        assert [reason for _, reason in shed] == ["oldest"] * 3, policy
+        assert len(drain(writer)) == 9
@@ -0,0 +1,86 @@
+"""Tests für den persistenten Spool (Store-and-forward)."""
+
+from chirpstack_mqtt_to_uart.spool import Spool
+
+
+def make_spool(path, logger, **spool_config):
+    # fsync_interval so groß, dass nur explizites flush()/close() sichert
+    spool_config.setdefault("fsync_interval", 3600)
+    return Spool(str(path), {"spool": spool_config}, logger)
+
+
+def test_peek_and_commit(tmp_path, logger):
+    spool = make_spool(tmp_path, logger)
+    for i in range(5):
+        assert spool.append(b"frame%d" % i, device="dev", fport=i) == i
+
+    records = spool.peek(max_bytes=12)
+    assert [r.data for r in records] == [b"frame0", b"frame1"]
+    assert (records[0].device, records[0].fport) == ("dev", 0)
+    assert spool.pending() == 5
+
+    spool.commit(2)
+    assert spool.pending() == 3
+    assert spool.peek(max_bytes=1)[0].data == b"frame2"
+    spool.close()
+
+    reopened = make_spool(tmp_path, logger)
+    assert [r.data for r in reopened.peek(1000)] == [b"frame2", b"frame3", b"frame4"]
+    reopened.close()
+
+
+def test_recovers_records_written_after_last_meta_flush(tmp_path, logger):
+    spool = make_spool(tmp_path, logger)
+    spool.append(b"saved", device="dev", fport=1)
+    spool.flush()
+    spool.append(b"unsaved-1")
+    spool.append(b"unsaved-2", device="other", fport=0)
+    # Absturz: kein close(), die Metadaten kennen nur den ersten Eintrag
+
+    recovered = make_spool(tmp_path, logger)
+    records = recovered.peek(1000)
+    assert [(r.seq, r.device, r.fport, r.data) for r in records] == [
+        (0, "dev", 1, b"saved"),
+        (1, None, None, b"unsaved-1"),
+        (2, "other", 0, b"unsaved-2"),
+    ]
+    assert recovered.append(b"next") == 3
+    recovered.close()
+    spool.close()
+
+
+def test_without_meta_file_spool_starts_empty(tmp_path, logger):
+    spool = make_spool(tmp_path, logger)
+    spool.append(b"lost")
+    # Absturz vor dem ersten Sichern
+
+    assert make_spool(tmp_path, logger).pending() == 0
+    spool.close()
+
+
+def test_overflow_drop_oldest(tmp_path, logger):
+    # Einträge: 16 Bytes Header + 3 Bytes Device/fPort + 29 Bytes Daten = 48 Bytes,
+    # zwei passen in ein Segment
+    spool = make_spool(tmp_path, logger, segment_size=100, segments=2)
+    for i in range(6):
+        assert spool.append(bytes([i]) * 29) == i
+
+    assert [r.seq for r in spool.peek(1000)] == [2, 3, 4, 5]
+    assert spool.get_stats()["dropped"] == 2
+    spool.close()
+
+
+def test_overflow_drop_newest(tmp_path, logger):
+    spool = make_spool(tmp_path, logger, segment_size=100, segments=2, overflow_policy="drop_newest")
+    seqs = [spool.append(bytes([i]) * 29) for i in range(6)]
+
+    assert seqs == [0, 1, 2, 3, None, None]
+    assert [r.seq for r in spool.peek(1000)] == [0, 1, 2, 3]
+    spool.close()
+
+
+def test_oversized_frame_is_dropped(tmp_path, logger):
+    spool = make_spool(tmp_path, logger, segment_size=100, segments=2)
+    assert spool.append(bytes(100)) is None
+    assert spool.pending() == 0
+    spool.close()
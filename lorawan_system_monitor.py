@@ -18,8 +18,28 @@ import time
 import sys
 import os
 import csv
+import struct
 import uuid
 import re
+import bisect
+import functools
+import threading
+import queue
+import sqlite3
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Payload-Schemas, SQLite-Tabelle und Dauer-Format kommen aus dem Bridge-Paket;
+# diese Module benötigen nur die Standardbibliothek (kein pyserial/paho-mqtt)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chirpstack_gateway_bridge'))
+from chirpstack_mqtt_to_uart.schemas import SchemaRegistry
+from chirpstack_mqtt_to_uart.session_store import SCHEMA as SESSION_DB_SCHEMA
+from chirpstack_mqtt_to_uart.stats import format_duration
 
 # Konfiguration
 MQTT_BROKER = "localhost"
@@ -27,12 +47,585 @@ MQTT_PORT = 1883
 MQTT_TOPIC = "application/+/device/+/event/+"
 PACKET_FORWARDER_PATH = "/home/pi/sx1302_hal/packet_forwarder"
 CSV_OUTPUT_DIR = "Lora_Sesion_Data"
+CSV_HEADERS = [
+    'timestamp', 'session_id', 'application_id', 'device_eui', 
+    'event_type', 'fcnt', 'fport', 'raw_data_hex', 'raw_data_ascii',
+    'decoded_payload', 'gateway_id', 'rssi_dbm', 'snr_db', 'spreading_factor', 
+    'bandwidth', 'frequency', 'gateway_lat', 'gateway_lon', 'gateway_alt',
+    'device_lat', 'device_lon', 'device_alt', 'battery_level', 'margin_db', 
+    'acknowledged', 'gps_source', 'gps_format'
+]
+CSV_FLUSH_ROWS = 50          # Puffer nach N Zeilen auf die Datei schreiben
+CSV_FLUSH_INTERVAL = 2.0     # ... oder spätestens nach N Sekunden
+CSV_FSYNC_INTERVAL = 30.0    # fsync höchstens alle N Sekunden, 0 = nur beim Wechsel/Beenden
+CSV_ROLLOVER_BYTES = 0       # Neue Session-Datei ab N Bytes, 0 = aus
+CSV_ROLLOVER_SECONDS = 0     # Neue Session-Datei nach N Sekunden, 0 = aus
+CSV_QUEUE_SIZE = 10000       # Maximal gepufferte Zeilen, darüber werden Zeilen verworfen
+SESSION_FORMAT = "csv"       # "csv", "parquet" oder "both" (Parquet benötigt pyarrow)
+PARQUET_ROW_GROUP_SIZE = 1000    # Zeilen pro Row Group
+PARQUET_ROW_GROUP_INTERVAL = 300.0  # Row Group spätestens nach N Sekunden schreiben
+SESSION_DB_PATH = ""         # Zusätzlich in SQLite speichern, z. B. "Lora_Sesion_Data/lorawan_sessions.db", "" = aus
+TOPIC_CACHE_SIZE = 1024
+METRICS_HOST = "0.0.0.0"
+METRICS_PORT = 0  # OpenMetrics-Endpunkt unter /metrics, 0 = deaktiviert
+METRICS_LATENCY_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CONSOLE_MODE = "verbose"     # "verbose" (jede Nachricht), "dashboard" (Übersicht) oder "quiet"
+DASHBOARD_REFRESH = 1.0      # Sekunden zwischen zwei Übersichten
+DASHBOARD_ROWS = 20          # Maximal angezeigte Geräte/Gateways
+HEALTH_CHECK_INTERVAL = 300.0  # Planmäßiger System-Health-Check alle N Sekunden, 0 = nur bei Ereignissen
+HEALTH_CHECK_TIMEOUT = 10.0    # Timeout pro externem Befehl (systemctl, pgrep, sudo, curl)
+HEALTH_DISCONNECT_DELAY = 2.0  # Check N Sekunden nach einer MQTT-Trennung
+HEALTH_BACKOFF_MIN = 5.0       # Wartezeit vor erneutem Startversuch eines Service, verdoppelt sich
+HEALTH_BACKOFF_MAX = 300.0     # ... bis höchstens N Sekunden
+# Binärlayouts wie Abschnitt "schemas" der Bridge-Konfiguration (fPort/Gerät -> Schema aus schemas.py)
+PAYLOAD_SCHEMAS = {
+    "definitions": {},
+    "devices": {},
+    "fports": {"1": "tdps24"}
+}
 
 # Logging einrichten
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+schema_registry = SchemaRegistry({"schemas": PAYLOAD_SCHEMAS}, logger)
+
+@functools.lru_cache(maxsize=TOPIC_CACHE_SIZE)
+def parse_topic(topic):
+    """Zerlegt ein Topic in (application_id, device_eui, event_type), gecacht pro Topic"""
+    topic_parts = topic.split('/')
+    return (sys.intern(topic_parts[1]), sys.intern(topic_parts[3]),
+            sys.intern(topic_parts[5]))
+
+def decode_schema_payload(payload, device_eui, fport):
+    """Zerlegt eine Binär-Payload nach PAYLOAD_SCHEMAS, None ohne Schema oder bei falschen Markern"""
+    return schema_registry.decode(payload, device_eui, fport)
+
+def _escape_label(value):
+    """Maskiert Backslash, Anführungszeichen und Zeilenumbruch in Label-Werten"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_openmetrics(families):
+    """Erzeugt OpenMetrics-Text aus (Name, Typ, Beschreibung, Samples), Samples als (Suffix, Labels, Wert)"""
+    lines = []
+    for name, metric_type, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for suffix, labels, value in samples:
+            label_text = ','.join(f'{key}="{_escape_label(item)}"' for key, item in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {value}" if labels else f"{name}{suffix} {value}")
+    lines.append("# EOF")
+    return '\n'.join(lines) + '\n'
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Liefert unter /metrics die Momentaufnahme von server.collect()"""
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_openmetrics(self.server.collect()).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _to_int(value):
+    """Zahl oder Text wie "SF11" in int, leere oder ungültige Werte werden zu None"""
+    try:
+        if isinstance(value, str):
+            value = value.upper().lstrip('SF')
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_timestamp(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+def _to_text(value):
+    return None if value is None or value == '' else str(value)
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return None if value == '' else value == 'True'
+    return None if value is None else bool(value)
+
+# Umwandlung der Session-Spalten für Parquet und SQLite, alle übrigen sind Text
+SESSION_CONVERTERS = {
+    'timestamp': _to_timestamp,
+    'fcnt': _to_int,
+    'fport': _to_int,
+    'rssi_dbm': _to_int,
+    'snr_db': _to_float,
+    'spreading_factor': _to_int,
+    'bandwidth': _to_int,
+    'frequency': _to_int,
+    'gateway_lat': _to_float,
+    'gateway_lon': _to_float,
+    'gateway_alt': _to_float,
+    'device_lat': _to_float,
+    'device_lon': _to_float,
+    'device_alt': _to_float,
+    'battery_level': _to_int,
+    'margin_db': _to_int,
+    'acknowledged': _to_bool
+}
+
+def parquet_schema():
+    """Spaltentypen der Parquet-Session-Dateien: (Spalte, Arrow-Typ, Umwandlung)"""
+    category = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    types = {
+        'timestamp': pyarrow.timestamp('ms'),
+        'fcnt': pyarrow.uint32(),
+        'fport': pyarrow.uint8(),
+        'rssi_dbm': pyarrow.int16(),
+        'snr_db': pyarrow.float32(),
+        'spreading_factor': pyarrow.int8(),
+        'bandwidth': pyarrow.int32(),
+        'frequency': pyarrow.int64(),
+        'gateway_lat': pyarrow.float64(),
+        'gateway_lon': pyarrow.float64(),
+        'gateway_alt': pyarrow.float32(),
+        'device_lat': pyarrow.float64(),
+        'device_lon': pyarrow.float64(),
+        'device_alt': pyarrow.float32(),
+        'battery_level': pyarrow.int16(),
+        'margin_db': pyarrow.int16(),
+        'acknowledged': pyarrow.bool_()
+    }
+    categories = ('session_id', 'application_id', 'device_eui', 'event_type', 'gateway_id',
+                  'gps_source', 'gps_format')
+    return [(name, types.get(name, category if name in categories else pyarrow.string()),
+             SESSION_CONVERTERS.get(name, _to_text)) for name in CSV_HEADERS]
+
+class CsvSessionFile:
+    """Session-Datei im CSV-Format, eine Textzeile pro Event"""
+    
+    suffix = ".csv"
+    
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8', buffering=65536)
+        self.writer = csv.DictWriter(self.file, fieldnames=CSV_HEADERS)
+        self.writer.writeheader()
+        self.file.flush()
+    
+    def write(self, row):
+        self.writer.writerow(row)
+    
+    def flush(self, now):
+        self.file.flush()
+    
+    def size(self):
+        return self.file.tell()
+    
+    def sync(self):
+        os.fsync(self.file.fileno())
+    
+    def close(self):
+        self.file.flush()
+        self.sync()
+        self.file.close()
+
+class ParquetSessionFile:
+    """
+    Session-Datei im Parquet-Format mit typisierten Spalten. Zeilen werden
+    spaltenweise gesammelt und als Row Group geschrieben; lesbar ist die
+    Datei erst nach close() (Footer), daher CSV_ROLLOVER_SECONDS nutzen.
+    """
+    
+    suffix = ".parquet"
+    
+    def __init__(self, path):
+        self.columns = parquet_schema()
+        self.schema = pyarrow.schema([(name, arrow_type) for name, arrow_type, _ in self.columns])
+        self.file = open(path, 'wb')
+        self.writer = pyarrow.parquet.ParquetWriter(self.file, self.schema, compression='zstd')
+        self.pending = {name: [] for name, _, _ in self.columns}
+        self.rows = 0
+        self.last_group = time.monotonic()
+    
+    def write(self, row):
+        for name, _, convert in self.columns:
+            self.pending[name].append(convert(row.get(name)))
+        self.rows += 1
+    
+    def write_row_group(self):
+        if self.rows:
+            self.writer.write_table(pyarrow.Table.from_pydict(self.pending, schema=self.schema))
+            self.pending = {name: [] for name, _, _ in self.columns}
+            self.rows = 0
+        self.last_group = time.monotonic()
+    
+    def flush(self, now):
+        if self.rows >= PARQUET_ROW_GROUP_SIZE or now - self.last_group >= PARQUET_ROW_GROUP_INTERVAL:
+            self.write_row_group()
+            self.file.flush()
+    
+    def size(self):
+        return self.file.tell()
+    
+    def sync(self):
+        os.fsync(self.file.fileno())
+    
+    def close(self):
+        self.write_row_group()
+        self.writer.close()
+        self.file.flush()
+        self.sync()
+        self.file.close()
+
+class SqliteSessionStore:
+    """
+    Session-Events in einer SQLite-Datenbank (WAL), Tabelle und Indizes aus
+    session_store.py der Bridge. Zeilen werden gesammelt und pro Flush in
+    einer Transaktion eingefügt; die Datenbank wechselt nicht mit den Dateien.
+    """
+    
+    def __init__(self, path):
+        # Wird im Writer-Thread benutzt, aber hier angelegt
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SESSION_DB_SCHEMA)
+        # Zeitstempel bleiben Text ("JJJJ-MM-TT HH:MM:SS"), damit Bereichsabfragen auf dem Index laufen
+        self.converters = [(name, _to_text if name == 'timestamp' else SESSION_CONVERTERS.get(name, _to_text))
+                           for name in CSV_HEADERS]
+        self.statement = (f"INSERT INTO events ({', '.join(CSV_HEADERS)}) "
+                          f"VALUES ({', '.join('?' * len(CSV_HEADERS))})")
+        self.pending = []
+    
+    def write(self, row):
+        self.pending.append(tuple(convert(row.get(name)) for name, convert in self.converters))
+    
+    def flush(self, now):
+        if self.pending:
+            with self.connection:
+                self.connection.executemany(self.statement, self.pending)
+            self.pending = []
+    
+    def sync(self):
+        self.connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def close(self):
+        self.flush(None)
+        self.connection.close()
+
+class SessionWriter:
+    """Schreibt Session-Zeilen aus einem eigenen Thread in dauerhaft geöffnete Session-Dateien"""
+    
+    _STOP = object()
+    
+    def __init__(self, directory, session_id, start_time, session_format=SESSION_FORMAT,
+                 db_path=SESSION_DB_PATH):
+        self.directory = directory
+        self.session_id = session_id
+        self.queue = queue.Queue(maxsize=CSV_QUEUE_SIZE)
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.files = []
+        self.outputs = []
+        self.opened_at = 0.0
+        
+        self.formats = []
+        if session_format in ("csv", "both"):
+            self.formats.append(CsvSessionFile)
+        if session_format in ("parquet", "both"):
+            if pyarrow is None:
+                logger.warning("⚠️ pyarrow nicht installiert, Session-Daten werden als CSV gespeichert")
+                if CsvSessionFile not in self.formats:
+                    self.formats.append(CsvSessionFile)
+            else:
+                self.formats.append(ParquetSessionFile)
+        
+        os.makedirs(directory, exist_ok=True)
+        self.stores = []
+        if db_path:
+            self.stores.append(SqliteSessionStore(db_path))
+            logger.info(f"📊 Session-Datenbank: {db_path}")
+        self.open_file(start_time)
+        self.thread = threading.Thread(target=self.run, name="csv-writer", daemon=True)
+        self.thread.start()
+    
+    @property
+    def path(self):
+        return self.files[-1]
+    
+    def open_file(self, start_time):
+        """Öffnet die nächsten Session-Dateien (gleicher Name, eine pro Format)"""
+        timestamp = start_time.strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.directory, f"lorawan_session_{timestamp}_{self.session_id}")
+        if any(path.startswith(base + ".") for path in self.files):
+            base += f"_{len(self.files):03d}"
+        self.outputs = []
+        for session_file in self.formats:
+            path = base + session_file.suffix
+            self.outputs.append(session_file(path))
+            self.files.append(path)
+            logger.info(f"📊 Session-Datei erstellt: {path}")
+        self.opened_at = time.monotonic()
+    
+    def close_file(self):
+        """Schreibt die Puffer, synchronisiert und schließt die aktuellen Dateien"""
+        for output in self.outputs:
+            output.close()
+    
+    def write(self, row):
+        """Reiht eine Zeile ein, ohne auf die Datei zu warten (MQTT-Thread)"""
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.rows_dropped += 1
+    
+    def run(self):
+        """Schreibschleife: puffert Zeilen und schreibt nach Anzahl oder Zeit"""
+        pending = 0
+        last_flush = last_sync = time.monotonic()
+        while True:
+            timeout = max(0.0, last_flush + CSV_FLUSH_INTERVAL - time.monotonic()) if pending else None
+            try:
+                row = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                row = None
+            if row is self._STOP:
+                break
+            try:
+                if row is not None:
+                    for output in self.outputs + self.stores:
+                        output.write(row)
+                    self.rows_written += 1
+                    pending += 1
+                now = time.monotonic()
+                if pending and (pending >= CSV_FLUSH_ROWS or now - last_flush >= CSV_FLUSH_INTERVAL):
+                    for output in self.outputs + self.stores:
+                        output.flush(now)
+                    pending = 0
+                    last_flush = now
+                    if CSV_FSYNC_INTERVAL and now - last_sync >= CSV_FSYNC_INTERVAL:
+                        for output in self.outputs + self.stores:
+                            output.sync()
+                        last_sync = now
+                    if (CSV_ROLLOVER_BYTES and max(output.size() for output in self.outputs) >= CSV_ROLLOVER_BYTES) or \
+                            (CSV_ROLLOVER_SECONDS and now - self.opened_at >= CSV_ROLLOVER_SECONDS):
+                        self.close_file()
+                        self.open_file(datetime.now())
+                        last_sync = now
+            except Exception as e:
+                logger.error(f"❌ Fehler beim Schreiben der Session-Daten: {e}")
+        try:
+            self.close_file()
+            for store in self.stores:
+                store.close()
+        except Exception as e:
+            logger.error(f"❌ Fehler beim Schließen der Session-Datei: {e}")
+    
+    def close(self, timeout=5.0):
+        """Schreibt alle eingereihten Zeilen und beendet den Writer-Thread"""
+        self.queue.put(self._STOP)
+        self.thread.join(timeout)
+
+def _discard(*args, **kwargs):
+    """Ersetzt print() für die Ausgabe pro Nachricht in den Modi dashboard und quiet"""
+
+class ConsoleDashboard:
+    """Hält den Zustand pro Gerät und Gateway und zeichnet ihn in festen Abständen neu"""
+    
+    def __init__(self, monitor, refresh=DASHBOARD_REFRESH, rows=DASHBOARD_ROWS, stream=None):
+        self.monitor = monitor
+        self.refresh = refresh
+        self.rows = rows
+        self.stream = stream or sys.stdout
+        # Device EUI -> [Events, Uplinks, Zuletzt, Event-Typ, fCnt, fPort, RSSI, SNR, SF, Gateway]
+        self.devices = {}
+        # Gateway ID -> [Uplinks, Zuletzt, RSSI, SNR]
+        self.gateways = {}
+        self.events = 0
+        self.last_events = 0
+        self.started = time.monotonic()
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def record(self, row):
+        """Übernimmt eine Session-Zeile (MQTT-Thread, nur Zuweisungen)"""
+        self.events += 1
+        seen = row['timestamp'][11:]
+        device = self.devices.get(row['device_eui'])
+        if device is None:
+            device = self.devices[row['device_eui']] = [0, 0, None, None, None, None, None, None, None, None]
+        device[0] += 1
+        device[2] = seen
+        device[3] = row['event_type']
+        if row['event_type'] != "up":
+            return
+        device[1] += 1
+        device[4:10] = (row['fcnt'], row['fport'], row['rssi_dbm'], row['snr_db'],
+                        row['spreading_factor'], row['gateway_id'])
+        if row['gateway_id']:
+            gateway = self.gateways.get(row['gateway_id'])
+            if gateway is None:
+                gateway = self.gateways[row['gateway_id']] = [0, None, None, None]
+            gateway[0] += 1
+            gateway[1:4] = (seen, row['rssi_dbm'], row['snr_db'])
+    
+    def render(self, interval):
+        """Erzeugt die Übersicht als Text"""
+        events = self.events
+        rate = (events - self.last_events) / interval if interval > 0 else 0.0
+        self.last_events = events
+        uptime = format_duration(time.monotonic() - self.started)
+        blank = lambda value: '' if value is None else value
+        lines = [
+            f"📡 LoRaWAN Monitor - Session {self.monitor.session_id} - Laufzeit {uptime} - "
+            f"{events} Events ({rate:.1f}/s) - Fehler {self.monitor.message_errors} - "
+            f"Dekodierfehler {self.monitor.decode_errors} - "
+            f"CSV verworfen {self.monitor.session_writer.rows_dropped}",
+            "",
+            f"{'Gerät':<18}{'Events':>8}{'Uplinks':>9}  {'Zuletzt':<9}{'Typ':<7}{'fCnt':>7}{'fPort':>6}"
+            f"{'RSSI':>6}{'SNR':>7}  {'SF':<5}{'Gateway':<18}"
+        ]
+        devices = sorted(self.devices.items(), key=lambda item: item[1][2] or '', reverse=True)
+        for eui, (count, uplinks, seen, event, fcnt, fport, rssi, snr, sf, gateway) in devices[:self.rows]:
+            lines.append(f"{eui:<18}{count:>8}{uplinks:>9}  {seen:<9}{event:<7}{blank(fcnt):>7}{blank(fport):>6}"
+                         f"{blank(rssi):>6}{blank(snr):>7}  {blank(sf):<5}{blank(gateway):<18}")
+        if len(devices) > self.rows:
+            lines.append(f"... {len(devices) - self.rows} weitere Geräte")
+        
+        lines += ["", f"{'Gateway':<18}{'Uplinks':>9}  {'Zuletzt':<9}{'RSSI':>6}{'SNR':>7}"]
+        gateways = sorted(self.gateways.items(), key=lambda item: item[1][1] or '', reverse=True)
+        for gateway_id, (uplinks, seen, rssi, snr) in gateways[:self.rows]:
+            lines.append(f"{gateway_id:<18}{uplinks:>9}  {seen:<9}{blank(rssi):>6}{blank(snr):>7}")
+        if len(gateways) > self.rows:
+            lines.append(f"... {len(gateways) - self.rows} weitere Gateways")
+        return "\n".join(line.rstrip() for line in lines)
+    
+    def draw(self, interval):
+        # Im Terminal an Ort und Stelle neu zeichnen, in Pipes (journald) als Block anhängen
+        prefix = "\x1b[H\x1b[2J" if self.stream.isatty() else f"\n{'='*60}\n"
+        self.stream.write(prefix + self.render(interval) + "\n")
+        self.stream.flush()
+    
+    def run(self):
+        last = time.monotonic()
+        while not self.stop_event.wait(self.refresh):
+            now = time.monotonic()
+            try:
+                self.draw(now - last)
+            except Exception as e:
+                logger.error(f"❌ Fehler bei der Dashboard-Ausgabe: {e}")
+            last = now
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="dashboard", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Beendet die Aktualisierung und zeigt den letzten Stand"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(self.refresh + 1.0)
+        self.draw(time.monotonic() - self.started)
+
+class HealthSupervisor:
+    """
+    Führt System-Health-Checks in einem eigenen Thread aus: planmäßig alle
+    HEALTH_CHECK_INTERVAL Sekunden und auf Anforderung (z. B. MQTT-Trennung).
+    request() blockiert nie und kann aus dem MQTT-Thread aufgerufen werden;
+    mehrere Anforderungen vor einem Check werden zusammengefasst.
+    """
+    
+    def __init__(self, monitor, interval=HEALTH_CHECK_INTERVAL):
+        self.monitor = monitor
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        self.requested = None  # Fälligkeit (monotonic) einer angeforderten Prüfung
+        self.reason = None
+        self.backoff = {}  # Service -> (Fehlversuche, nächster Startversuch)
+        self.runs = 0
+        self.last_ok = None
+        self.last_run = time.monotonic()
+        self.thread = None
+    
+    def request(self, reason, delay=0.0):
+        """Fordert einen Check an, frühestens nach delay Sekunden"""
+        due = time.monotonic() + delay
+        with self.lock:
+            if self.requested is None or due < self.requested:
+                self.requested = due
+            self.reason = self.reason or reason
+        self.wake.set()
+    
+    def may_start(self, service_name):
+        """Ob ein Startversuch erlaubt ist oder der Service noch im Backoff ist"""
+        failures, next_attempt = self.backoff.get(service_name, (0, 0.0))
+        remaining = next_attempt - time.monotonic()
+        if remaining > 0:
+            logger.warning(f"⏳ {service_name}: nächster Startversuch in {remaining:.1f} s")
+            return False
+        return True
+    
+    def record_start(self, service_name, ok):
+        """Merkt sich das Ergebnis eines Startversuchs für den Backoff"""
+        if ok:
+            self.backoff.pop(service_name, None)
+            return
+        failures = self.backoff.get(service_name, (0, 0.0))[0] + 1
+        delay = min(HEALTH_BACKOFF_MAX, HEALTH_BACKOFF_MIN * 2 ** (failures - 1))
+        self.backoff[service_name] = (failures, time.monotonic() + delay)
+    
+    def next_due(self):
+        with self.lock:
+            candidates = [self.requested] if self.requested is not None else []
+        if self.interval:
+            candidates.append(self.last_run + self.interval)
+        return min(candidates) if candidates else None
+    
+    def run(self):
+        while not self.stop_event.is_set():
+            due = self.next_due()
+            timeout = None if due is None else due - time.monotonic()
+            if timeout is None or timeout > 0:
+                self.wake.wait(timeout)
+                self.wake.clear()
+                continue
+            with self.lock:
+                reason = self.reason or "planmäßig"
+                self.requested = None
+                self.reason = None
+            started = time.monotonic()
+            logger.info(f"🔍 System-Health-Check ({reason})")
+            try:
+                self.last_ok = self.monitor.system_health_check(self)
+            except Exception as e:
+                logger.error(f"❌ Fehler beim System-Health-Check: {e}")
+                self.last_ok = False
+            self.runs += 1
+            self.last_run = time.monotonic()
+            logger.info(f"🔍 System-Health-Check beendet nach {self.last_run - started:.1f} s")
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="health", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join(1.0)
+
 class LoRaWANSystemMonitor:
     def __init__(self):
         self.client = mqtt.Client()
@@ -41,57 +634,38 @@ class LoRaWANSystemMonitor:
         self.client.on_disconnect = self.on_disconnect
         self.packet_forwarder_process = None
         
-        # CSV-Session Setup
+        # Zähler für den Metrics-Endpunkt
+        self.event_counts = {}  # (Device EUI, Event-Typ) -> Anzahl
+        self.device_bytes = {}  # Device EUI -> Nutzdaten-Bytes
+        self.decode_errors = 0
+        self.message_errors = 0
+        self.mqtt_connects = 0
+        self.mqtt_disconnects = 0
+        self.handle_latency = [0] * (len(METRICS_LATENCY_BOUNDS) + 1)
+        self.handle_latency_sum = 0.0
+        self.metrics_server = None
+        
+        # CSV-Session Setup: Datei erstellen, Header schreiben, Writer-Thread starten
         self.session_id = str(uuid.uuid4())[:8]
         self.session_start_time = datetime.now()
-        self.csv_file_path = self.setup_csv_file()
+        self.session_writer = SessionWriter(CSV_OUTPUT_DIR, self.session_id, self.session_start_time)
         
-        # CSV-Datei erstellen und Header schreiben
-        self.init_csv_file()
-
-    def setup_csv_file(self):
-        """Erstellt CSV-Ordner und bestimmt Dateiname"""
-        # Ordner erstellen falls nicht vorhanden
-        os.makedirs(CSV_OUTPUT_DIR, exist_ok=True)
+        # Konsolenausgabe: pro Nachricht (verbose), als Übersicht (dashboard) oder keine (quiet)
+        self.verbose = CONSOLE_MODE == "verbose"
+        self.show = print if self.verbose else _discard
+        self.dashboard = ConsoleDashboard(self) if CONSOLE_MODE == "dashboard" else None
         
-        # Dateiname mit Zeitstempel und Session-ID
-        timestamp = self.session_start_time.strftime("%Y%m%d_%H%M%S")
-        filename = f"lorawan_session_{timestamp}_{self.session_id}.csv"
-        return os.path.join(CSV_OUTPUT_DIR, filename)
-
-    def init_csv_file(self):
-        """Initialisiert CSV-Datei mit Header"""
-        headers = [
-            'timestamp', 'session_id', 'application_id', 'device_eui', 
-            'event_type', 'fcnt', 'fport', 'raw_data_hex', 'raw_data_ascii',
-            'decoded_payload', 'gateway_id', 'rssi_dbm', 'snr_db', 'spreading_factor', 
-            'bandwidth', 'frequency', 'gateway_lat', 'gateway_lon', 'gateway_alt',
-            'device_lat', 'device_lon', 'device_alt', 'battery_level', 'margin_db', 
-            'acknowledged', 'gps_source', 'gps_format'
-        ]
-        
-        with open(self.csv_file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-        
-        logger.info(f"📊 CSV-Datei erstellt: {self.csv_file_path}")
+        # Health-Checks laufen nach dem Start im eigenen Thread, nie im MQTT-Thread
+        self.health = HealthSupervisor(self)
+
+    @property
+    def csv_file_path(self):
+        """Aktuelle Session-Datei (wechselt bei CSV_ROLLOVER_BYTES/CSV_ROLLOVER_SECONDS)"""
+        return self.session_writer.path
 
     def write_to_csv(self, data_dict):
-        """Schreibt Daten in CSV-Datei"""
-        try:
-            with open(self.csv_file_path, 'a', newline='', encoding='utf-8') as csvfile:
-                headers = [
-                    'timestamp', 'session_id', 'application_id', 'device_eui', 
-                    'event_type', 'fcnt', 'fport', 'raw_data_hex', 'raw_data_ascii',
-                    'decoded_payload', 'gateway_id', 'rssi_dbm', 'snr_db', 'spreading_factor', 
-                    'bandwidth', 'frequency', 'gateway_lat', 'gateway_lon', 'gateway_alt',
-                    'device_lat', 'device_lon', 'device_alt', 'battery_level', 'margin_db', 
-                    'acknowledged', 'gps_source', 'gps_format'
-                ]
-                writer = csv.DictWriter(csvfile, fieldnames=headers)
-                writer.writerow(data_dict)
-        except Exception as e:
-            logger.error(f"❌ Fehler beim Schreiben in CSV: {e}")
+        """Übergibt eine Zeile an den gepufferten Session-Writer"""
+        self.session_writer.write(data_dict)
 
     def decode_payload_data(self, base64_data):
         """Dekodiert Base64-Nutzdaten und prüft auf GPS-Koordinaten"""
@@ -125,6 +699,7 @@ class LoRaWANSystemMonitor:
             
         except Exception as e:
             logger.debug(f"Fehler beim Dekodieren der Nutzdaten: {e}")
+            self.decode_errors += 1
             return None
 
     def extract_coordinates_from_payload(self, decoded_data):
@@ -223,30 +798,30 @@ class LoRaWANSystemMonitor:
         
         # Gateway-GPS
         if any(gateway_gps.values()):
-            print("🌍 GATEWAY-GPS:")
+            self.show("🌍 GATEWAY-GPS:")
             if gateway_gps['lat'] is not None:
-                print(f"   📍 Latitude: {gateway_gps['lat']}")
+                self.show(f"   📍 Latitude: {gateway_gps['lat']}")
             if gateway_gps['lon'] is not None:
-                print(f"   📍 Longitude: {gateway_gps['lon']}")
+                self.show(f"   📍 Longitude: {gateway_gps['lon']}")
             if gateway_gps['alt'] is not None:
-                print(f"   📍 Altitude: {gateway_gps['alt']} m")
+                self.show(f"   📍 Altitude: {gateway_gps['alt']} m")
             gps_found = True
         
         # Device-GPS
         if device_gps:
-            print("🌍 DEVICE-GPS:")
+            self.show("🌍 DEVICE-GPS:")
             if device_gps['lat'] is not None:
-                print(f"   📍 Latitude: {device_gps['lat']}")
+                self.show(f"   📍 Latitude: {device_gps['lat']}")
             if device_gps['lon'] is not None:
-                print(f"   📍 Longitude: {device_gps['lon']}")
+                self.show(f"   📍 Longitude: {device_gps['lon']}")
             if device_gps['alt'] is not None:
-                print(f"   📍 Altitude: {device_gps['alt']} m")
-            print(f"   📊 Quelle: {device_gps['source']}")
-            print(f"   📋 Format: {device_gps['format']}")
+                self.show(f"   📍 Altitude: {device_gps['alt']} m")
+            self.show(f"   📊 Quelle: {device_gps['source']}")
+            self.show(f"   📋 Format: {device_gps['format']}")
             gps_found = True
         
         if not gps_found:
-            print("🌍 GPS-DATEN: Keine verfügbar")
+            self.show("🌍 GPS-DATEN: Keine verfügbar")
         
         return gps_found
 
@@ -254,7 +829,7 @@ class LoRaWANSystemMonitor:
         """Prüft ob ein Prozess läuft"""
         try:
             result = subprocess.run(['pgrep', '-f', process_name], 
-                                  capture_output=True, text=True)
+                                  capture_output=True, text=True, timeout=HEALTH_CHECK_TIMEOUT)
             return result.returncode == 0
         except Exception as e:
             logger.error(f"Fehler beim Prüfen von {process_name}: {e}")
@@ -264,7 +839,7 @@ class LoRaWANSystemMonitor:
         """Prüft systemd Service Status"""
         try:
             result = subprocess.run(['systemctl', 'is-active', service_name], 
-                                  capture_output=True, text=True)
+                                  capture_output=True, text=True, timeout=HEALTH_CHECK_TIMEOUT)
             return result.stdout.strip() == 'active'
         except Exception as e:
             logger.error(f"Fehler beim Prüfen von Service {service_name}: {e}")
@@ -275,7 +850,7 @@ class LoRaWANSystemMonitor:
         try:
             logger.info(f"🔄 Starte Service: {service_name}")
             result = subprocess.run(['sudo', 'systemctl', 'start', service_name], 
-                                  capture_output=True, text=True)
+                                  capture_output=True, text=True, timeout=HEALTH_CHECK_TIMEOUT)
             if result.returncode == 0:
                 logger.info(f"✅ Service {service_name} erfolgreich gestartet")
                 return True
@@ -295,12 +870,11 @@ class LoRaWANSystemMonitor:
                 
             logger.info("🔄 Starte Packet Forwarder...")
             
-            # Wechsle in das Packet Forwarder Verzeichnis
-            os.chdir(PACKET_FORWARDER_PATH)
-            
-            # Starte den Packet Forwarder im Hintergrund
+            # Starte den Packet Forwarder im Hintergrund in seinem Verzeichnis
+            # (ohne os.chdir, die Session-Dateien liegen relativ zum Arbeitsverzeichnis)
             self.packet_forwarder_process = subprocess.Popen(
                 ['sudo', './lora_pkt_fwd'],
+                cwd=PACKET_FORWARDER_PATH,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
             )
@@ -332,15 +906,16 @@ class LoRaWANSystemMonitor:
     def check_chirpstack_api(self):
         """Prüft ChirpStack API"""
         try:
-            result = subprocess.run(['curl', '-s', f'http://{MQTT_BROKER}:8080'], 
-                                  capture_output=True, text=True, timeout=5)
+            result = subprocess.run(['curl', '-s', '--max-time', str(HEALTH_CHECK_TIMEOUT),
+                                   f'http://{MQTT_BROKER}:8080'],
+                                  capture_output=True, text=True, timeout=HEALTH_CHECK_TIMEOUT + 1)
             return "ChirpStack" in result.stdout
         except Exception as e:
             logger.error(f"❌ ChirpStack API nicht erreichbar: {e}")
             return False
 
-    def system_health_check(self):
-        """Führt kompletten System-Health-Check durch"""
+    def system_health_check(self, supervisor=None):
+        """Führt kompletten System-Health-Check durch, mit supervisor inklusive Start-Backoff"""
         logger.info("🔍 Starte System-Health-Check...")
         
         checks = {
@@ -367,9 +942,14 @@ class LoRaWANSystemMonitor:
         for service_name, service_config in checks.items():
             if service_config["check"]():
                 logger.info(f"✅ {service_name}: OK")
+            elif supervisor and not supervisor.may_start(service_name):
+                all_ok = False
             else:
                 logger.warning(f"⚠️  {service_name}: Nicht verfügbar - starte...")
-                if service_config["start"]():
+                started = service_config["start"]()
+                if supervisor:
+                    supervisor.record_start(service_name, started)
+                if started:
                     logger.info(f"✅ {service_name}: Erfolgreich gestartet")
                 else:
                     logger.error(f"❌ {service_name}: Start fehlgeschlagen")
@@ -398,27 +978,29 @@ class LoRaWANSystemMonitor:
 
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
+            self.mqtt_connects += 1
             logger.info("✅ Erfolgreich mit MQTT Broker verbunden!")
             client.subscribe(MQTT_TOPIC)
             logger.info(f"📡 Lausche auf Topic: {MQTT_TOPIC}")
             logger.info(f"📊 Session ID: {self.session_id}")
         else:
             logger.error(f"❌ MQTT-Verbindung fehlgeschlagen mit Code: {rc}")
+            self.health.request(f"MQTT-Verbindung abgelehnt ({rc})")
     
     def on_disconnect(self, client, userdata, rc):
+        self.mqtt_disconnects += 1
         logger.warning("🔌 Verbindung zum MQTT Broker getrennt")
-        # Versuche Reconnect nach Service-Check
-        logger.info("🔄 Führe System-Check durch...")
-        time.sleep(2)
-        self.system_health_check()
+        # Nur anfordern: der Check läuft im Health-Thread, paho verbindet sich selbst neu
+        logger.info("🔄 System-Check angefordert...")
+        self.health.request("MQTT getrennt", delay=HEALTH_DISCONNECT_DELAY)
     
     def on_message(self, client, userdata, msg):
+        started = time.perf_counter()
         try:
-            # Topic parsen
-            topic_parts = msg.topic.split('/')
-            application_id = topic_parts[1]
-            device_eui = topic_parts[3]
-            event_type = topic_parts[5]
+            # Topic parsen (LRU-Cache über alle bekannten Geräte-Topics)
+            application_id, device_eui, event_type = parse_topic(msg.topic)
+            key = (device_eui, event_type)
+            self.event_counts[key] = self.event_counts.get(key, 0) + 1
             
             # Payload dekodieren
             payload = json.loads(msg.payload.decode())
@@ -426,12 +1008,12 @@ class LoRaWANSystemMonitor:
             # Timestamp hinzufügen
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            print(f"\n{'='*60}")
-            print(f"🕐 Zeit: {timestamp}")
-            print(f"📱 Application ID: {application_id}")
-            print(f"🔷 Device EUI: {device_eui}")
-            print(f"📊 Event Type: {event_type}")
-            print(f"{'='*60}")
+            self.show(f"\n{'='*60}")
+            self.show(f"🕐 Zeit: {timestamp}")
+            self.show(f"📱 Application ID: {application_id}")
+            self.show(f"🔷 Device EUI: {device_eui}")
+            self.show(f"📊 Event Type: {event_type}")
+            self.show(f"{'='*60}")
             
             # Basis-CSV-Daten vorbereiten
             csv_data = {
@@ -480,8 +1062,8 @@ class LoRaWANSystemMonitor:
                 csv_data = self.handle_status(payload, csv_data)
             elif event_type == "ack":
                 csv_data = self.handle_ack(payload, csv_data)
-            else:
-                print(f"📝 Rohdaten: {json.dumps(payload, indent=2)}")
+            elif self.verbose:
+                self.show(f"📝 Rohdaten: {json.dumps(payload, indent=2)}")
             
             # Device-GPS in CSV-Daten aufnehmen
             if device_gps:
@@ -492,71 +1074,141 @@ class LoRaWANSystemMonitor:
                 csv_data['gps_format'] = device_gps['format']
             
             # GPS-Daten anzeigen
-            self.display_gps_data(gateway_gps, device_gps)
+            if self.verbose:
+                self.display_gps_data(gateway_gps, device_gps)
             
             # In CSV schreiben
             self.write_to_csv(csv_data)
+            if self.dashboard:
+                self.dashboard.record(csv_data)
                 
         except Exception as e:
+            self.message_errors += 1
             logger.error(f"❌ Fehler beim Verarbeiten der Nachricht: {e}")
-            print(f"Raw message: {msg.payload}")
+            self.show(f"Raw message: {msg.payload}")
+        
+        duration = time.perf_counter() - started
+        self.handle_latency[bisect.bisect_left(METRICS_LATENCY_BOUNDS, duration)] += 1
+        self.handle_latency_sum += duration
+
+    def collect_metrics(self):
+        """Momentaufnahme der Zähler für den Metrics-Endpunkt (läuft im HTTP-Thread)"""
+        events = dict(self.event_counts)
+        device_bytes = dict(self.device_bytes)
+        latency = list(self.handle_latency)
+        
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(METRICS_LATENCY_BOUNDS, latency):
+            cumulative += count
+            buckets.append(("_bucket", {'le': f"{bound:g}"}, cumulative))
+        total = cumulative + latency[-1]
+        buckets += [("_bucket", {'le': "+Inf"}, total), ("_count", {}, total),
+                    ("_sum", {}, self.handle_latency_sum)]
+        
+        return [
+            ("monitor_events", "counter", "Empfangene Events pro Gerät und Typ",
+             [("_total", {'device': device, 'event': event}, count)
+              for (device, event), count in sorted(events.items())]),
+            ("monitor_device_bytes", "counter", "Empfangene Nutzdaten-Bytes pro Gerät",
+             [("_total", {'device': device}, size) for device, size in sorted(device_bytes.items())]),
+            ("monitor_decode_errors", "counter", "Nicht dekodierbare Nutzdaten",
+             [("_total", {}, self.decode_errors)]),
+            ("monitor_message_errors", "counter", "Fehler bei der Verarbeitung von Nachrichten",
+             [("_total", {}, self.message_errors)]),
+            ("monitor_mqtt_reconnects", "counter", "MQTT-Wiederverbindungen",
+             [("_total", {}, max(0, self.mqtt_connects - 1))]),
+            ("monitor_mqtt_disconnects", "counter", "MQTT-Trennungen",
+             [("_total", {}, self.mqtt_disconnects)]),
+            ("monitor_handle_seconds", "histogram", "Verarbeitungsdauer pro Nachricht", buckets),
+            ("monitor_csv_rows_written", "counter", "In Session-Dateien geschriebene Zeilen",
+             [("_total", {}, self.session_writer.rows_written)]),
+            ("monitor_csv_rows_dropped", "counter", "Wegen voller Schreib-Queue verworfene Zeilen",
+             [("_total", {}, self.session_writer.rows_dropped)]),
+            ("monitor_health_checks", "counter", "Ausgeführte System-Health-Checks im Hintergrund",
+             [("_total", {}, self.health.runs)]),
+            ("monitor_health_ok", "gauge", "Ergebnis des letzten Health-Checks (1 = alle Services OK)",
+             [("", {}, int(self.health.last_ok))] if self.health.last_ok is not None else [])
+        ]
+
+    def start_metrics_server(self):
+        """Startet den OpenMetrics-Endpunkt in einem eigenen Thread, falls METRICS_PORT gesetzt ist"""
+        if not METRICS_PORT:
+            return
+        try:
+            self.metrics_server = ThreadingHTTPServer((METRICS_HOST, METRICS_PORT), MetricsRequestHandler)
+        except OSError as e:
+            logger.error(f"❌ Metrics-Endpunkt nicht verfügbar: {e}")
+            return
+        self.metrics_server.daemon_threads = True
+        self.metrics_server.collect = self.collect_metrics
+        threading.Thread(target=self.metrics_server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"📈 Metrics-Endpunkt: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
 
     def handle_uplink(self, data, csv_data):
         """Behandelt Uplink-Nachrichten (Daten von Geräten)"""
-        print("📈 UPLINK-DATEN:")
+        self.show("📈 UPLINK-DATEN:")
         device_gps = None
         
         # Basis-Informationen
         if 'devEui' in data:
-            print(f"   Device EUI: {data['devEui']}")
+            self.show(f"   Device EUI: {data['devEui']}")
         if 'fCnt' in data:
-            print(f"   Frame Counter: {data['fCnt']}")
+            self.show(f"   Frame Counter: {data['fCnt']}")
             csv_data['fcnt'] = data['fCnt']
         if 'fPort' in data:
-            print(f"   Port: {data['fPort']}")
+            self.show(f"   Port: {data['fPort']}")
             csv_data['fport'] = data['fPort']
         
         # Nutzdaten dekodieren
         if 'data' in data:
             raw_data = data['data']
-            print(f"   Raw Data (Base64): {raw_data}")
+            self.show(f"   Raw Data (Base64): {raw_data}")
             
             # Payload dekodieren
             decoded_payload = self.decode_payload_data(raw_data)
             if decoded_payload:
-                print(f"   Raw Data (Hex): {decoded_payload['hex']}")
+                device_eui = csv_data['device_eui']
+                self.device_bytes[device_eui] = self.device_bytes.get(device_eui, 0) + len(decoded_payload['hex']) // 2
+                self.show(f"   Raw Data (Hex): {decoded_payload['hex']}")
                 csv_data['raw_data_hex'] = decoded_payload['hex']
                 
                 if decoded_payload['ascii']:
-                    print(f"   Als ASCII: {decoded_payload['ascii']}")
+                    self.show(f"   Als ASCII: {decoded_payload['ascii']}")
                     csv_data['raw_data_ascii'] = decoded_payload['ascii']
                 
                 if decoded_payload['json']:
-                    print(f"   Als JSON: {json.dumps(decoded_payload['json'])}")
+                    self.show(f"   Als JSON: {json.dumps(decoded_payload['json'])}")
                     csv_data['decoded_payload'] = json.dumps(decoded_payload['json'])
+                else:
+                    fields = decode_schema_payload(bytes.fromhex(decoded_payload['hex']),
+                                                   device_eui, data.get('fPort'))
+                    if fields:
+                        self.show(f"   Als Schema (fPort {data.get('fPort')}): {fields}")
+                        csv_data['decoded_payload'] = json.dumps(fields)
                 
                 # GPS-Koordinaten aus Payload
                 if decoded_payload['coordinates']:
                     device_gps = decoded_payload['coordinates']
-                    print(f"   🌍 GPS in Payload gefunden!")
+                    self.show(f"   🌍 GPS in Payload gefunden!")
         
         # Gateway-Informationen
         if 'rxInfo' in data:
-            print(f"   📡 Gateway Info:")
+            self.show(f"   📡 Gateway Info:")
             for i, rx in enumerate(data['rxInfo']):
                 if 'gatewayId' in rx:
                     gateway_id = rx['gatewayId']
-                    print(f"      Gateway {i+1}: {gateway_id}")
+                    self.show(f"      Gateway {i+1}: {gateway_id}")
                     if i == 0:  # Erste Gateway-Info für CSV
                         csv_data['gateway_id'] = gateway_id
                 if 'rssi' in rx:
                     rssi = rx['rssi']
-                    print(f"      RSSI: {rssi} dBm")
+                    self.show(f"      RSSI: {rssi} dBm")
                     if i == 0:
                         csv_data['rssi_dbm'] = rssi
                 if 'snr' in rx:
                     snr = rx['snr']
-                    print(f"      SNR: {snr} dB")
+                    self.show(f"      SNR: {snr} dB")
                     if i == 0:
                         csv_data['snr_db'] = snr
         
@@ -569,48 +1221,48 @@ class LoRaWANSystemMonitor:
                     lora_info = modulation['lora']
                     if 'spreadingFactor' in lora_info:
                         sf = lora_info['spreadingFactor']
-                        print(f"   📶 Spreading Factor: SF{sf}")
+                        self.show(f"   📶 Spreading Factor: SF{sf}")
                         csv_data['spreading_factor'] = f"SF{sf}"
                     if 'bandwidth' in lora_info:
                         bw = lora_info['bandwidth']
-                        print(f"   📊 Bandwidth: {bw} Hz")
+                        self.show(f"   📊 Bandwidth: {bw} Hz")
                         csv_data['bandwidth'] = bw
             if 'frequency' in tx_info:
                 freq = tx_info['frequency']
-                print(f"   📻 Frequency: {freq} Hz")
+                self.show(f"   📻 Frequency: {freq} Hz")
                 csv_data['frequency'] = freq
         
         return csv_data, device_gps
 
     def handle_join(self, data, csv_data):
         """Behandelt Join-Events"""
-        print("🔗 JOIN-EVENT:")
+        self.show("🔗 JOIN-EVENT:")
         if 'devEui' in data:
-            print(f"   Device EUI: {data['devEui']}")
+            self.show(f"   Device EUI: {data['devEui']}")
         if 'devAddr' in data:
-            print(f"   Device Address: {data['devAddr']}")
-        print("   ✅ Gerät erfolgreich dem Netzwerk beigetreten!")
+            self.show(f"   Device Address: {data['devAddr']}")
+        self.show("   ✅ Gerät erfolgreich dem Netzwerk beigetreten!")
         return csv_data
 
     def handle_status(self, data, csv_data):
         """Behandelt Status-Updates"""
-        print("📊 STATUS-UPDATE:")
+        self.show("📊 STATUS-UPDATE:")
         if 'batteryLevel' in data:
             battery = data['batteryLevel']
-            print(f"   🔋 Batterie: {battery}%")
+            self.show(f"   🔋 Batterie: {battery}%")
             csv_data['battery_level'] = battery
         if 'margin' in data:
             margin = data['margin']
-            print(f"   📶 Signal Margin: {margin} dB")
+            self.show(f"   📶 Signal Margin: {margin} dB")
             csv_data['margin_db'] = margin
         return csv_data
 
     def handle_ack(self, data, csv_data):
         """Behandelt ACK-Messages"""
-        print("✅ ACK-NACHRICHT:")
+        self.show("✅ ACK-NACHRICHT:")
         if 'acknowledged' in data:
             ack = data['acknowledged']
-            print(f"   Bestätigt: {ack}")
+            self.show(f"   Bestätigt: {ack}")
             csv_data['acknowledged'] = ack
         return csv_data
 
@@ -621,8 +1273,15 @@ class LoRaWANSystemMonitor:
             logger.info(f"📊 Session ID: {self.session_id}")
             logger.info(f"📊 CSV-Datei: {self.csv_file_path}")
             
-            # System Health Check
+            # System Health Check (einmalig vor dem Verbinden, danach im Health-Thread)
             self.system_health_check()
+            self.health.start()
+            
+            # Optional: OpenMetrics-Endpunkt
+            self.start_metrics_server()
+            
+            if self.dashboard:
+                self.dashboard.start()
             
             # Kurz warten damit Services starten können
             time.sleep(2)
@@ -634,11 +1293,23 @@ class LoRaWANSystemMonitor:
             
         except KeyboardInterrupt:
             logger.info("\n👋 Monitor gestoppt durch Benutzer")
-            logger.info(f"📊 Session-Daten gespeichert in: {self.csv_file_path}")
+            cache = parse_topic.cache_info()
+            logger.info(f"📊 Topic-Cache: {cache.currsize} Einträge, "
+                        f"{cache.hits} Treffer, {cache.misses} Fehlzugriffe")
         except Exception as e:
             logger.error(f"❌ Fehler: {e}")
         finally:
             self.client.disconnect()
+            if self.metrics_server:
+                self.metrics_server.shutdown()
+            if self.dashboard:
+                self.dashboard.stop()
+            self.health.stop()
+            # Gepufferte Zeilen schreiben und Session-Dateien schließen
+            self.session_writer.close()
+            logger.info(f"📊 Session-Daten gespeichert in: {', '.join(self.session_writer.files)} "
+                        f"({self.session_writer.rows_written} Zeilen, "
+                        f"{self.session_writer.rows_dropped} verworfen)")
             # Packet Forwarder Process beenden falls gestartet
             if self.packet_forwarder_process:
                 self.packet_forwarder_process.terminate()